@@ -0,0 +1,342 @@
+"""
+Write-behind log for GameSession answer rows.
+
+submit_answer() used to insert and commit one tiny row per answer, which
+serializes every player on the SQLite writer. Answers are now appended to a
+bounded in-process queue and to a local journal file, and a background thread
+inserts them in batches when the batch size is reached or the flush interval
+passes.
+
+The journal makes the buffer durable: every answer is fsynced to the journal
+before it is queued and before the request returns, the journal is truncated
+once everything in it has been committed, and journals left behind by a
+crashed worker are replayed into the database by the flusher thread of the
+next process that starts (retried until the database takes them). Answers
+are queued in journal order; when the queue is full they wait, still in
+order, in an overflow list rather than being dropped. On normal shutdown the
+queue is drained before the process exits.
+
+When a batch fails its answers are inserted one at a time: an answer the
+database refuses (a constraint violation, a bad value) is moved to
+rejected-answers.jsonl in the journal directory, so it cannot hold up the
+answers queued behind it. If the database itself is failing, the rest wait
+for the next flush.
+"""
+
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError
+
+try:
+    import fcntl
+except ImportError:  # Windows: journals are not locked between processes
+    fcntl = None
+
+DATETIME_FIELDS = ('session_start', 'session_end', 'created_at')
+REJECTED_FILE = 'rejected-answers.jsonl'
+
+
+def _encode(record):
+    encoded = dict(record)
+    for field in DATETIME_FIELDS:
+        if isinstance(encoded.get(field), datetime):
+            encoded[field] = encoded[field].isoformat()
+    return encoded
+
+
+def _rejects_row(error):
+    """Whether an insert failed because of the row itself, so retrying it cannot succeed"""
+    if isinstance(error, (IntegrityError, DataError)):
+        return True
+    # Raised before reaching the database, e.g. a value of the wrong type
+    return isinstance(error, StatementError) and not isinstance(error, DBAPIError)
+
+
+def _decode(record):
+    decoded = dict(record)
+    for field in DATETIME_FIELDS:
+        if isinstance(decoded.get(field), str):
+            decoded[field] = datetime.fromisoformat(decoded[field])
+    return decoded
+
+
+class AnswerLog:
+    """Buffered, journaled writer for GameSession rows"""
+
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.model = None
+        self.enabled = False
+        self.batch_size = 50
+        self.flush_interval = 1.0
+        self.journal_dir = None
+        self.fsync = True
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._overflow = deque()  # (seq, answer) queued after a full queue, in order
+        self._pending = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._journal = None
+        self._seq = 0
+        self._acked = 0
+
+    def init_app(self, app, db, model):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.enabled = app.config.get('ANSWER_LOG_ENABLED', True)
+        self.batch_size = app.config.get('ANSWER_LOG_BATCH_SIZE', 50)
+        self.flush_interval = app.config.get('ANSWER_LOG_FLUSH_INTERVAL', 1.0)
+        self.fsync = app.config.get('ANSWER_LOG_FSYNC', True)
+        self.journal_dir = app.config.get('ANSWER_LOG_DIR') or os.path.join(app.instance_path, 'answer_journal')
+        self._queue = queue.Queue(maxsize=app.config.get('ANSWER_LOG_MAX_QUEUE', 10000))
+        atexit.register(self.close)
+
+    # -- request side -------------------------------------------------------
+
+    def append(self, record):
+        """Record one answer; returns once it is durable in the journal"""
+        if not self.enabled:
+            self._insert([record])
+            return
+
+        self._ensure_started()
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._write_journal({'seq': seq, 'answer': _encode(record)})
+            # Queued under the lock, so answers reach the flusher in journal order
+            # and it never acknowledges past one that is still waiting
+            if not self._overflow:
+                try:
+                    self._queue.put_nowait((seq, record))
+                except queue.Full:
+                    self.app.logger.warning('Answer log queue is full, holding answers until the database catches up')
+                    self._overflow.append((seq, record))
+            else:
+                self._overflow.append((seq, record))
+
+        if self._overflow or self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    # -- journal --------------------------------------------------------------
+
+    def _journal_path(self, pid):
+        return os.path.join(self.journal_dir, f'answers-{pid}.jsonl')
+
+    def _write_journal(self, entry):
+        self._journal.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _ensure_started(self):
+        # Started lazily in the process that serves requests, so it also works
+        # when a pre-forking server imports the app in its master process
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+
+            os.makedirs(self.journal_dir, exist_ok=True)
+
+            self._pid = os.getpid()
+            self._journal = open(self._journal_path(self._pid), 'a', encoding='utf-8')
+            if fcntl is not None:
+                fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self._seq = 0
+            self._acked = 0
+            self._pending = []
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._overflow = deque()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='answer-log-flusher', daemon=True)
+            self._thread.start()
+
+    def _replay_orphaned_journals(self):
+        """Insert answers from journals whose owning process is gone"""
+        for path in glob.glob(os.path.join(self.journal_dir, 'answers-*.jsonl')):
+            try:
+                journal = open(path, 'r+', encoding='utf-8')
+            except FileNotFoundError:
+                continue  # Replayed by another process in the meantime
+
+            with journal:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # Still owned by a live worker
+                elif path == self._journal_path(os.getpid()):
+                    continue
+
+                answers = {}
+                acked = 0
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn final line from a crash
+                    if 'ack' in entry:
+                        acked = max(acked, entry['ack'])
+                    elif 'seq' in entry:
+                        answers[entry['seq']] = entry['answer']
+
+                entries = [(seq, _decode(answer)) for seq, answer in sorted(answers.items()) if seq > acked]
+                if entries:
+                    try:
+                        self._insert([record for _, record in entries])
+                    except Exception:
+                        def acknowledge(seq):
+                            journal.write(json.dumps({'ack': seq}) + '\n')
+                            journal.flush()
+                        if self._insert_singly(entries, acknowledge) < len(entries):
+                            raise RuntimeError(f'Could not replay {os.path.basename(path)}, will retry')
+                    self.app.logger.info(f'Replayed {len(entries)} answers from {os.path.basename(path)}')
+
+                # Empty it while still holding the lock so nobody replays it twice
+                journal.seek(0)
+                journal.truncate()
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # -- flusher --------------------------------------------------------------
+
+    def _run(self):
+        replayed = False
+        while not self._stopping.is_set():
+            if not replayed:
+                # Here rather than in a request, so a database that is down at start never fails an answer
+                try:
+                    self._replay_orphaned_journals()
+                    replayed = True
+                except Exception as e:
+                    self.app.logger.error(f'Replaying orphaned answer journals failed, will retry: {e}')
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _refill_queue(self):
+        """Move overflowed answers back into the queue, in order; False if there were none"""
+        with self._lock:
+            if not self._overflow:
+                return False
+            while self._overflow:
+                try:
+                    self._queue.put_nowait(self._overflow[0])
+                except queue.Full:
+                    break
+                self._overflow.popleft()
+            return True
+
+    def flush(self):
+        """Insert everything queued so far; answers the database is unavailable for are retried later"""
+        while True:
+            while len(self._pending) < self.batch_size:
+                try:
+                    self._pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    if not self._refill_queue():
+                        break
+
+            if not self._pending:
+                return
+
+            try:
+                self._insert([record for _, record in self._pending])
+            except Exception as e:
+                self.app.logger.warning(f'Answer log batch failed, inserting its answers one by one: {e}')
+                done = self._insert_singly(self._pending, self._acknowledge)
+                self._pending = self._pending[done:]
+                if self._pending:
+                    # Keep the rest (and the journal) and try again on the next tick
+                    return
+            else:
+                last_seq = self._pending[-1][0]
+                self._pending = []
+                self._acknowledge(last_seq)
+
+            if self._queue.empty() and not self._overflow:
+                return
+
+    def _insert_singly(self, entries, acknowledge):
+        """Insert (seq, answer) entries one at a time, in order, after their batch failed.
+
+        Answers the database refuses go to the rejected journal. Returns how
+        many entries were dealt with, stopping early when the database itself
+        is failing.
+        """
+        for done, (seq, record) in enumerate(entries):
+            try:
+                self._insert([record])
+            except Exception as e:
+                if not _rejects_row(e):
+                    self.app.logger.error(f'Answer log flush failed, will retry: {e}')
+                    return done
+                self._reject(record, e)
+            acknowledge(seq)
+        return len(entries)
+
+    def _reject(self, record, error):
+        """Set an answer the database refuses aside, with the reason"""
+        entry = {'answer': _encode(record), 'error': str(error).splitlines()[0],
+                 'rejected_at': datetime.utcnow().isoformat()}
+        with open(os.path.join(self.journal_dir, REJECTED_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self.app.logger.error(f"Answer rejected by the database, moved to {REJECTED_FILE}: {entry['error']}")
+
+    def _acknowledge(self, seq):
+        with self._lock:
+            self._acked = seq
+            if self._acked == self._seq:
+                # Everything journaled is committed: start the journal afresh
+                self._journal.seek(0)
+                self._journal.truncate()
+            else:
+                self._write_journal({'ack': seq})
+
+    def _insert(self, records):
+        with self.app.app_context():
+            try:
+                self.db.session.execute(self.db.insert(self.model), records)
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+            finally:
+                self.db.session.remove()
+
+    def close(self):
+        """Drain the queue; called at interpreter exit and by server hooks"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout=10)
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            if self._acked == self._seq:
+                os.remove(self._journal_path(self._pid))
+            self._journal = None
+        self._thread = None
+
+
+# Process-wide answer log
+answer_log = AnswerLog()
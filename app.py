@@ -1,5 +1,6 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_file
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import or_
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
@@ -14,6 +15,9 @@ import base64
 from PIL import Image
 from dotenv import load_dotenv
 from config import get_config
+from metrics import init_metrics
+from migrations import run_migrations
+from tenancy import DEFAULT_TOP_INDUSTRIES, parse_industry_list
 
 # Load environment variables
 load_dotenv()
@@ -22,11 +26,13 @@ app = Flask(__name__)
 config_class = get_config()
 app.config.from_object(config_class)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
-# Use the database path from environment or default to instance directory
-db_path = os.path.join(os.getcwd(), 'instance', 'game_database.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+# Use the database path from environment or default to instance directory (tests keep TestingConfig's)
+if not app.config.get('TESTING'):
+    db_path = os.path.join(os.getcwd(), 'instance', 'game_database.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 
 db = SQLAlchemy(app)
+init_metrics(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'admin_login'
@@ -54,27 +60,52 @@ class Category(db.Model):
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=True, index=True)  # NULL = all events
     question_text = db.Column(db.Text, nullable=False)
     option_a = db.Column(db.String(200), nullable=False)
     option_b = db.Column(db.String(200), nullable=False)
     option_c = db.Column(db.String(200), nullable=False)
     option_d = db.Column(db.String(200), nullable=False)
     correct_answer = db.Column(db.String(1), nullable=False)  # A, B, C, or D
+    content_hash = db.Column(db.String(40), index=True)  # normalized text and options (question_dedup.py)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Unique within an event, and among the questions shared by every event
+    __table_args__ = (
+        db.Index('uq_question_event_content', 'event_id', 'content_hash', unique=True),
+        db.Index('uq_question_shared_content', 'content_hash', unique=True,
+                 sqlite_where=db.text('event_id IS NULL'), postgresql_where=db.text('event_id IS NULL')),
+    )
 
 class Industry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False, unique=True)
+    name = db.Column(db.String(100), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=True, index=True)  # NULL = all events
     is_highlighted = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Unique within an event, and among the industries shared by every event
+    __table_args__ = (
+        db.Index('uq_industry_event_name', 'event_id', 'name', unique=True),
+        db.Index('uq_industry_shared_name', 'name', unique=True,
+                 sqlite_where=db.text('event_id IS NULL'), postgresql_where=db.text('event_id IS NULL')),
+    )
 
 class PreRegisteredUser(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=True, index=True)  # NULL = all events
     name = db.Column(db.String(100), nullable=False)
     company_name = db.Column(db.String(100), nullable=False)
     industry = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class NameAlias(db.Model):
+    """A company or industry spelling that uploads map to another name (see canonical.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'company' or 'industry'
+    alias = db.Column(db.String(100), nullable=False)
+    canonical = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('kind', 'alias'),)
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -90,17 +121,28 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     game_sessions = db.relationship('GameSession', backref='user', lazy=True, foreign_keys='GameSession.user_id')
 
+class Event(db.Model):
+    """A conference or season; journeys and answers are kept per event and archived when it closes"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(50), index=True)  # Kiosks select an event with ?event=<slug>
+    question_file = db.Column(db.String(200))  # Relative to the app directory; NULL = the default question file
+    highlighted_industries = db.Column(db.Text)  # Comma-separated; NULL = the default top industries
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    ended_at = db.Column(db.DateTime)  # NULL while the event is open
+    archived_at = db.Column(db.DateTime)
+    archive_path = db.Column(db.String(300))
+    archived_sessions = db.Column(db.Integer, default=0)
+    archived_journeys = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class UserJourney(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=True, index=True)
     journey_session_id = db.Column(db.String(100), unique=True, nullable=False)  # Unique identifier for complete journey
-    name = db.Column(db.String(100), nullable=False)
-    company_name = db.Column(db.String(100), nullable=False)
-    industry = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120))
-    phone = db.Column(db.String(20))
-    job_title = db.Column(db.String(100))
-    department = db.Column(db.String(100))
+    # Contact details live on User; the journey only records what changes per play
+    industry = db.Column(db.String(100), nullable=True)  # Set on the industry selection screen
     selfie_filename = db.Column(db.String(200))
     journey_start = db.Column(db.DateTime, default=datetime.utcnow)
     journey_end = db.Column(db.DateTime)
@@ -113,10 +155,11 @@ class GameSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     journey_id = db.Column(db.Integer, db.ForeignKey('user_journey.id'), nullable=True)  # Link to complete journey
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=True, index=True)
     name = db.Column(db.String(100), nullable=False)
     company_name = db.Column(db.String(100), nullable=False)
     industry = db.Column(db.String(100), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
     selected_answer = db.Column(db.String(1), nullable=False)
     is_correct = db.Column(db.Boolean, nullable=False)
     selfie_filename = db.Column(db.String(200))
@@ -125,49 +168,83 @@ class GameSession(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     question = db.relationship('Question', backref='game_sessions')
 
+def ensure_industries(names, event_id=None):
+    """Create highlighted industries that the event (or every event) doesn't have yet (the industry page never writes)"""
+    existing = {name for (name,) in db.session.query(Industry.name).filter(
+        Industry.name.in_(names), or_(Industry.event_id.is_(None), Industry.event_id == event_id)
+    ).all()}
+    for industry_name in names:
+        if industry_name not in existing:
+            db.session.add(Industry(name=industry_name, event_id=event_id, is_highlighted=True))
+            existing.add(industry_name)
+
 # Import routes after app initialization
 from routes import *
 
+def init_database():
+    """Create tables, apply migrations and seed default data (call inside an app context)"""
+    db.create_all()
+    run_migrations(db)
+    
+    # Create default admin user if it doesn't exist
+    admin_username = os.environ.get('ADMIN_USERNAME', 'admin')
+    admin_password = os.environ.get('ADMIN_PASSWORD', 'admin123')
+    
+    if not Admin.query.filter_by(username=admin_username).first():
+        admin = Admin(
+            username=admin_username,
+            password_hash=generate_password_hash(admin_password)
+        )
+        db.session.add(admin)
+        db.session.commit()
+        print(f"Admin user created: username='{admin_username}'")
+    
+    # Create default industries if not exist
+    default_industries = [
+        ('Technology', True), ('Healthcare', True), ('Finance', True), 
+        ('Manufacturing', True), ('Retail', True), ('Education', True),
+        ('Government', True), ('Energy', True), ('Telecommunications', False),
+        ('Transportation', False), ('Real Estate', False), ('Media', False),
+        ('Hospitality', False), ('Agriculture', False), ('Construction', False),
+        ('Automotive', False), ('Aerospace', False), ('Pharmaceuticals', False),
+        ('Insurance', False), ('Banking', False), ('Consulting', False),
+        ('Legal Services', False), ('Non-Profit', False), ('Other', False)
+    ]
+    
+    for industry_name, is_highlighted in default_industries:
+        if not Industry.query.filter_by(name=industry_name, event_id=None).first():
+            industry = Industry(name=industry_name, is_highlighted=is_highlighted)
+            db.session.add(industry)
+    
+    # Industries highlighted on the selection page, for every event and per event
+    ensure_industries(DEFAULT_TOP_INDUSTRIES)
+    for event in Event.query.filter(Event.ended_at.is_(None), Event.highlighted_industries.isnot(None)).all():
+        ensure_industries(parse_industry_list(event.highlighted_industries), event.id)
+    
+    # Create default categories matching industries
+    for industry_name, _ in default_industries:
+        if not Category.query.filter_by(name=industry_name).first():
+            category = Category(name=industry_name)
+            db.session.add(category)
+    
+    # Question files the game serves are stored in the Question table, so the banks only look ids up
+    question_dedup.store_file(question_bank.file_path)
+    for (question_file,) in db.session.query(Event.question_file).filter(
+            Event.ended_at.is_(None), Event.question_file.isnot(None)).distinct():
+        try:
+            question_dedup.store_file(events.resolve_question_file(question_file))
+        except (ValueError, OSError) as e:
+            print(f"Skipping question file {question_file}: {e}")
+    
+    db.session.commit()
+    question_bank.refresh()
+    
+    # Build the full-text question index (also created lazily on first search)
+    question_search.ensure_index()
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
-        
-        # Create default admin user if it doesn't exist
-        admin_username = os.environ.get('ADMIN_USERNAME', 'admin')
-        admin_password = os.environ.get('ADMIN_PASSWORD', 'admin123')
-        
-        if not Admin.query.filter_by(username=admin_username).first():
-            admin = Admin(
-                username=admin_username,
-                password_hash=generate_password_hash(admin_password)
-            )
-            db.session.add(admin)
-            db.session.commit()
-            print(f"Admin user created: username='{admin_username}'")
-        
-        # Create default industries if not exist
-        default_industries = [
-            ('Technology', True), ('Healthcare', True), ('Finance', True), 
-            ('Manufacturing', True), ('Retail', True), ('Education', True),
-            ('Government', True), ('Energy', True), ('Telecommunications', False),
-            ('Transportation', False), ('Real Estate', False), ('Media', False),
-            ('Hospitality', False), ('Agriculture', False), ('Construction', False),
-            ('Automotive', False), ('Aerospace', False), ('Pharmaceuticals', False),
-            ('Insurance', False), ('Banking', False), ('Consulting', False),
-            ('Legal Services', False), ('Non-Profit', False), ('Other', False)
-        ]
-        
-        for industry_name, is_highlighted in default_industries:
-            if not Industry.query.filter_by(name=industry_name).first():
-                industry = Industry(name=industry_name, is_highlighted=is_highlighted)
-                db.session.add(industry)
-        
-        # Create default categories matching industries
-        for industry_name, _ in default_industries:
-            if not Category.query.filter_by(name=industry_name).first():
-                category = Category(name=industry_name)
-                db.session.add(category)
-        
-        db.session.commit()
+        init_database()
+        live_stats.load()
     
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -1,34 +1,38 @@
 #!/usr/bin/env python3
 """
 HTTPS version of the Flask app for camera access on Android browsers
+
+Runs gunicorn with gunicorn.conf.py and a certificate that is generated once
+and reused (see tls.py), so phones only have to accept it the first time.
+Where gunicorn is unavailable (Windows) it falls back to the Flask server.
 """
 
-from app import app
 import os
+import sys
+
+from tls import certificate_paths
 
 if __name__ == '__main__':
     print("Starting Flask app with HTTPS...")
     print("===============================\n")
-    
-    # Check if pyopenssl is installed
-    try:
-        import OpenSSL
-        print("✓ pyopenssl is installed")
-    except ImportError:
-        print("✗ pyopenssl not found. Installing...")
-        os.system('pip install pyopenssl')
-        print("✓ pyopenssl installed")
-    
+
+    certfile, keyfile = certificate_paths()
+    port = os.environ.get('PORT', '5000')
+
     print("\n🔒 Starting HTTPS server...")
     print("📱 Camera access will work on Android browsers")
-    print("🌐 Access your app at: https://localhost:5000")
-    print("⚠️  Browser will show security warning - click 'Advanced' -> 'Proceed to localhost'\n")
-    
-    # Run Flask app with HTTPS using adhoc SSL context
-    # This generates self-signed certificates on-the-fly
-    app.run(
-        debug=True, 
-        host='0.0.0.0', 
-        port=5000,
-        ssl_context='adhoc'  # This creates self-signed certificates automatically
-    )
\ No newline at end of file
+    print(f"🌐 Access your app at: https://localhost:{port}")
+    print("⚠️  Browser will show security warning the first time - click 'Advanced' -> 'Proceed to localhost'\n")
+
+    try:
+        import gunicorn
+    except ImportError:
+        gunicorn = None
+
+    if gunicorn is not None and os.name != 'nt':
+        os.environ['SSL_CERTFILE'] = certfile
+        os.environ['SSL_KEYFILE'] = keyfile
+        os.execvp(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'])
+
+    from wsgi import app
+    app.run(host='0.0.0.0', port=int(port), threaded=True, ssl_context=(certfile, keyfile))
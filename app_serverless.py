@@ -8,6 +8,7 @@ import random
 import uuid
 import base64
 from dotenv import load_dotenv
+from question_format import parse_question_file
 
 # Load environment variables
 load_dotenv()
@@ -23,62 +24,10 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 def load_questions_from_file():
     questions = []
     try:
-        with open('comprehensive_questions.txt', 'r', encoding='utf-8') as file:
-            content = file.read()
-            
-        current_industry = None
-        question_id = 1
-        lines = content.split('\n')
-        i = 0
-        
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if line.startswith('INDUSTRY:'):
-                current_industry = line.replace('INDUSTRY:', '').strip()
-                i += 1
-                continue
-            
-            # Look for question number pattern
-            if line and line[0].isdigit() and '.' in line:
-                question_text = line.split('.', 1)[1].strip()
-                
-                # Get options
-                options = {}
-                correct_answer = None
-                
-                for j in range(1, 6):  # Look for A, B, C, D options and correct answer
-                    if i + j < len(lines):
-                        option_line = lines[i + j].strip()
-                        if option_line.startswith('A.'):
-                            options['option_a'] = option_line[2:].strip()
-                        elif option_line.startswith('B.'):
-                            options['option_b'] = option_line[2:].strip()
-                        elif option_line.startswith('C.'):
-                            options['option_c'] = option_line[2:].strip()
-                        elif option_line.startswith('D.'):
-                            options['option_d'] = option_line[2:].strip()
-                        elif option_line.startswith('Correct Answer:'):
-                            correct_answer = option_line.replace('Correct Answer:', '').strip()
-                            break
-                
-                if len(options) == 4 and correct_answer and current_industry:
-                    questions.append({
-                        'id': question_id,
-                        'category': current_industry,
-                        'question_text': question_text,
-                        'option_a': options['option_a'],
-                        'option_b': options['option_b'],
-                        'option_c': options['option_c'],
-                        'option_d': options['option_d'],
-                        'correct_answer': correct_answer
-                    })
-                    question_id += 1
-                
-                i += 6  # Skip to next question
-            else:
-                i += 1
-                
+        records, _ = parse_question_file('comprehensive_questions.txt')
+        for question_id, record in enumerate(records, start=1):
+            questions.append(dict(record.model_fields(), id=question_id, category=record.industry))
+    
     except FileNotFoundError:
         # Fallback to sample questions if file not found
         questions = [
@@ -257,7 +206,7 @@ def upload_selfie():
             filename = f"selfie_{journey_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
             
             # For serverless deployment, save to /tmp directory
-             try:
+            try:
                 # Decode base64 image
                 image_bytes = base64.b64decode(image_data)
                 
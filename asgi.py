@@ -0,0 +1,342 @@
+"""
+ASGI entry point: the Flask app behind a thin adapter for asyncio servers.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+Under a WSGI server every request holds a worker thread from its first byte
+to its last, so a phone trickling up a selfie, a slow export download or an
+open leaderboard stream each pin one. Here the network side runs on the event
+loop: request bodies are read there (up to MAX_CONTENT_LENGTH) before the
+view is called, response bodies are written from there, files are read on a
+small file I/O pool, and leaderboard streams wait on the loop itself. The
+views - SQLAlchemy, Pillow, openpyxl - stay synchronous and run on a bounded
+thread pool that only sees a request once all of its bytes have arrived.
+
+Admission is bounded too: past ASGI_MAX_REQUESTS requests in flight a worker
+answers 503 straight away instead of queueing without limit, and so it does
+once the bodies it holds in memory (read or announced by Content-Length)
+would pass ASGI_MAX_BUFFERED bytes, until those requests' views return.
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_log import answer_log
+from wsgi import app
+
+CHUNK_SIZE = 64 * 1024
+
+# Views that can stream without a thread find a callable here (see leaderboard_stream)
+ASYNC_BODY_KEY = 'game.async_body'
+
+
+class FileWrapper:
+    """wsgi.file_wrapper: file bodies are read by the adapter on its file pool"""
+
+    def __init__(self, filelike, block_size=CHUNK_SIZE):
+        self.filelike = filelike
+        self.block_size = block_size
+
+    def __iter__(self):
+        # For middleware that iterates the body anyway
+        while True:
+            chunk = self.filelike.read(self.block_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self):
+        return self.filelike.read(self.block_size)
+
+    def close(self):
+        if hasattr(self.filelike, 'close'):
+            self.filelike.close()
+
+
+class ASGIAdapter:
+    """Runs a WSGI app under an ASGI server, keeping slow network I/O off the view threads"""
+
+    def __init__(self, wsgi_app, max_requests=1000, threads=16, file_threads=4, max_body=None, max_buffered=None):
+        self.wsgi_app = wsgi_app
+        self.max_requests = max_requests
+        self.max_body = max_body
+        self.max_buffered = max_buffered
+        self.buffered = 0  # bytes of request bodies held by requests whose view has not returned
+        self.views = ThreadPoolExecutor(threads, thread_name_prefix='asgi-view')
+        self.files = ThreadPoolExecutor(file_threads, thread_name_prefix='asgi-file')
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        if self.in_flight >= self.max_requests:
+            await self._busy(send)
+            return
+        self.in_flight += 1
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Drain buffered answers before the worker exits
+                await asyncio.get_running_loop().run_in_executor(self.views, answer_log.close)
+                self.views.shutdown(wait=False)
+                self.files.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _handle(self, scope, receive, send):
+        called = await self._read_and_call(scope, receive, send)
+        if called is None:
+            return
+        status, headers, response, chunks, async_bodies = called
+
+        loop = asyncio.get_running_loop()
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            })
+            if async_bodies:
+                await self._send_async_body(async_bodies[0], receive, send)
+            elif isinstance(response, FileWrapper):
+                await self._send_file(response, send)
+            else:
+                await self._send_iterable(response, chunks, send)
+        finally:
+            # close() finishes the request's bookkeeping (metrics, stream slots) and may touch the database
+            if hasattr(response, 'close'):
+                await loop.run_in_executor(self.views, response.close)
+
+    async def _read_and_call(self, scope, receive, send):
+        """Read the body and run the view; None if the request ended here"""
+        reserved = []  # bytes this request counts against max_buffered
+        try:
+            body = await self._read_body(scope, receive, send, reserved)
+            if body is None:
+                return None
+
+            loop = asyncio.get_running_loop()
+            environ = self._environ(scope, body)
+            async_bodies = []
+            environ[ASYNC_BODY_KEY] = async_bodies.append
+            try:
+                status, headers, response, chunks = await loop.run_in_executor(self.views, self._call_view, environ)
+            except Exception:
+                app.logger.exception('Unhandled error in the WSGI app')
+                await self._respond(send, 500, b'Internal Server Error')
+                return None
+            return status, headers, response, chunks, async_bodies
+        finally:
+            self.buffered -= sum(reserved)
+
+    async def _read_body(self, scope, receive, send, reserved):
+        """The whole request body, read on the event loop; None if the request ended here"""
+        length = 0
+        for name, value in scope.get('headers', []):
+            if name == b'content-length':
+                length = int(value or 0)
+        if self._too_large(length):
+            await self._respond(send, 413, b'Request body too large')
+            return None
+        # Announced bodies are counted before they are read, so a burst of uploads is turned away up front
+        if not self._reserve(reserved, length):
+            await self._busy(send)
+            return None
+
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if self._too_large(size):
+                await self._respond(send, 413, b'Request body too large')
+                return None
+            if not self._reserve(reserved, size - sum(reserved)):
+                await self._busy(send)
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    def _too_large(self, size):
+        # A body bigger than the whole buffer could never be admitted
+        return any(limit and size > limit for limit in (self.max_body, self.max_buffered))
+
+    def _reserve(self, reserved, size):
+        """Count size more bytes against max_buffered; False if they do not fit"""
+        if size <= 0:
+            return True
+        if self.max_buffered and self.buffered + size > self.max_buffered:
+            return False
+        self.buffered += size
+        reserved.append(size)
+        return True
+
+    def _environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        root_path = scope.get('root_path', '')
+        path = scope.get('path', '/')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1] or 80),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            'wsgi.file_wrapper': FileWrapper,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_LENGTH':
+                continue
+            key = 'CONTENT_TYPE' if name == 'CONTENT_TYPE' else 'HTTP_' + name
+            if key in environ:
+                value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+            environ[key] = value
+        return environ
+
+    def _call_view(self, environ):
+        """Run the WSGI app on a view thread, along with its first body chunk"""
+        started = {}
+        written = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            started['status'] = status
+            started['headers'] = headers
+            return written.append
+
+        response = self.wsgi_app(environ, start_response)
+        chunks = list(written)
+        if not isinstance(response, FileWrapper):
+            # Most bodies are one chunk; fetch it here rather than in another hop
+            iterator = iter(response)
+            for chunk in iterator:
+                if chunk:
+                    chunks.append(chunk)
+                    break
+            response = _Remaining(iterator, response)
+        started['sent'] = True
+        return started['status'], started['headers'], response, chunks
+
+    async def _send_iterable(self, response, chunks, send):
+        loop = asyncio.get_running_loop()
+        for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        while True:
+            chunk = await loop.run_in_executor(self.views, response.next_chunk)
+            if chunk is None:
+                break
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    async def _send_file(self, response, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = await loop.run_in_executor(self.files, response.read)
+            if not chunk:
+                break
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    async def _send_async_body(self, body, receive, send):
+        """Relay an async generator until it ends or the client goes away"""
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        try:
+            while True:
+                next_chunk = asyncio.ensure_future(body.__anext__())
+                await asyncio.wait({next_chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_chunk.done():
+                    next_chunk.cancel()
+                    await asyncio.gather(next_chunk, return_exceptions=True)
+                    return
+                try:
+                    chunk = next_chunk.result()
+                except StopAsyncIteration:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            disconnected.cancel()
+            await body.aclose()
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _busy(self, send):
+        await self._respond(send, 503, b'Server busy, try again shortly', [(b'retry-after', b'5')])
+
+    @staticmethod
+    async def _respond(send, status, body, headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8'),
+                        (b'content-length', str(len(body)).encode('ascii'))] + list(headers)
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+class _Remaining:
+    """The rest of a WSGI body after its first chunk, pulled one chunk per view-thread hop"""
+
+    def __init__(self, iterator, response):
+        self._iterator = iterator
+        self._response = response
+
+    def next_chunk(self):
+        for chunk in self._iterator:
+            if chunk:
+                return chunk
+        return None
+
+    def close(self):
+        if hasattr(self._response, 'close'):
+            self._response.close()
+
+
+application = ASGIAdapter(
+    app,
+    max_requests=app.config.get('ASGI_MAX_REQUESTS', 1000),
+    threads=app.config.get('ASGI_THREADS') or min(32, (os.cpu_count() or 1) * 4),
+    file_threads=app.config.get('ASGI_FILE_THREADS', 4),
+    max_body=app.config.get('MAX_CONTENT_LENGTH'),
+    max_buffered=app.config.get('ASGI_MAX_BUFFERED')
+)
@@ -0,0 +1,90 @@
+"""
+Fingerprinted static assets built by build_assets.py.
+
+When static/dist/manifest.json exists, url_for('static', filename=...) points
+at the content-hashed copy of a file (css/main.css -> dist/css/main.3f2a9c1e.css).
+Those URLs never change content, so they are served with a one-year immutable
+Cache-Control, and from the precompressed .br/.gz sibling when the client
+accepts it. Files are sent with send_from_directory, which hands the open file
+to the server's wsgi.file_wrapper (sendfile under gunicorn), or to the front
+proxy when USE_X_SENDFILE is on. Without a manifest nothing changes.
+"""
+
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Preferred first
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+
+class AssetManifest:
+    """Maps static paths to their fingerprinted build output"""
+
+    def __init__(self):
+        self.app = None
+        self.assets = {}
+        self.dist_prefix = DIST_DIR + '/'
+
+    def init_app(self, app):
+        self.app = app
+        self.load()
+
+        # Rewrite url_for('static', filename=...) to the fingerprinted file
+        app.url_defaults(self._fingerprint_url)
+
+        # Serve dist/ files immutable and precompressed; everything else as before
+        self._serve_static = app.view_functions['static']
+        app.view_functions['static'] = self._static_view
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.app.static_folder, DIST_DIR, MANIFEST_NAME)
+
+    def load(self):
+        """(Re)read the manifest; an absent manifest means unfingerprinted assets"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.assets = json.load(f).get('assets', {})
+        except FileNotFoundError:
+            self.assets = {}
+        except (OSError, ValueError) as e:
+            self.app.logger.error(f'Ignoring unreadable asset manifest: {e}')
+            self.assets = {}
+
+    def _fingerprint_url(self, endpoint, values):
+        if endpoint == 'static' and self.assets:
+            built = self.assets.get(values.get('filename'))
+            if built:
+                values['filename'] = built
+
+    def _static_view(self, filename):
+        if not filename.startswith(self.dist_prefix):
+            return self._serve_static(filename=filename)
+
+        directory = self.app.static_folder
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.accept_encodings
+
+        for encoding, suffix in PRECOMPRESSED:
+            compressed = filename + suffix
+            if accepted[encoding] and os.path.isfile(os.path.join(directory, compressed)):
+                response = send_from_directory(directory, compressed, mimetype=mimetype, max_age=31536000)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(directory, filename, mimetype=mimetype, max_age=31536000)
+
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+# Process-wide asset manifest
+asset_manifest = AssetManifest()
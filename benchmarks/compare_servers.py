@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Throughput of the production server profile against the Flask dev server.
+
+Starts each server in turn on a free port - the dev server the way the old
+entry points ran it (app.run), then gunicorn with gunicorn.conf.py - runs
+benchmarks/loadtest.py against it and prints the two summaries side by side.
+Both use the database in instance/, so run it on a scratch copy of the
+project rather than on live event data.
+
+Usage:
+    python benchmarks/compare_servers.py --players 300 --concurrency 30
+    python benchmarks/compare_servers.py --workers 4 --threads 8
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOADTEST = os.path.join(ROOT, 'benchmarks', 'loadtest.py')
+
+DEV_SERVER = "from wsgi import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with code {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not listen on port {port} within {timeout}s')
+
+
+def run_against(name, command, port, env, args):
+    print(f'\n=== {name} ===')
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port, server)
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            summary_path = f.name
+        subprocess.run([sys.executable, LOADTEST, '--base-url', f'http://127.0.0.1:{port}',
+                        '--players', str(args.players), '--concurrency', str(args.concurrency),
+                        '--baseline', '', '--json', summary_path], cwd=ROOT, check=False)  # no baseline check
+        with open(summary_path) as f:
+            summary = json.load(f)
+        os.remove(summary_path)
+        return summary
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the dev server with the gunicorn profile')
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--workers', type=int, help='gunicorn workers (default: gunicorn.conf.py sizing)')
+    parser.add_argument('--threads', type=int, help='gunicorn threads per worker')
+    args = parser.parse_args()
+
+    results = {}
+
+    port = free_port()
+    # One address plays every journey, which the rate limits would rightly throttle
+    env = dict(os.environ, FLASK_ENV='production', RATELIMIT_ENABLED='0')
+    results['dev server'] = run_against('Flask dev server', [sys.executable, '-c', DEV_SERVER.format(port=port)],
+                                        port, env, args)
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print('\ngunicorn is not installed; skipping the production profile')
+    else:
+        port = free_port()
+        env = dict(os.environ, FLASK_ENV='production', RATELIMIT_ENABLED='0', PORT=str(port),
+                   GUNICORN_PIDFILE=os.path.join(tempfile.gettempdir(), f'gunicorn-bench-{port}.pid'))
+        if args.workers:
+            env['WEB_CONCURRENCY'] = str(args.workers)
+        if args.threads:
+            env['GUNICORN_THREADS'] = str(args.threads)
+        results['gunicorn'] = run_against('gunicorn (gunicorn.conf.py)',
+                                          [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                                          port, env, args)
+
+    print(f"\n{'server':<14}{'req/s':>9}{'journeys/s':>12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    for name, s in results.items():
+        print(f"{name:<14}{s['requests_per_s']:>9.1f}{s['journeys_per_s']:>12.1f}{s['p50_ms']:>9.1f}"
+              f"{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['error_rate'] * 100:>8.2f}%")
+    if len(results) == 2 and results['dev server']['requests_per_s']:
+        ratio = results['gunicorn']['requests_per_s'] / results['dev server']['requests_per_s']
+        print(f'\ngunicorn throughput: {ratio:.1f}x the dev server')
+
+
+if __name__ == '__main__':
+    main()
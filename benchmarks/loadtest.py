@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Load test that replays the kiosk player journey against a running server.
+
+Each virtual player walks the same endpoint sequence as the game pages:
+
+    /api/start-game -> industry update -> (/api/get-question -> /api/submit-answer) x N
+    -> /api/save-selfie (realistic JPEG) -> /api/complete-game
+
+Players run concurrently, each on its own keep-alive connection with its own
+session cookie. The run reports throughput, latency percentiles per step,
+error rates and, when admin credentials are given, database lock errors and
+write time scraped from /admin/api/metrics. Results can be saved as a
+baseline and later runs compared against it; a regression exits non-zero.
+
+Usage:
+    RATELIMIT_ENABLED=0 FLASK_ENV=development python app.py   # in another terminal
+    python benchmarks/loadtest.py --players 200 --concurrency 20
+    python benchmarks/loadtest.py --save-baseline  # record the current numbers
+    python benchmarks/loadtest.py                  # compare with the baseline
+"""
+
+import argparse
+import base64
+import http.client
+import io
+import json
+import os
+import random
+import ssl
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'baseline.json')
+
+INDUSTRIES = ['BFSI', 'Manufacturing', 'New-Age', 'IT/ITES', 'Healthcare/Pharma', 'Automotive', 'Conglomerate', 'Aviation']
+STEPS = ['start_game', 'set_industry', 'get_question', 'submit_answer', 'save_selfie', 'complete_game']
+
+
+def make_selfie_jpeg(width=640, height=480, quality=85):
+    """Build a camera-sized JPEG, as the selfie page would upload"""
+    try:
+        from PIL import Image
+        noise = Image.effect_noise((width, height), 48).convert('RGB')
+        gradient = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+        image = Image.blend(noise, gradient, 0.5)
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality)
+        return buffer.getvalue()
+    except ImportError:
+        # Without Pillow, send a JPEG-framed payload of typical size
+        return b'\xff\xd8\xff\xe0' + os.urandom(60 * 1024) + b'\xff\xd9'
+
+
+class Client:
+    """One player's keep-alive HTTP connection with its own cookies"""
+
+    def __init__(self, base_url, insecure=False, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.https = parts.scheme == 'https'
+        self.insecure = insecure
+        self.timeout = timeout
+        self.cookies = {}
+        self.conn = None
+
+    def _connect(self):
+        if self.https:
+            context = ssl._create_unverified_context() if self.insecure else ssl.create_default_context()
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, payload=None):
+        """Send a request; returns (status, body bytes)"""
+        headers = {'Accept': 'application/json'}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if self.cookies:
+            # Sent regardless of the Secure flag so production cookie settings work over plain HTTP
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = self._connect()
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Server closed the keep-alive connection; retry once on a fresh one
+                self.close()
+                if attempt:
+                    raise
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for key, morsel in cookie.items():
+                self.cookies[key] = morsel.value
+        return response.status, data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class Recorder:
+    """Thread-safe collection of per-step latencies and failures"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self.error_samples = []
+        self.journeys_completed = 0
+
+    def record(self, step, duration, ok, detail=None):
+        with self._lock:
+            self.latencies[step].append(duration)
+            if not ok:
+                self.errors[step] += 1
+                if len(self.error_samples) < 10:
+                    self.error_samples.append(f'{step}: {detail}')
+
+    def journey_done(self):
+        with self._lock:
+            self.journeys_completed += 1
+
+
+def run_player(client, recorder, player_number, questions, selfie_data_url):
+    """Play one full journey, recording each step"""
+
+    def step(name, method, path, payload=None):
+        started = time.perf_counter()
+        try:
+            status, body = client.request(method, path, payload)
+            ok = 200 <= status < 300
+            detail = None if ok else f'HTTP {status} {body[:120]!r}'
+        except Exception as e:
+            body = b''
+            ok = False
+            detail = f'{type(e).__name__}: {e}'
+        recorder.record(name, time.perf_counter() - started, ok, detail)
+        return ok, body
+
+    ok, _ = step('start_game', 'POST', '/api/start-game', {
+        'name': f'Load Tester {player_number}',
+        'company_name': f'Benchmark Corp {player_number % 50}',
+        'email': f'player{player_number}@example.com',
+        'phone': '9999999999',
+        'job_title': 'CISO',
+        'department': 'Security'
+    })
+    if not ok:
+        return
+
+    step('set_industry', 'POST', '/api/start-game', {'industry': random.choice(INDUSTRIES)})
+
+    for _ in range(questions):
+        ok, body = step('get_question', 'GET', '/api/get-question')
+        if not ok:
+            continue
+        try:
+            question_id = json.loads(body)['id']
+        except (ValueError, KeyError):
+            continue
+        step('submit_answer', 'POST', '/api/submit-answer', {
+            'question_id': question_id,
+            'selected_answer': random.randint(0, 3),
+            'time_taken': random.randint(3, 30),
+            'is_timeout': False
+        })
+
+    step('save_selfie', 'POST', '/api/save-selfie', {'image': selfie_data_url})
+    ok, _ = step('complete_game', 'POST', '/api/complete-game')
+    if ok:
+        recorder.journey_done()
+
+
+def scrape_db_metrics(base_url, username, password, insecure):
+    """Read lock errors and write-statement time from /admin/api/metrics"""
+    client = Client(base_url, insecure=insecure)
+    try:
+        status, _ = client.request('POST', '/admin/login', {'username': username, 'password': password})
+        if status != 200:
+            return None
+        status, body = client.request('GET', '/admin/api/metrics')
+        if status != 200:
+            return None
+    finally:
+        client.close()
+
+    values = {'lock_errors': 0.0, 'write_seconds': 0.0, 'write_statements': 0.0}
+    for line in body.decode('utf-8').splitlines():
+        if line.startswith('db_errors_total{kind="lock"}'):
+            values['lock_errors'] = float(line.rsplit(' ', 1)[1])
+        for verb in ('insert', 'update', 'delete'):
+            if line.startswith(f'db_query_duration_seconds_sum{{verb="{verb}"}}'):
+                values['write_seconds'] += float(line.rsplit(' ', 1)[1])
+            elif line.startswith(f'db_query_duration_seconds_count{{verb="{verb}"}}'):
+                values['write_statements'] += float(line.rsplit(' ', 1)[1])
+    return values
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed, db_before, db_after):
+    all_latencies = sorted(v for values in recorder.latencies.values() for v in values)
+    total_requests = len(all_latencies)
+    total_errors = sum(recorder.errors.values())
+
+    steps = {}
+    for step in STEPS:
+        values = sorted(recorder.latencies[step])
+        if not values:
+            continue
+        steps[step] = {
+            'requests': len(values),
+            'errors': recorder.errors[step],
+            'error_rate': recorder.errors[step] / len(values),
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000
+        }
+
+    summary = {
+        'elapsed_s': elapsed,
+        'journeys_completed': recorder.journeys_completed,
+        'journeys_per_s': recorder.journeys_completed / elapsed if elapsed else 0,
+        'requests': total_requests,
+        'requests_per_s': total_requests / elapsed if elapsed else 0,
+        'error_rate': total_errors / total_requests if total_requests else 0,
+        'p50_ms': percentile(all_latencies, 0.50) * 1000,
+        'p90_ms': percentile(all_latencies, 0.90) * 1000,
+        'p95_ms': percentile(all_latencies, 0.95) * 1000,
+        'p99_ms': percentile(all_latencies, 0.99) * 1000,
+        'steps': steps
+    }
+
+    if db_before and db_after:
+        statements = db_after['write_statements'] - db_before['write_statements']
+        summary['db'] = {
+            'lock_errors': db_after['lock_errors'] - db_before['lock_errors'],
+            'write_statements': statements,
+            'write_seconds': db_after['write_seconds'] - db_before['write_seconds'],
+            'avg_write_ms': ((db_after['write_seconds'] - db_before['write_seconds']) / statements * 1000)
+                            if statements else 0.0
+        }
+    return summary
+
+
+def print_report(summary, errors):
+    print(f"\nJourneys: {summary['journeys_completed']} in {summary['elapsed_s']:.1f}s "
+          f"({summary['journeys_per_s']:.1f}/s), requests: {summary['requests']} "
+          f"({summary['requests_per_s']:.1f}/s), error rate: {summary['error_rate'] * 100:.2f}%")
+    print(f"Latency  p50 {summary['p50_ms']:.1f}ms  p90 {summary['p90_ms']:.1f}ms  "
+          f"p95 {summary['p95_ms']:.1f}ms  p99 {summary['p99_ms']:.1f}ms\n")
+
+    print(f"{'step':<15}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for step, s in summary['steps'].items():
+        print(f"{step:<15}{s['requests']:>9}{s['errors']:>8}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}"
+              f"{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+
+    if 'db' in summary:
+        db = summary['db']
+        print(f"\nDatabase: {db['lock_errors']:.0f} lock errors, {db['write_statements']:.0f} writes, "
+              f"{db['write_seconds']:.2f}s in writes (avg {db['avg_write_ms']:.2f}ms incl. lock waits)")
+
+    if errors:
+        print('\nSample errors:')
+        for error in errors:
+            print(f'  {error}')
+
+
+def compare_with_baseline(summary, baseline, tolerance):
+    """Return a list of regressions relative to a stored baseline"""
+    regressions = []
+
+    def check_higher_is_worse(label, current, previous):
+        if previous and current > previous * (1 + tolerance):
+            regressions.append(f'{label}: {previous:.1f} -> {current:.1f} (+{(current / previous - 1) * 100:.0f}%)')
+
+    check_higher_is_worse('p95 latency (ms)', summary['p95_ms'], baseline.get('p95_ms'))
+    check_higher_is_worse('p99 latency (ms)', summary['p99_ms'], baseline.get('p99_ms'))
+    for step, s in summary['steps'].items():
+        previous = baseline.get('steps', {}).get(step)
+        if previous:
+            check_higher_is_worse(f'{step} p95 (ms)', s['p95_ms'], previous.get('p95_ms'))
+
+    previous_rps = baseline.get('requests_per_s')
+    if previous_rps and summary['requests_per_s'] < previous_rps * (1 - tolerance):
+        regressions.append(f"throughput (req/s): {previous_rps:.1f} -> {summary['requests_per_s']:.1f}")
+
+    if summary['error_rate'] > baseline.get('error_rate', 0) + 0.01:
+        regressions.append(f"error rate: {baseline.get('error_rate', 0) * 100:.2f}% -> "
+                           f"{summary['error_rate'] * 100:.2f}%")
+
+    if 'db' in summary and 'db' in baseline:
+        if summary['db']['lock_errors'] > baseline['db']['lock_errors']:
+            regressions.append(f"db lock errors: {baseline['db']['lock_errors']:.0f} -> "
+                               f"{summary['db']['lock_errors']:.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay kiosk player journeys against a running server')
+    parser.add_argument('--base-url', default=os.environ.get('LOADTEST_URL', 'http://127.0.0.1:5000'))
+    parser.add_argument('--players', type=int, default=100, help='total journeys to play')
+    parser.add_argument('--concurrency', type=int, default=10, help='players in flight at once')
+    parser.add_argument('--questions', type=int, default=1, help='questions answered per journey')
+    parser.add_argument('--selfie-quality', type=int, default=85, help='JPEG quality of the uploaded selfie')
+    parser.add_argument('--insecure', action='store_true', help='skip TLS verification (self-signed certs)')
+    parser.add_argument('--admin-user', default=os.environ.get('ADMIN_USERNAME'))
+    parser.add_argument('--admin-password', default=os.environ.get('ADMIN_PASSWORD'))
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown (0.2 = 20%%)')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    selfie = make_selfie_jpeg(quality=args.selfie_quality)
+    selfie_data_url = 'data:image/jpeg;base64,' + base64.b64encode(selfie).decode('ascii')
+    print(f'Target {args.base_url}: {args.players} players, concurrency {args.concurrency}, '
+          f'{args.questions} question(s) each, selfie {len(selfie) // 1024}KB')
+
+    db_before = None
+    if args.admin_user and args.admin_password:
+        db_before = scrape_db_metrics(args.base_url, args.admin_user, args.admin_password, args.insecure)
+        if db_before is None:
+            print('Could not read /admin/api/metrics; database stats will be skipped')
+
+    recorder = Recorder()
+    counter = iter(range(args.players))
+    counter_lock = threading.Lock()
+
+    def worker():
+        while True:
+            with counter_lock:
+                player_number = next(counter, None)
+            if player_number is None:
+                return
+            client = Client(args.base_url, insecure=args.insecure)
+            try:
+                run_player(client, recorder, player_number, args.questions, selfie_data_url)
+            finally:
+                client.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    db_after = None
+    if db_before is not None:
+        db_after = scrape_db_metrics(args.base_url, args.admin_user, args.admin_password, args.insecure)
+
+    summary = summarize(recorder, elapsed, db_before, db_after)
+    print_report(summary, recorder.error_samples)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f'\nBaseline saved to {args.baseline}')
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(summary, baseline, args.tolerance)
+        if regressions:
+            print('\nREGRESSIONS against baseline:')
+            for regression in regressions:
+                print(f'  {regression}')
+            return 1
+        print('\nNo regressions against baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the fuzzy attendee matcher (name_match.py).
+
+Builds a trigram index over synthetic attendee names - first and last names
+from the bundled attendee list recombined, some with middle names and
+honorifics - then looks up names as attendees mistype them (a dropped,
+doubled, swapped or wrong letter, different spacing, an added "Dr.") and
+reports build time, index size, lookup latency and how often the intended
+attendee is the first or among the first five candidates (--memory adds
+the index size).
+
+Usage:
+    python benchmarks/name_match.py                  # 100k names, 2000 lookups
+    python benchmarks/name_match.py --names 20000 --queries 500 --memory
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from name_match import TrigramIndex, normalize_name  # noqa: E402
+
+NAMES_FILE = os.path.join(ROOT, 'bulk_uploads', 'names_20250914_230351.txt')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def synthetic_names(count, rng):
+    with open(NAMES_FILE, encoding='utf-8') as f:
+        parts = [line.split() for line in f if line.strip()]
+    firsts = sorted({p[0] for p in parts})
+    lasts = sorted({p[-1] for p in parts if len(p) > 1})
+    middles = sorted({p[1] for p in parts if len(p) > 2})
+
+    names = set()
+    while len(names) < count:
+        words = [rng.choice(firsts)]
+        if rng.random() < 0.2:
+            words.append(rng.choice(middles))
+        words.append(rng.choice(lasts))
+        names.add(' '.join(words))
+    return sorted(names)
+
+
+def mistype(name, rng):
+    """The name as an attendee might type it"""
+    chars = list(name)
+    position = rng.randrange(1, len(chars))
+    kind = rng.choice(['drop', 'double', 'swap', 'replace', 'spacing', 'honorific', 'case'])
+    if kind == 'drop':
+        del chars[position]
+    elif kind == 'double':
+        chars.insert(position, chars[position])
+    elif kind == 'swap' and position < len(chars) - 1:
+        chars[position], chars[position + 1] = chars[position + 1], chars[position]
+    elif kind == 'replace':
+        chars[position] = rng.choice(string.ascii_lowercase)
+    elif kind == 'spacing':
+        return name.replace(' ', '', 1) if ' ' in name else ' '.join(name)
+    elif kind == 'honorific':
+        return rng.choice(['Dr. ', 'Mr ', 'Ms. ', 'Shri ']) + name
+    elif kind == 'case':
+        return name.upper()
+    return ''.join(chars)
+
+
+def build_index(names):
+    index = TrigramIndex(normalize_name)
+    for attendee_id, name in enumerate(names):
+        index.add(attendee_id, name)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fuzzy attendee name lookup')
+    parser.add_argument('--names', type=int, default=100000, help='attendees in the index')
+    parser.add_argument('--queries', type=int, default=2000, help='mistyped lookups to time')
+    parser.add_argument('--min-score', type=float, default=0.5)
+    parser.add_argument('--budget-ms', type=float, default=50, help='scoring time budget per lookup')
+    parser.add_argument('--memory', action='store_true', help='also measure the index size')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = synthetic_names(args.names, rng)
+    print(f'{len(names)} synthetic attendee names')
+
+    started = time.perf_counter()
+    index = build_index(names)
+    build_seconds = time.perf_counter() - started
+    print(f'Built in {build_seconds:.2f}s ({len(names) / build_seconds:,.0f} names/s)')
+    if args.memory:
+        # A second build under tracemalloc, which slows it down too much to time
+        tracemalloc.start()
+        measured = build_index(names)
+        print(f'Index size ~{tracemalloc.get_traced_memory()[0] / 2**20:.0f}MB')
+        tracemalloc.stop()
+        del measured
+
+    targets = [rng.randrange(len(names)) for _ in range(args.queries)]
+    latencies = []
+    top1 = top5 = 0
+    for target in targets:
+        query = mistype(names[target], rng)
+        started = time.perf_counter()
+        results = index.search(query, limit=5, min_score=args.min_score, budget=args.budget_ms / 1000)
+        latencies.append(time.perf_counter() - started)
+        found = [entry_id for entry_id, _, _ in results]
+        # Another attendee with the same normalized name is as good a match
+        found_names = [normalize_name(names[entry_id]) for entry_id in found]
+        wanted = normalize_name(names[target])
+        top1 += bool(found_names[:1] == [wanted])
+        top5 += wanted in found_names
+
+    latencies.sort()
+    print(f'\nLookups: {len(targets)}')
+    print(f"  latency  p50 {percentile(latencies, 0.5) * 1000:.2f}ms  p95 {percentile(latencies, 0.95) * 1000:.2f}ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}ms  max {latencies[-1] * 1000:.2f}ms")
+    print(f'  found first {top1 / len(targets) * 100:.1f}%, in top 5 {top5 / len(targets) * 100:.1f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the question file parser (question_format.py).
+
+Writes a synthetic question file - questions from all_industries_questions.txt
+repeated with numbered variations across industries, some wrapped over two
+lines, plus a few deliberately broken or duplicated blocks - then parses it
+and reports throughput, peak memory, and whether every broken block was
+reported on the right line.
+
+Usage:
+    python benchmarks/question_parser.py                   # 100k questions
+    python benchmarks/question_parser.py --questions 20000 --broken 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from question_format import QuestionParser, parse_question_file  # noqa: E402
+
+SOURCE_FILE = os.path.join(ROOT, 'all_industries_questions.txt')
+
+
+def write_questions(path, count, broken, rng):
+    """Write the file; returns the line numbers where problems should be reported"""
+    records, _ = parse_question_file(SOURCE_FILE)
+    industries = sorted({record.industry for record in records})
+    broken_at = set(rng.sample(range(1, count), broken))
+    expected = []
+
+    with open(path, 'w', encoding='utf-8') as f:
+        line_number = 0
+
+        def write(text=''):
+            nonlocal line_number
+            f.write(text + '\n')
+            line_number += 1
+
+        per_industry = max(1, count // len(industries))
+        for n in range(count):
+            if n % per_industry == 0:
+                write(f'INDUSTRY: {industries[(n // per_industry) % len(industries)]}')
+                write()
+            record = records[n % len(records)]
+            question = f'{record.question} (variant {n})'
+            if n in broken_at:
+                kind = rng.choice(['missing option', 'bad answer', 'duplicate'])
+                if kind == 'duplicate' and n - 1 in broken_at:
+                    kind = 'bad answer'  # the question before was never accepted
+                if kind == 'duplicate':
+                    question = f'{records[(n - 1) % len(records)].question} (variant {n - 1})'
+                    record = records[(n - 1) % len(records)]
+                expected.append(line_number + 1 if kind != 'bad answer' else line_number + 6)
+            if n % 10 == 5 and n not in broken_at and ' ' in question:
+                # Wrapped onto a second line
+                first, rest = question.split(' ', 1)
+                write(f'{n % 40 + 1}. {first}')
+                write(rest)
+            else:
+                write(f'{n % 40 + 1}. {question}')
+            for letter, option in zip('ABCD', record.options):
+                if n in broken_at and kind == 'missing option' and letter == 'C':
+                    continue
+                write(f'{letter}. {option}')
+            answer = 'E' if n in broken_at and kind == 'bad answer' else record.correct_answer
+            write(f'Correct Answer: {answer}')
+            write()
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the question file parser')
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--broken', type=int, default=100, help='malformed or duplicated blocks to plant')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'questions.txt')
+        expected = write_questions(path, args.questions, args.broken, rng)
+        size = os.path.getsize(path)
+        print(f'{args.questions} questions, {size / 2**20:.1f}MB, {len(expected)} planted problems')
+
+        question_parser = QuestionParser()
+        started = time.perf_counter()
+        with open(path, encoding='utf-8') as f:
+            parsed = sum(1 for _ in question_parser.parse(f))
+        seconds = time.perf_counter() - started
+        print(f'Parsed {parsed} questions in {seconds:.2f}s '
+              f'({parsed / seconds:,.0f} questions/s, {size / 2**20 / seconds:.1f}MB/s)')
+
+        # Again under tracemalloc (too slow to time), streaming and discarding each record
+        tracemalloc.start()
+        with open(path, encoding='utf-8') as f:
+            for _ in QuestionParser().parse(f):
+                pass
+        print(f'Peak memory while streaming: {tracemalloc.get_traced_memory()[1] / 2**20:.1f}MB')
+        tracemalloc.stop()
+
+    reported = sorted(int(error.split(':', 1)[0][len('Line '):]) for error in question_parser.errors)
+    missed = sorted(set(expected) - set(reported))
+    print(f'Reported {len(question_parser.errors)} problems ({question_parser.duplicates} duplicates); '
+          f'{len(expected) - len(missed)}/{len(expected)} planted problems found on the right line')
+    if missed:
+        print(f'  missed lines: {missed[:10]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Slow-client benchmark: how a server copes while many connections are held open.
+
+Kiosk phones on event Wi-Fi upload selfies slowly, and booth screens keep a
+leaderboard stream open all day. This opens --slow clients that each either
+trickle a selfie-sized upload to /api/save-selfie a few KB at a time or sit
+on /api/leaderboard/stream, and meanwhile times a fast probe request (the
+landing page) every --probe-interval seconds. A server that gives every
+connection a thread shows probe latency climbing (or probes timing out) once
+the slow clients outnumber its threads; the ASGI path (asgi.py) should not.
+
+Usage:
+    gunicorn -w 1 --threads 8 app:app -b 127.0.0.1:5000      # WSGI, in another terminal
+    python benchmarks/slow_clients.py --slow 50
+    uvicorn asgi:application --port 5000                      # ASGI, in another terminal
+    python benchmarks/slow_clients.py --slow 50
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def read_response(reader):
+    """Status code and body of one HTTP/1.1 response"""
+    status_line = await reader.readline()
+    status = int(status_line.split()[1]) if status_line else 0
+    length = None
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value.strip())
+        elif name.lower() == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+
+    if length is not None:
+        return status, await reader.readexactly(length)
+    if chunked:
+        body = b''
+        while True:
+            size = int((await reader.readline()).strip() or b'0', 16)
+            if not size:
+                await reader.readline()
+                return status, body
+            body += await reader.readexactly(size)
+            await reader.readline()
+    return status, await reader.read()
+
+
+class Stats:
+    def __init__(self):
+        self.probes = []
+        self.probe_failures = 0
+        self.uploads_done = 0
+        self.upload_failures = 0
+        self.streams_open = 0
+        self.stream_failures = 0
+
+
+async def slow_upload(host, port, stats, payload, chunk_size, chunk_delay):
+    """Send one selfie a chunk at a time, like a phone on poor Wi-Fi"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write((f'POST /api/save-selfie HTTP/1.1\r\nHost: {host}\r\n'
+                      f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n'
+                      f'Connection: close\r\n\r\n').encode('latin-1'))
+        for offset in range(0, len(payload), chunk_size):
+            writer.write(payload[offset:offset + chunk_size])
+            await writer.drain()
+            await asyncio.sleep(chunk_delay)
+        status, _ = await read_response(reader)
+        writer.close()
+        # Without a player session the server may still reject it; what matters is that it answered
+        if status:
+            stats.uploads_done += 1
+        else:
+            stats.upload_failures += 1
+    except (OSError, asyncio.IncompleteReadError):
+        stats.upload_failures += 1
+
+
+async def idle_stream(host, port, stats, duration):
+    """Hold a leaderboard stream open, reading whatever the server pushes"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f'GET /api/leaderboard/stream HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n'
+                     .encode('latin-1'))
+        status_line = await asyncio.wait_for(reader.readline(), 10)
+        if b' 200 ' not in status_line:
+            stats.stream_failures += 1
+            writer.close()
+            return
+        stats.streams_open += 1
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            try:
+                if not await asyncio.wait_for(reader.read(4096), max(0.1, deadline - time.monotonic())):
+                    break
+            except asyncio.TimeoutError:
+                break
+        writer.close()
+    except (OSError, asyncio.TimeoutError):
+        stats.stream_failures += 1
+
+
+async def probe(host, port, stats, duration, interval, timeout):
+    """Time a cheap page request at a steady rate"""
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f'GET / HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+            status, _ = await asyncio.wait_for(read_response(reader), timeout)
+            writer.close()
+            if status == 200:
+                stats.probes.append(time.perf_counter() - started)
+            else:
+                stats.probe_failures += 1
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            stats.probe_failures += 1
+        await asyncio.sleep(interval)
+
+
+async def run(args):
+    parts = urlsplit(args.base_url)
+    host, port = parts.hostname, parts.port or 80
+    image = b'\xff\xd8\xff\xe0' + os.urandom(args.selfie_kb * 1024) + b'\xff\xd9'
+    payload = json.dumps({'image': 'data:image/jpeg;base64,' + base64.b64encode(image).decode('ascii')}).encode()
+    chunk_delay = args.duration / max(1, len(payload) // args.chunk_size)
+
+    stats = Stats()
+    streams = int(args.slow * args.stream_share)
+    tasks = [idle_stream(host, port, stats, args.duration) for _ in range(streams)]
+    tasks += [slow_upload(host, port, stats, payload, args.chunk_size, chunk_delay) for _ in range(args.slow - streams)]
+    tasks.append(probe(host, port, stats, args.duration, args.probe_interval, args.probe_timeout))
+
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return stats, time.perf_counter() - started, args.slow - streams, streams
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure request latency while slow clients hold connections open')
+    parser.add_argument('--base-url', default=os.environ.get('LOADTEST_URL', 'http://127.0.0.1:5000'))
+    parser.add_argument('--slow', type=int, default=50, help='slow clients held open at once')
+    parser.add_argument('--stream-share', type=float, default=0.5, help='fraction of slow clients on the leaderboard stream')
+    parser.add_argument('--duration', type=float, default=20, help='seconds each slow client lasts')
+    parser.add_argument('--selfie-kb', type=int, default=60, help='size of the trickled selfie')
+    parser.add_argument('--chunk-size', type=int, default=2048, help='bytes sent per upload step')
+    parser.add_argument('--probe-interval', type=float, default=0.5)
+    parser.add_argument('--probe-timeout', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f'Target {args.base_url}: {args.slow} slow clients for {args.duration:.0f}s')
+    stats, elapsed, uploads, streams = asyncio.run(run(args))
+
+    probes = sorted(stats.probes)
+    print(f'\nFinished in {elapsed:.1f}s')
+    print(f'  slow uploads   {stats.uploads_done}/{uploads} answered, {stats.upload_failures} failed')
+    print(f'  streams        {stats.streams_open}/{streams} opened, {stats.stream_failures} refused')
+    print(f'  probes         {len(probes)} ok, {stats.probe_failures} failed or timed out')
+    if probes:
+        print(f'  probe latency  p50 {percentile(probes, 0.5) * 1000:.0f}ms  '
+              f'p95 {percentile(probes, 0.95) * 1000:.0f}ms  max {probes[-1] * 1000:.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted, minified and precompressed static assets.
+
+Every file under static/ (except user uploads and the build output itself) is
+copied to static/dist/ under a content-hashed name, e.g.
+
+    static/css/main.css -> static/dist/css/main.3f2a9c1e.css (+ .gz, + .br)
+
+CSS is minified and its url(...) / @import references to other assets are
+rewritten to their fingerprinted names; JavaScript gets a conservative
+whitespace/comment strip. static/dist/manifest.json maps each source path to
+its built path, and the app (see assets.py) resolves url_for('static') through
+it and serves the built files with immutable caching.
+
+Brotli output needs the optional 'brotli' package; without it only .gz files
+are written.
+
+Usage:
+    python build_assets.py            # build into static/dist
+    python build_assets.py --clean    # remove static/dist first
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'static')
+DIST_DIR_NAME = 'dist'
+DIST_DIR = os.path.join(STATIC_DIR, DIST_DIR_NAME)
+
+# Not build inputs: player selfies and previous build output
+SKIP_DIRS = {'uploads', 'dist'}
+
+# Compressing these gains nothing
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+MIN_COMPRESS_SIZE = 512  # bytes
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)|@import\s+(['"])([^'"]+)\3''')
+
+
+def find_sources():
+    """Static files to build, as paths relative to static/ with forward slashes"""
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(STATIC_DIR):
+        rel_dir = os.path.relpath(dirpath, STATIC_DIR)
+        if rel_dir == '.':
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for filename in filenames:
+            if filename.startswith('.'):
+                continue
+            path = os.path.normpath(os.path.join(rel_dir, filename)).replace(os.sep, '/')
+            sources.append(path)
+    return sorted(sources)
+
+
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    # Only after the colon: "a :hover" (descendant pseudo-class) needs the space before it
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_js(js):
+    """Strip indentation, blank lines and whole-line comments; keeps line breaks (ASI-safe)"""
+    lines = []
+    in_template = False
+    in_comment = False
+    for line in js.splitlines():
+        if in_template:
+            # Inside a multi-line template literal the whitespace is content
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if in_comment:
+                if '*/' in stripped:
+                    in_comment = False
+                    stripped = stripped.split('*/', 1)[1].strip()
+                else:
+                    continue
+            if stripped.startswith('/*') and '*/' not in stripped:
+                in_comment = True
+                continue
+            if not stripped or stripped.startswith('//'):
+                continue
+            lines.append(stripped)
+        # Count unescaped backticks to know whether a template literal stays open
+        if len(re.findall(r'(?<!\\)`', line)) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+def rewrite_css_urls(css, source, manifest):
+    """Point url()/@import references at fingerprinted files, relative to the built CSS"""
+    source_dir = posixpath.dirname(source)
+    built_dir = posixpath.join(DIST_DIR_NAME, source_dir)
+
+    def replace(match):
+        ref = match.group(2) or match.group(4)
+        if re.match(r'^(?:[a-z]+:|//|#|/)', ref):
+            return match.group(0)  # External, data: or absolute URLs stay as they are
+        target = posixpath.normpath(posixpath.join(source_dir, ref.split('?')[0].split('#')[0]))
+        built = manifest.get(target)
+        if not built:
+            return match.group(0)
+        new_ref = posixpath.relpath(built, built_dir)
+        return match.group(0).replace(ref, new_ref)
+
+    return CSS_URL.sub(replace, css)
+
+
+def css_dependencies(source, css):
+    source_dir = posixpath.dirname(source)
+    deps = []
+    for match in CSS_URL.finditer(css):
+        ref = match.group(2) or match.group(4)
+        if not re.match(r'^(?:[a-z]+:|//|#|/)', ref):
+            deps.append(posixpath.normpath(posixpath.join(source_dir, ref.split('?')[0].split('#')[0])))
+    return deps
+
+
+def fingerprinted_name(source, content):
+    digest = hashlib.sha256(content).hexdigest()[:8]
+    stem, ext = posixpath.splitext(source)
+    return f'{DIST_DIR_NAME}/{stem}.{digest}{ext}'
+
+
+def write_output(built, content, stats):
+    path = os.path.join(STATIC_DIR, built)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    stats['files'] += 1
+    stats['bytes'] += len(content)
+
+    ext = os.path.splitext(built)[1]
+    if ext not in COMPRESSIBLE or len(content) < MIN_COMPRESS_SIZE:
+        return
+    with open(path + '.gz', 'wb') as f:
+        # mtime=0 keeps the output byte-identical across builds
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    stats['gz'] += os.path.getsize(path + '.gz')
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+        stats['br'] += os.path.getsize(path + '.br')
+
+
+def build():
+    sources = find_sources()
+    manifest = {}
+    stats = {'files': 0, 'bytes': 0, 'source_bytes': 0, 'gz': 0, 'br': 0}
+
+    # Plain files first, then CSS in dependency order so references resolve
+    texts = {}
+    for source in sources:
+        with open(os.path.join(STATIC_DIR, source), 'rb') as f:
+            data = f.read()
+        stats['source_bytes'] += len(data)
+        if source.endswith('.css'):
+            texts[source] = data.decode('utf-8')
+            continue
+        if source.endswith('.js'):
+            data = minify_js(data.decode('utf-8')).encode('utf-8')
+        manifest[source] = fingerprinted_name(source, data)
+        write_output(manifest[source], data, stats)
+
+    def build_css(source, visiting=()):
+        if source in manifest or source not in texts:
+            return
+        if source in visiting:
+            raise SystemExit(f'Circular CSS import involving {source}')
+        for dep in css_dependencies(source, texts[source]):
+            build_css(dep, visiting + (source,))
+        # Hashed after rewriting, so a changed dependency renames this file too
+        data = rewrite_css_urls(minify_css(texts[source]), source, manifest).encode('utf-8')
+        manifest[source] = fingerprinted_name(source, data)
+        write_output(manifest[source], data, stats)
+
+    for source in texts:
+        build_css(source)
+
+    with open(os.path.join(DIST_DIR, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'assets': manifest}, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return manifest, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build fingerprinted, minified and precompressed static assets')
+    parser.add_argument('--clean', action='store_true', help='remove static/dist before building')
+    args = parser.parse_args()
+
+    if args.clean and os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR, exist_ok=True)
+
+    manifest, stats = build()
+    for source, built in sorted(manifest.items()):
+        print(f'  {source} -> {built}')
+    print(f"Built {len(manifest)} assets: {stats['source_bytes']} bytes -> {stats['bytes']} minified, "
+          f"{stats['gz']} gzip" + (f", {stats['br']} brotli" if brotli is not None else ' (install brotli for .br)'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
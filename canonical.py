@@ -0,0 +1,264 @@
+"""
+Canonical company and industry names for bulk registrant uploads.
+
+Attendee lists are typed by hand: the same industry arrives as "BFSI" and
+"BFSI ", the same company as "Hero Moto corp" and "Hero MotoCorp", and every
+spelling used to become a value of its own in the leaderboards, reports and
+suggestions. An upload is canonicalized as a whole before anything is
+written, one kind of value at a time and over distinct values only:
+
+1. normalization - spellings with the same key (industry_stats.industry_key
+   for industries, company_key for companies) are one value;
+2. aliases - NameAlias rows map a spelling to the name it stands for
+   ("Pharma" -> "Healthcare/Pharma"), for merges no rule could guess;
+3. similarity - remaining values are clustered by trigram Dice similarity,
+   most frequent first, each joining the closest existing cluster above
+   CANONICAL_SIMILARITY ("Financial Service" -> "Financial Services").
+
+Names already in the database win, so later uploads reuse earlier spellings.
+Otherwise a cluster is named by its most frequent spelling. Every merge is
+listed in a report returned with the upload, so an admin can see what
+changed and add an alias where a merge was missed.
+"""
+
+import re
+from collections import Counter
+
+from sqlalchemy import func, or_
+
+from industry_stats import clean_industry, industry_key
+from name_match import normalize_name, split_words, trigrams
+
+KINDS = ('company', 'industry')
+
+# Legal forms only: "Corp" or "Group" is often part of the name ("Hero Moto Corp", "TVS Group")
+LEGAL_SUFFIXES = {'pvt', 'private', 'ltd', 'limited', 'llp', 'inc', 'incorporated', 'plc', 'gmbh', 'llc'}
+
+
+def clean_value(value):
+    """Display form of an uploaded name, company or industry: tidy spacing, no invisible characters"""
+    return clean_industry(value)
+
+
+def company_key(value):
+    """Key under which spellings of the same company are merged ("Infosys Ltd." is "infosys")"""
+    words = split_words(value)
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words = words[:-1]
+    return ''.join(words)
+
+
+class Cluster:
+    """Spellings merged into one canonical value"""
+
+    __slots__ = ('key', 'grams', 'canonical', 'known', 'spellings', 'variants')
+
+    def __init__(self, key, canonical=None, known=False):
+        self.key = key
+        self.grams = trigrams(key)
+        self.canonical = canonical  # set for values already in the database or named by an alias
+        self.known = known  # already in the database
+        self.spellings = Counter()  # cleaned spelling -> rows
+        self.variants = {}  # raw uploaded value -> (rows, mapped by an alias)
+
+    def name(self):
+        if self.canonical is not None:
+            return self.canonical
+        # Most frequent spelling; on a tie one that isn't all lower case, then alphabetical
+        return max(self.spellings.items(), key=lambda item: (item[1], not item[0].islower(), item[0]))[0]
+
+
+class Canonicalizer:
+    """Canonical spellings for one kind of value, built fresh for each upload"""
+
+    def __init__(self, key, threshold=0.85, min_length=5):
+        self.key = key
+        self.threshold = threshold
+        self.min_length = min_length  # shorter keys (acronyms) are only merged by rule or alias
+        self._clusters = {}  # key -> Cluster
+        self._aliases = {}  # alias key -> canonical value
+        self._postings = {}  # trigram -> [Cluster] eligible for similarity matching
+
+    def add_known(self, value):
+        """A canonical value already in use; uploads matching it adopt its spelling"""
+        value = clean_value(value)
+        key = self.key(value)
+        # An aliased spelling stands for another value, even if rows still use it
+        if key and key not in self._clusters and key not in self._aliases:
+            self._add_cluster(Cluster(key, value, known=True))
+
+    def add_alias(self, alias, canonical):
+        """A spelling that stands for another value (add aliases before known values)"""
+        alias_key = self.key(alias)
+        if alias_key:
+            self._aliases[alias_key] = clean_value(canonical)
+
+    def _add_cluster(self, cluster):
+        self._clusters[cluster.key] = cluster
+        if len(cluster.key) >= self.min_length:
+            for gram in cluster.grams:
+                self._postings.setdefault(gram, []).append(cluster)
+
+    def _similar(self, key):
+        """The most similar cluster at or above the threshold, if any"""
+        if len(key) < self.min_length:
+            return None
+        grams = trigrams(key)
+        candidates = {}
+        shared = Counter()
+        for gram in grams:
+            for cluster in self._postings.get(gram, ()):
+                candidates[id(cluster)] = cluster
+                shared[id(cluster)] += 1
+        digits = re.sub(r'\D', '', key)
+        best, best_score = None, 0
+        for cluster_id, count in shared.items():
+            cluster = candidates[cluster_id]
+            score = 2 * count / (len(grams) + len(cluster.grams))
+            # "Phase 1" and "Phase 2" are close in spelling but never the same thing
+            if score > best_score and score >= self.threshold and re.sub(r'\D', '', cluster.key) == digits:
+                best, best_score = cluster, score
+        return best
+
+    def canonicalize(self, values):
+        """Canonical value for each uploaded value (same order), and the merge report"""
+        raw_counts = Counter(values)
+        # Distinct keys, most frequent first, so the common spelling leads its cluster
+        by_key = {}
+        for raw, count in raw_counts.items():
+            key = self.key(raw)
+            if key:
+                by_key.setdefault(key, Counter())[raw] += count
+
+        mapping = {}
+        for key, raws in sorted(by_key.items(), key=lambda item: (-sum(item[1].values()), item[0])):
+            aliased = key in self._aliases
+            if aliased:
+                canonical = self._aliases[key]
+                canonical_key = self.key(canonical)
+                cluster = self._clusters.get(canonical_key)
+                if cluster is None:
+                    cluster = Cluster(canonical_key, canonical)
+                    self._add_cluster(cluster)
+            else:
+                cluster = self._clusters.get(key) or self._similar(key)
+            if cluster is None:
+                cluster = Cluster(key)
+                self._add_cluster(cluster)
+
+            for raw, count in raws.items():
+                cluster.spellings[clean_value(raw)] += count
+                cluster.variants[raw] = (count, aliased)
+                mapping[raw] = cluster
+
+        names = {cluster: cluster.name() for cluster in mapping.values()}
+        canonical_values = [names[mapping[value]] if value in mapping else clean_value(value) for value in values]
+        return canonical_values, self._report(raw_counts, mapping, names)
+
+    def _report(self, raw_counts, mapping, names):
+        merges = []
+        for cluster, canonical in names.items():
+            canonical_key = self.key(canonical)
+            canonical_grams = trigrams(canonical_key)
+            changed = []
+            for raw, (count, aliased) in sorted(cluster.variants.items()):
+                if raw == canonical:
+                    continue
+                # How the spelling relates to the name it became, whichever member it first joined
+                key = self.key(raw)
+                if aliased:
+                    rule, score = 'alias', None
+                elif key == canonical_key:
+                    rule, score = 'normalized', 1.0
+                else:
+                    grams = trigrams(key)
+                    rule, score = 'similar', round(2 * len(grams & canonical_grams) / (len(grams) + len(canonical_grams)), 3)
+                changed.append({'value': raw, 'rows': count, 'rule': rule, 'score': score})
+            if changed:
+                merges.append({
+                    'canonical': canonical,
+                    'existing': cluster.known,
+                    'rows': sum(count for count, _ in cluster.variants.values()),
+                    'variants': changed,
+                })
+        merges.sort(key=lambda merge: (-merge['rows'], merge['canonical']))
+        return {
+            'distinct_before': len(raw_counts),
+            'distinct_after': len(set(names.values())),
+            'merges': merges,
+        }
+
+
+class RegistrantCanonicalizer:
+    """Canonicalizes and de-duplicates registrant uploads against the database"""
+
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.PreRegisteredUser = None
+        self.Industry = None
+        self.NameAlias = None
+        self.threshold = 0.85
+
+    def init_app(self, app, db, registrant_model, industry_model, alias_model):
+        self.app = app
+        self.db = db
+        self.PreRegisteredUser = registrant_model
+        self.Industry = industry_model
+        self.NameAlias = alias_model
+        self.threshold = app.config.get('CANONICAL_SIMILARITY', 0.85)
+
+    def _canonicalizers(self):
+        """A canonicalizer per kind, seeded with the values and aliases in the database"""
+        Attendee = self.PreRegisteredUser
+        session = self.db.session
+        canonicalizers = {
+            'company': Canonicalizer(company_key, self.threshold),
+            'industry': Canonicalizer(industry_key, self.threshold),
+        }
+        for alias in session.query(self.NameAlias).order_by(self.NameAlias.id):
+            canonicalizers[alias.kind].add_alias(alias.alias, alias.canonical)
+        # The industry catalog first, then spellings in use, most common first
+        for (name,) in session.query(self.Industry.name).order_by(self.Industry.id):
+            canonicalizers['industry'].add_known(name)
+        for kind, column in (('company', Attendee.company_name), ('industry', Attendee.industry)):
+            rows = session.query(column, func.count()).filter(column.isnot(None)).group_by(column)
+            for value, _ in sorted(rows, key=lambda row: -row[1]):
+                canonicalizers[kind].add_known(value)
+        return canonicalizers
+
+    def canonicalize(self, rows):
+        """Canonical (name, company, industry) rows for an upload, and the merge report.
+
+        Rows are (name, company, industry) tuples as uploaded, in order.
+        """
+        canonicalizers = self._canonicalizers()
+        names = [clean_value(name) for name, _, _ in rows]
+        companies, company_report = canonicalizers['company'].canonicalize([row[1] for row in rows])
+        industries, industry_report = canonicalizers['industry'].canonicalize([row[2] for row in rows])
+        return list(zip(names, companies, industries)), {'company': company_report, 'industry': industry_report}
+
+    def duplicates(self, rows, event_id=None):
+        """Canonical rows already registered (for the event or shared) or repeated in the upload.
+
+        Returns {row index: index of the earlier row it repeats, or None if registered}.
+        """
+        Attendee = self.PreRegisteredUser
+        seen = {
+            (normalize_name(name), company_key(company), industry_key(industry)): None
+            for name, company, industry in self.db.session.query(
+                Attendee.name, Attendee.company_name, Attendee.industry
+            ).filter(or_(Attendee.event_id.is_(None), Attendee.event_id == event_id))
+        }
+        duplicate_rows = {}
+        for index, (name, company, industry) in enumerate(rows):
+            key = (normalize_name(name), company_key(company), industry_key(industry))
+            if key in seen:
+                duplicate_rows[index] = seen[key]
+            else:
+                seen[key] = index
+        return duplicate_rows
+
+
+# Process-wide canonicalizer
+canonicalizer = RegistrantCanonicalizer()
@@ -22,6 +22,85 @@ class Config:
         'X-XSS-Protection': '1; mode=block',
         'Strict-Transport-Security': 'max-age=31536000; includeSubDomains'
     }
+    
+    # Instrumentation (exposed at /admin/api/metrics)
+    METRICS_ENABLED = True
+    # Per-request sampling profiler, triggered with "X-Profile: <PROFILING_TOKEN>"
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')  # shared secret; profiling stays off without it
+    PROFILER_INTERVAL = 0.005  # seconds between stack samples
+    
+    # Per-request query budgets and N+1 detection (see metrics.query_budget)
+    QUERY_BUDGET_ENABLED = False
+    QUERY_REPEAT_THRESHOLD = 3  # identical statement shapes per request before flagging
+    
+    # Write-behind buffer for answer rows (see answer_log.py)
+    ANSWER_LOG_ENABLED = True
+    ANSWER_LOG_BATCH_SIZE = 50  # rows per INSERT batch
+    ANSWER_LOG_FLUSH_INTERVAL = 1.0  # seconds between flushes
+    ANSWER_LOG_MAX_QUEUE = 10000  # answers buffered before requests wait for the flusher
+    ANSWER_LOG_FSYNC = True  # fsync the journal on every answer
+    
+    # Event archiving (see event_archive.py)
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR')  # default: instance/archive
+    ARCHIVE_DATABASE_URL = os.environ.get('ARCHIVE_DATABASE_URL')  # optional second copy in another database
+    ARCHIVE_CHUNK_SIZE = 500  # rows per DELETE transaction
+    ARCHIVE_CHUNK_PAUSE = 0.05  # seconds between chunks so live writes get the lock
+    ARCHIVE_GRACE_PERIOD = 10  # seconds after closing an event before archiving starts
+    QUESTION_BANK_CHECK_INTERVAL = 2  # seconds between checks of a question file's modification time
+    EVENT_CACHE_TTL = 5  # seconds an event slug -> id lookup is cached per process
+    EVENT_CACHE_SIZE = 8  # events whose question bank and autocomplete index stay in memory (LRU)
+    EVENT_CONTEXT_TTL = 300  # seconds before a cached event re-checks its settings
+    SUGGESTION_CACHE_SIZE = 1024  # autocomplete results cached per event, by (type, query)
+    SUGGESTION_INDEX_MAX_AGE = 600  # seconds a kiosk searches its downloaded index before refreshing it
+    NAME_MATCH_MIN_SCORE = 0.5  # trigram similarity (0-1) a pre-registered name or company needs to be offered
+    NAME_MATCH_BUDGET_MS = 50  # time allowed to score one fuzzy lookup
+    NAME_MATCH_REBUILD_INTERVAL = 600  # seconds; full rebuilds pick up attendees edited by other workers
+    CANONICAL_SIMILARITY = 0.85  # trigram similarity at which uploaded company/industry spellings are merged
+    QUESTION_SIMILARITY = 0.6  # shingle (Jaccard) similarity at which questions are listed as near duplicates
+    
+    # Popular industries ranked from live data (see industry_stats.py)
+    INDUSTRY_STATS_ENABLED = True
+    INDUSTRY_STATS_TOP_K = 8  # industries highlighted on the selection page
+    INDUSTRY_STATS_INTERVAL = 30  # seconds between re-rankings of new counts
+    INDUSTRY_STATS_RECOUNT_INTERVAL = 600  # seconds between full recounts from the database
+    
+    # Rendered game pages cached as bytes with ETags (see render_cache.py)
+    RENDER_CACHE_ENABLED = True
+    RENDER_CACHE_SIZE = 256  # distinct rendered pages kept (LRU)
+    
+    # Let a front proxy (nginx X-Accel / Apache mod_xsendfile) send static files
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+    
+    # Batched answers (/api/submit-answers)
+    SUBMIT_ANSWERS_MAX_BATCH = 100  # answers accepted per request
+    
+    # Offline kiosk mode: question packs, service worker and /api/sync (see offline_sync.py)
+    OFFLINE_KIOSK_ENABLED = True
+    OFFLINE_SYNC_MAX_BATCH = 50  # queued items accepted per /api/sync request
+    OFFLINE_SYNC_TOKEN_MAX_AGE = 86400  # seconds a kiosk may hold queued items before they are rejected
+    OFFLINE_SYNC_REMEMBER = 10000  # recently synced item ids remembered to drop resends
+    
+    # Live leaderboard and dashboard over server-sent events (see live_stats.py)
+    LIVE_STATS_ENABLED = True
+    LIVE_STATS_TOP_N = 10  # entries per board in a snapshot
+    LIVE_STATS_MAX_VIEWERS = 500  # concurrent streams per process
+    LIVE_STATS_MAX_WSGI_VIEWERS = 1  # of those under WSGI, where each holds one of the GUNICORN_THREADS; others poll
+    LIVE_STATS_HEARTBEAT = 15  # seconds between keepalives on an idle stream
+    LIVE_STATS_BACKLOG = 1000  # messages kept for viewers resuming with Last-Event-ID
+    LIVE_STATS_RECOUNT_INTERVAL = 60  # seconds between rebuilds from the database
+    
+    # asgi.py: network I/O on the event loop, views on a bounded thread pool
+    ASGI_MAX_REQUESTS = 1000  # requests in flight per worker before answering 503
+    ASGI_MAX_BUFFERED = 64 * 1024 * 1024  # bytes of request bodies held in memory per worker before answering 503
+    ASGI_THREADS = None  # view threads per worker; default min(32, 4 x CPU count)
+    ASGI_FILE_THREADS = 4  # threads reading files for responses
+    
+    # Rate limiting and concurrency caps on the public APIs (see ratelimit.py)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    RATELIMIT_STORAGE_URL = 'memory://'  # or sqlite:///path to share buckets between worker processes
+    RATELIMIT_MAX_KEYS = 100000  # buckets kept in memory before the least recently used are dropped
+    RATELIMIT_PROXY_COUNT = int(os.environ.get('RATELIMIT_PROXY_COUNT', 0))  # trusted proxies setting X-Forwarded-For
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -29,6 +108,7 @@ class DevelopmentConfig(Config):
     SESSION_COOKIE_SECURE = False  # Allow HTTP in development
     SESSION_COOKIE_HTTPONLY = False  # Allow for development
     SESSION_COOKIE_SAMESITE = None  # Disable for development
+    QUERY_BUDGET_ENABLED = True  # Log requests that exceed their query budget
     
 class ProductionConfig(Config):
     """Production configuration"""
@@ -41,8 +121,8 @@ class ProductionConfig(Config):
     LOG_LEVEL = 'INFO'
     LOG_FILE = 'app.log'
     
-    # Rate limiting
-    RATELIMIT_STORAGE_URL = 'memory://'
+    # Rate limiting: buckets shared by the gunicorn workers
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'sqlite:///instance/ratelimit.db')
     
 class TestingConfig(Config):
     """Testing configuration"""
@@ -50,6 +130,11 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     SESSION_COOKIE_SECURE = False
+    QUERY_BUDGET_ENABLED = True  # Raise QueryBudgetExceeded so tests fail
+    ANSWER_LOG_ENABLED = False  # Write answers synchronously so tests see them at once
+    INDUSTRY_STATS_ENABLED = False  # Keep the default highlighted industries; no background thread
+    LIVE_STATS_ENABLED = False  # No background recount thread
+    RATELIMIT_ENABLED = False  # Tests fire requests faster than any kiosk
 
 # Configuration dictionary
 config = {
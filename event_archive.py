@@ -0,0 +1,235 @@
+"""
+Event-scoped retention for game sessions and user journeys.
+
+Every journey and answer row carries the id of the event (conference, season)
+it was played at. Closing an event starts a new one straight away, so play is
+never interrupted; the closed event's rows are then written to a compressed
+JSONL file (and optionally copied to a separate archive database) and removed
+from the hot tables in small chunks, each in its own short transaction, so
+live writers are never blocked behind one long DELETE.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, func, insert, select
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class EventArchive:
+    """Closes events and archives their rows"""
+
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.Event = None
+        self.tables = []
+        self.archive_dir = None
+        self.chunk_size = 500
+        self.chunk_pause = 0.05
+        self.grace_period = 10
+
+        self._lock = threading.Lock()
+        self._running = set()
+        self._archive_engine = None
+        self._archive_tables = None
+
+    def init_app(self, app, db, event_model, models):
+        """models: the event-scoped models, children first (they are deleted in this order)"""
+        self.app = app
+        self.db = db
+        self.Event = event_model
+        self.tables = [model.__table__ for model in models]
+        self.archive_dir = app.config.get('ARCHIVE_DIR') or os.path.join(app.instance_path, 'archive')
+        self.chunk_size = app.config.get('ARCHIVE_CHUNK_SIZE', 500)
+        self.chunk_pause = app.config.get('ARCHIVE_CHUNK_PAUSE', 0.05)
+        self.grace_period = app.config.get('ARCHIVE_GRACE_PERIOD', 10)
+
+    # -- closing ----------------------------------------------------------------
+
+    def close_event(self, event_id, next_name=None):
+        """End an open event and start its successor; returns the closed event.
+
+        The successor takes over the slug and settings, so kiosks pointed at
+        the event carry on without being reconfigured.
+        """
+        now = datetime.utcnow()
+        closed = self.db.session.get(self.Event, event_id)
+        if closed is None:
+            raise ValueError(f'Event {event_id} not found')
+        if closed.ended_at is not None:
+            raise ValueError('This event is already closed')
+        closed.ended_at = now
+
+        opened = self.Event(
+            name=next_name or f"{closed.name} ({now:%Y-%m-%d %H:%M})",
+            slug=closed.slug,
+            question_file=closed.question_file,
+            highlighted_industries=closed.highlighted_industries,
+            started_at=now
+        )
+        self.db.session.add(opened)
+        self.db.session.commit()
+        return closed
+
+    # -- archiving --------------------------------------------------------------
+
+    def hot_row_counts(self):
+        """Rows still in the hot tables, as {event_id: {table: count}}"""
+        counts = {}
+        for table in self.tables:
+            rows = self.db.session.execute(
+                select(table.c.event_id, func.count()).group_by(table.c.event_id)
+            ).all()
+            for event_id, count in rows:
+                counts.setdefault(event_id, {})[table.name] = count
+        return counts
+
+    def archive_event_async(self, event_id, delay=None):
+        """Archive a closed event on a background thread; returns False if one is already running"""
+        with self._lock:
+            if event_id in self._running:
+                return False
+            self._running.add(event_id)
+
+        delay = self.grace_period if delay is None else delay
+        thread = threading.Thread(target=self._archive_in_background, args=(event_id, delay),
+                                  name=f'event-archive-{event_id}', daemon=True)
+        thread.start()
+        return True
+
+    def _archive_in_background(self, event_id, delay):
+        try:
+            # Let in-flight answers from the write-behind log land first
+            time.sleep(delay)
+            with self.app.app_context():
+                self.archive_event(event_id)
+        except Exception as e:
+            self.app.logger.error(f'Archiving event {event_id} failed: {e}')
+        finally:
+            with self._lock:
+                self._running.discard(event_id)
+
+    def archive_event(self, event_id):
+        """Write a closed event's rows to the archive, then delete them in chunks"""
+        event = self.db.session.get(self.Event, event_id)
+        if event is None:
+            raise ValueError(f'Event {event_id} not found')
+        if event.ended_at is None:
+            raise ValueError('Close the event before archiving it')
+
+        # Phase 1: copy everything out. Nothing is deleted until the file is complete.
+        os.makedirs(self.archive_dir, exist_ok=True)
+        # Each run gets its own file; a re-archive never replaces an earlier one
+        path = os.path.join(self.archive_dir, f'event-{event.id}-{datetime.utcnow():%Y%m%d%H%M%S%f}.jsonl.gz')
+        temp_path = path + '.tmp'
+        archived = {}
+        with open(temp_path, 'xb') as raw:
+            with gzip.open(raw, 'wt', encoding='utf-8') as archive:
+                header = {'event': {'id': event.id, 'name': event.name,
+                                    'started_at': event.started_at, 'ended_at': event.ended_at}}
+                archive.write(json.dumps(header, default=_json_default) + '\n')
+                for table in self.tables:
+                    archived[table.name] = self._copy_table(table, event_id, archive)
+            raw.flush()
+            os.fsync(raw.fileno())
+        if not any(count for count, _ in archived.values()):
+            os.remove(temp_path)
+            return {'path': None, 'archived': {}, 'deleted': {}}
+        try:
+            os.link(temp_path, path)  # Fails rather than overwrite an existing archive
+        finally:
+            os.remove(temp_path)
+
+        # Phase 2: delete only what was archived; rows that arrived meanwhile stay
+        # behind for the next run
+        deleted = {}
+        for table in self.tables:
+            count, max_id = archived[table.name]
+            deleted[table.name] = self._delete_chunked(table, event_id, max_id) if count else 0
+
+        event.archived_at = datetime.utcnow()
+        event.archive_path = path
+        event.archived_sessions = (event.archived_sessions or 0) + deleted.get('game_session', 0)
+        event.archived_journeys = (event.archived_journeys or 0) + deleted.get('user_journey', 0)
+        self.db.session.commit()
+
+        self.app.logger.info(f'Archived event {event_id} to {os.path.basename(path)}: {deleted}')
+        return {'path': path, 'archived': {name: count for name, (count, _) in archived.items()}, 'deleted': deleted}
+
+    def _copy_table(self, table, event_id, archive):
+        """Stream one table's rows for the event into the archive; returns (count, max id)"""
+        count = 0
+        last_id = 0
+        while True:
+            rows = self.db.session.execute(
+                select(table).where(table.c.event_id == event_id, table.c.id > last_id)
+                .order_by(table.c.id).limit(self.chunk_size)
+            ).mappings().all()
+            if not rows:
+                break
+            rows = [dict(row) for row in rows]
+            for row in rows:
+                archive.write(json.dumps({'table': table.name, 'row': row}, default=_json_default) + '\n')
+            self._copy_to_archive_database(table, rows)
+            count += len(rows)
+            last_id = rows[-1]['id']
+        self.db.session.rollback()  # End the read transaction between phases
+        return count, last_id
+
+    def _delete_chunked(self, table, event_id, max_id):
+        deleted = 0
+        while True:
+            chunk = select(table.c.id).where(
+                table.c.event_id == event_id, table.c.id <= max_id
+            ).order_by(table.c.id).limit(self.chunk_size).scalar_subquery()
+            result = self.db.session.execute(table.delete().where(table.c.id.in_(chunk)))
+            self.db.session.commit()
+            deleted += result.rowcount
+            if result.rowcount < self.chunk_size:
+                return deleted
+            # Give live requests a turn at the write lock
+            time.sleep(self.chunk_pause)
+
+    def _copy_to_archive_database(self, table, rows):
+        url = self.app.config.get('ARCHIVE_DATABASE_URL')
+        if not url:
+            return
+        if self._archive_engine is None:
+            # Same columns, no foreign keys: the archive holds no users or questions. The
+            # archive has its own key, since SQLite can hand a deleted row's id to a new row.
+            metadata = MetaData()
+            self._archive_tables = {
+                source.name: Table(source.name, metadata, Column('archive_id', Integer, primary_key=True), *[
+                    Column(column.name, column.type, index=column.primary_key)
+                    for column in source.columns
+                ])
+                for source in self.tables
+            }
+            self._archive_engine = create_engine(url)
+            metadata.create_all(self._archive_engine)
+        archive_table = self._archive_tables[table.name]
+        copied = {(row['id'], row['created_at']) for row in rows}
+        with self._archive_engine.begin() as conn:
+            # Rows copied by an earlier run that failed before deleting them are replaced, not duplicated
+            earlier = [archive_id for archive_id, row_id, created_at in conn.execute(
+                select(archive_table.c.archive_id, archive_table.c.id, archive_table.c.created_at).where(
+                    archive_table.c.event_id == rows[0]['event_id'],
+                    archive_table.c.id.in_([row['id'] for row in rows]))
+            ) if (row_id, created_at) in copied]
+            if earlier:
+                conn.execute(archive_table.delete().where(archive_table.c.archive_id.in_(earlier)))
+            conn.execute(insert(archive_table), rows)
+
+
+# Process-wide event archive
+event_archive = EventArchive()
@@ -0,0 +1,62 @@
+"""
+Gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app             # HTTP on $PORT (default 5000)
+    HTTPS=1 gunicorn -c gunicorn.conf.py wsgi:app     # HTTPS with cached certificates (see tls.py)
+
+Workers are sized from the CPU count, each with a few threads (gthread) so
+that uploads and leaderboard streams do not block the other players. The
+app is preloaded in the master and workers are forked from it, sharing the
+parsed question bank copy-on-write.
+
+Reloading without dropping requests:
+    kill -HUP $(cat instance/gunicorn.pid)     # new workers, old ones finish their requests
+    kill -USR2 $(cat instance/gunicorn.pid)    # new code: starts a new master next to the old one,
+                                               # then send the old master (gunicorn.pid.oldbin) TERM
+HUP re-forks workers from the preloaded master, so it does not pick up code
+changes; use USR2 for a deploy.
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+pidfile = os.environ.get('GUNICORN_PIDFILE', os.path.join('instance', 'gunicorn.pid'))
+
+# SQLite takes one writer at a time, so past a handful of processes extra workers only add lock waits
+workers = int(os.environ.get('WEB_CONCURRENCY', min(cpu_count * 2 + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))  # per worker; each open leaderboard stream holds one
+preload_app = True
+
+timeout = 60  # seconds a worker may go silent before it is restarted
+graceful_timeout = 30  # seconds workers get to finish in-flight requests on reload or shutdown
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))  # recycle workers after N requests (0 = never)
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+if os.environ.get('HTTPS', '').lower() in ('1', 'true', 'yes') or os.environ.get('SSL_CERTFILE'):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from tls import certificate_paths
+    certfile, keyfile = certificate_paths()
+
+
+def when_ready(server):
+    # The preloaded app is built; keep the collector from touching (and so copying) its objects in workers
+    gc.freeze()
+    server.log.info(f"Ready: {server.cfg.workers} workers x {server.cfg.threads} threads")
+
+
+def worker_exit(server, worker):
+    # Write out buffered answers before the process goes away
+    answer_log = sys.modules.get('answer_log')
+    if answer_log is not None:
+        answer_log.answer_log.close()
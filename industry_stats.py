@@ -0,0 +1,219 @@
+"""
+Live industry statistics for the "Popular Industries" section.
+
+Industry strings from registrant uploads and player journeys are normalized
+("BFSI ", "bfsi" and "BFSI" are one industry) and counted per event. Players
+send whatever string they like, so journeys only count towards industries
+already in the catalog; only the admin's registrant uploads can put a new
+industry in the ranking (and so in the catalog, see seed_catalog). Counts
+are bumped incrementally as registrants and journeys are saved; a background
+thread periodically recomputes each event's top industries with a heap and
+recounts everything from the database to correct drift. Requests only ever
+read the precomputed ranking.
+"""
+
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from sqlalchemy import event as sa_event, func, inspect
+
+# Industry list uploaded before events existed; counts towards every event
+SHARED_INDUSTRY_FILE = os.path.join('bulk_uploads', 'industries_20250914_230351.txt')
+
+
+def clean_industry(value):
+    """Tidy an industry string for display: no invisible characters or stray spaces"""
+    value = unicodedata.normalize('NFKC', value or '')
+    value = ''.join(ch for ch in value if unicodedata.category(ch) != 'Cf')  # e.g. zero-width spaces
+    value = re.sub(r'\s*/\s*', '/', ' '.join(value.split()))  # "IT / ITES" -> "IT/ITES"
+    return value
+
+
+def industry_key(value):
+    """Key under which spellings of the same industry are counted together"""
+    return re.sub(r'\s*([&-])\s*', r'\1', clean_industry(value)).casefold()
+
+
+class IndustryStats:
+    """Normalized industry counts per event and the top industries derived from them"""
+
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.Industry = None
+        self.sources = []
+        self.catalog_only = set()  # sources counted only for industries in the catalog
+        self.enabled = False
+        self.top_k = 8
+        self.interval = 30
+        self.recount_interval = 600
+
+        self.version = 0  # Bumped whenever any event's ranking changes
+        self._lock = threading.Lock()
+        self._counts = {}  # event_id (None = every event) -> Counter of industry keys
+        self._spellings = {}  # industry key -> Counter of cleaned spellings
+        self._catalog = {}  # industry key -> Industry.name
+        self._top = {}  # event_id -> [industry name, ...]
+        self._dirty = False
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app, db, industry_model, registrant_model, journey_model):
+        self.app = app
+        self.db = db
+        self.Industry = industry_model
+        self.sources = [registrant_model, journey_model]
+        self.catalog_only = {journey_model}
+        self.enabled = app.config.get('INDUSTRY_STATS_ENABLED', True)
+        self.top_k = app.config.get('INDUSTRY_STATS_TOP_K', 8)
+        self.interval = app.config.get('INDUSTRY_STATS_INTERVAL', 30)
+        self.recount_interval = app.config.get('INDUSTRY_STATS_RECOUNT_INTERVAL', 600)
+
+        for model in self.sources:
+            sa_event.listen(model, 'after_insert', self._row_inserted)
+            sa_event.listen(model, 'after_update', self._row_updated)
+
+    # -- request side -------------------------------------------------------
+
+    def top_industries(self, event_id):
+        """Most frequent industries for an event, most frequent first; [] until computed"""
+        if not self.enabled:
+            return []
+        self._ensure_started()
+        return self._top.get(event_id, self._top.get(None, []))
+
+    def record(self, event_id, industry, delta=1, catalog_only=False):
+        """Count one more (or, with delta=-1, one fewer) registrant or player in an industry"""
+        key = industry_key(industry)
+        if not key:
+            return
+        with self._lock:
+            if catalog_only and key not in self._catalog:
+                return
+            self._counts.setdefault(event_id, Counter())[key] += delta
+            self._spellings.setdefault(key, Counter())[clean_industry(industry)] += delta
+            self._dirty = True
+
+    def _row_inserted(self, mapper, connection, target):
+        self.record(target.event_id, target.industry, catalog_only=mapper.class_ in self.catalog_only)
+
+    def _row_updated(self, mapper, connection, target):
+        history = inspect(target).attrs.industry.history
+        if history.has_changes():
+            catalog_only = mapper.class_ in self.catalog_only
+            for old in history.deleted:
+                self.record(target.event_id, old, -1, catalog_only)
+            self.record(target.event_id, target.industry, catalog_only=catalog_only)
+
+    # -- background refresh -------------------------------------------------
+
+    def _ensure_started(self):
+        # Started lazily in the serving process so it survives pre-forking servers
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='industry-stats', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        last_recount = 0
+        while True:
+            try:
+                if time.time() - last_recount >= self.recount_interval:
+                    with self.app.app_context():
+                        self.recount()
+                        self.seed_catalog()
+                    last_recount = time.time()
+                elif self._dirty:
+                    self.rank()
+                    with self.app.app_context():
+                        self.seed_catalog()
+            except Exception as e:
+                self.app.logger.error(f'Industry stats refresh failed: {e}')
+            time.sleep(self.interval)
+
+    def recount(self):
+        """Rebuild every count from the database and the shared upload file"""
+        counts = {}
+        spellings = {}
+        catalog = {industry_key(name): name for (name,) in self.db.session.query(self.Industry.name).all()}
+
+        def add(event_id, industry, n=1, catalog_only=False):
+            key = industry_key(industry)
+            if key and (key in catalog or not catalog_only):
+                counts.setdefault(event_id, Counter())[key] += n
+                spellings.setdefault(key, Counter())[clean_industry(industry)] += n
+
+        path = os.path.join(self.app.root_path, SHARED_INDUSTRY_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    add(None, line)
+
+        for model in self.sources:
+            rows = self.db.session.query(model.event_id, model.industry, func.count()).filter(
+                model.industry.isnot(None)
+            ).group_by(model.event_id, model.industry).all()
+            for event_id, industry, n in rows:
+                add(event_id, industry, n, model in self.catalog_only)
+        self.db.session.remove()
+
+        with self._lock:
+            self._counts = counts
+            self._spellings = spellings
+            self._catalog = catalog
+            self._dirty = True
+        self.rank()
+
+    def rank(self):
+        """Recompute every event's top industries from the current counts"""
+        with self._lock:
+            shared = self._counts.get(None, Counter())
+            snapshot = {event_id: counter.copy() for event_id, counter in self._counts.items()}
+            self._dirty = False
+
+        top = {}
+        for event_id, counter in snapshot.items():
+            merged = counter if event_id is None else counter + shared
+            # A k-sized heap instead of sorting every industry; ties go alphabetically
+            ranked = heapq.nsmallest(self.top_k, merged.items(), key=lambda item: (-item[1], item[0]))
+            top[event_id] = [self._display_name(key) for key, count in ranked if count > 0]
+
+        if top != self._top:
+            self._top = top
+            self.version += 1
+
+    def seed_catalog(self):
+        """Add ranked industries that are missing from the catalog, so the page can show them"""
+        missing = {name for names in self._top.values() for name in names if industry_key(name) not in self._catalog}
+        if not missing:
+            return
+        try:
+            for name in sorted(missing):
+                self.db.session.add(self.Industry(name=name, is_highlighted=True))
+                self._catalog[industry_key(name)] = name
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            raise
+        finally:
+            self.db.session.remove()
+
+    def _display_name(self, key):
+        # The catalog spelling if the industry exists, else the most common spelling seen
+        if key in self._catalog:
+            return self._catalog[key]
+        spellings = self._spellings.get(key)
+        return spellings.most_common(1)[0][0] if spellings else key
+
+
+# Process-wide industry statistics
+industry_stats = IndustryStats()
@@ -0,0 +1,447 @@
+"""
+Live leaderboard and dashboard figures, pushed to browsers with server-sent events.
+
+Answers, new players and finished games are published in-process as they are
+recorded. Each event keeps a per-company and a per-industry board in memory,
+ordered by correct answers and accuracy, and every change is turned into one
+small "delta" message that is serialized once and shared by every viewer of
+the stream, so a viewer costs a sleeping thread rather than a query.
+
+Boards are built from the database at startup (load(), from wsgi.py before
+the workers fork) and rebuilt periodically in the background, which also
+picks up answers recorded by other worker processes and corrects any drift.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+
+from sqlalchemy import case, func
+
+from industry_stats import clean_industry, industry_key
+
+BOARDS = ('companies', 'industries')
+
+
+def company_key(value):
+    return ' '.join((value or '').split()).casefold()
+
+
+def _set_all(wakeups):
+    for wakeup in wakeups:
+        wakeup.set()
+
+
+class _Entry:
+    __slots__ = ('name', 'answers', 'correct', 'journeys')
+
+    def __init__(self, name):
+        self.name = name
+        self.answers = 0
+        self.correct = 0
+        self.journeys = set()
+
+    @property
+    def accuracy(self):
+        return round(self.correct * 100 / self.answers, 1) if self.answers else 0
+
+    def sort_key(self, key):
+        # Most correct answers first, then best accuracy; the key breaks ties
+        return (-self.correct, -self.accuracy, key)
+
+
+class RankedBoard:
+    """Leaderboard entries kept sorted, so an answer moves one entry instead of re-sorting"""
+
+    def __init__(self):
+        self._entries = {}  # key -> _Entry
+        self._order = []  # sort keys, best first
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key, name, answers, correct, journey_id=None):
+        """Count answers towards an entry and return its new state"""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(name)
+        else:
+            del self._order[bisect_left(self._order, entry.sort_key(key))]
+
+        entry.answers += answers
+        entry.correct += correct
+        if journey_id is not None:
+            entry.journeys.add(journey_id)
+        sort_key = entry.sort_key(key)
+        insort(self._order, sort_key)
+        return self._serialize(key, entry, bisect_left(self._order, sort_key) + 1)
+
+    def top(self, limit):
+        return [self._serialize(sort_key[-1], self._entries[sort_key[-1]], rank)
+                for rank, sort_key in enumerate(self._order[:limit], 1)]
+
+    @staticmethod
+    def _serialize(key, entry, rank):
+        return {
+            'key': key,
+            'name': entry.name,
+            'rank': rank,
+            'answers': entry.answers,
+            'correct': entry.correct,
+            'players': len(entry.journeys),
+            'accuracy': entry.accuracy
+        }
+
+
+class EventBoard:
+    """Leaderboards and running totals for one event"""
+
+    def __init__(self):
+        self.companies = RankedBoard()
+        self.industries = RankedBoard()
+        self.players = 0
+        self.completed = 0
+        self.answers = 0
+        self.correct = 0
+        self.version = 0
+
+    def totals(self):
+        return {
+            'players': self.players,
+            'completed': self.completed,
+            'answers': self.answers,
+            'correct': self.correct,
+            'accuracy': round(self.correct * 100 / self.answers, 1) if self.answers else 0
+        }
+
+
+class LiveStats:
+    """In-process pub/sub of game activity with per-event leaderboards"""
+
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.GameSession = None
+        self.UserJourney = None
+        self.enabled = False
+        self.top_n = 10
+        self.heartbeat = 15
+        self.recount_interval = 60
+        self.max_viewers = 500
+        self.max_wsgi_viewers = 1
+
+        self._cond = threading.Condition()
+        self._boards = {}  # event_id -> EventBoard
+        self._messages = deque(maxlen=1000)  # (seq, event_id, encoded message), for resuming viewers
+        self._seq = 0
+        self._snapshots = {}  # event_id -> (board version, encoded snapshot)
+        self._waiters = {}  # asyncio loop -> set of asyncio.Event, for async viewers (asgi.py)
+        self._loaded = False
+        self.viewers = 0
+        self.wsgi_viewers = 0
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app, db, session_model, journey_model):
+        self.app = app
+        self.db = db
+        self.GameSession = session_model
+        self.UserJourney = journey_model
+        self.enabled = app.config.get('LIVE_STATS_ENABLED', True)
+        self.top_n = app.config.get('LIVE_STATS_TOP_N', 10)
+        self.heartbeat = app.config.get('LIVE_STATS_HEARTBEAT', 15)
+        self.recount_interval = app.config.get('LIVE_STATS_RECOUNT_INTERVAL', 60)
+        self.max_viewers = app.config.get('LIVE_STATS_MAX_VIEWERS', 500)
+        self.max_wsgi_viewers = app.config.get('LIVE_STATS_MAX_WSGI_VIEWERS', 1)
+        self._messages = deque(maxlen=app.config.get('LIVE_STATS_BACKLOG', 1000))
+
+    # -- publishing -------------------------------------------------------------
+
+    def record_answers(self, rows, committed=True):
+        """Count recorded GameSession rows (dicts) and push the changed entries
+
+        Rows still on their way to the database (the answer log) are passed
+        with committed=False, so that a recount run for them here counts them too.
+        """
+        if not self.enabled or not rows:
+            return
+        if not self._start() and committed:
+            return
+        by_event = {}
+        for row in rows:
+            by_event.setdefault(row.get('event_id'), []).append(row)
+
+        with self._cond:
+            for event_id, event_rows in by_event.items():
+                board = self._boards.setdefault(event_id, EventBoard())
+                changed = {name: {} for name in BOARDS}
+                correct = 0
+                for row in event_rows:
+                    is_correct = 1 if row.get('is_correct') else 0
+                    correct += is_correct
+                    journey_id = row.get('journey_id')
+                    company = ' '.join((row.get('company_name') or 'Unknown').split())
+                    entry = board.companies.add(company_key(company), company, 1, is_correct, journey_id)
+                    changed['companies'][entry['key']] = entry
+                    industry = clean_industry(row.get('industry') or 'Unknown')
+                    entry = board.industries.add(industry_key(industry), industry, 1, is_correct, journey_id)
+                    changed['industries'][entry['key']] = entry
+
+                board.answers += len(event_rows)
+                board.correct += correct
+                self._publish(event_id, board, 'delta', {
+                    'companies': list(changed['companies'].values()),
+                    'industries': list(changed['industries'].values()),
+                    'added': {'answers': len(event_rows), 'correct': correct, 'players': 0, 'completed': 0}
+                })
+
+    def record_player(self, event_id):
+        self._bump(event_id, 'players')
+
+    def record_completion(self, event_id, count=1):
+        self._bump(event_id, 'completed', count)
+
+    def _bump(self, event_id, field, count=1):
+        if not self.enabled or not count:
+            return
+        if not self._start():
+            return
+        with self._cond:
+            board = self._boards.setdefault(event_id, EventBoard())
+            setattr(board, field, getattr(board, field) + count)
+            added = {'answers': 0, 'correct': 0, 'players': 0, 'completed': 0}
+            added[field] = count
+            self._publish(event_id, board, 'delta', {'companies': [], 'industries': [], 'added': added})
+
+    def _start(self):
+        # False if the boards were only just built, by a recount that read
+        # whatever had been committed
+        loaded = self._loaded
+        self._ensure_started()
+        return loaded
+
+    def _publish(self, event_id, board, kind, data):
+        # Called with the condition held
+        board.version += 1
+        self._seq += 1
+        data = dict(data, event_id=event_id, totals=board.totals())
+        self._messages.append((self._seq, event_id, self._encode(self._seq, kind, data)))
+        self._cond.notify_all()
+        for loop, wakeups in self._waiters.items():
+            loop.call_soon_threadsafe(_set_all, tuple(wakeups))
+
+    @staticmethod
+    def _encode(seq, kind, data):
+        body = json.dumps(data, separators=(',', ':'))
+        return f'id: {seq}\nevent: {kind}\ndata: {body}\n\n'.encode('utf-8')
+
+    # -- reading ----------------------------------------------------------------
+
+    def snapshot(self, event_id):
+        """Top entries and totals for an event"""
+        self._ensure_started()
+        with self._cond:
+            return self._snapshot_data(event_id, self._boards.get(event_id) or EventBoard())
+
+    def _snapshot_data(self, event_id, board):
+        return {
+            'event_id': event_id,
+            'companies': board.companies.top(self.top_n),
+            'industries': board.industries.top(self.top_n),
+            'totals': board.totals()
+        }
+
+    def _snapshot_message(self, event_id):
+        # Encoded once per board version, however many viewers connect
+        with self._cond:
+            board = self._boards.get(event_id) or EventBoard()
+            cached = self._snapshots.get(event_id)
+            if cached is None or cached[0] != (board.version, self._seq):
+                data = self._snapshot_data(event_id, board)
+                cached = self._snapshots[event_id] = ((board.version, self._seq), self._encode(self._seq, 'snapshot', data))
+            return self._seq, cached[1]
+
+    def connect(self, threaded=True):
+        """Reserve a viewer slot; False when the stream is full.
+
+        A threaded (WSGI) viewer holds a server thread for as long as it
+        watches, so only max_wsgi_viewers of them are let in; the rest fall
+        back to polling the snapshot.
+        """
+        with self._cond:
+            if self.viewers >= self.max_viewers or (threaded and self.wsgi_viewers >= self.max_wsgi_viewers):
+                return False
+            self.viewers += 1
+            if threaded:
+                self.wsgi_viewers += 1
+            return True
+
+    def disconnect(self, threaded=True):
+        """Release a slot taken by connect(), once the response is closed"""
+        with self._cond:
+            self.viewers -= 1
+            if threaded:
+                self.wsgi_viewers -= 1
+
+    def stream(self, event_id=None, last_id=None):
+        """Server-sent events for one event, or deltas of every event when event_id is None.
+
+        A viewer that reconnects with the last id it saw is sent what it missed,
+        if that is still in the backlog, and a fresh snapshot otherwise. The
+        caller reserves a slot with connect() and releases it with disconnect().
+        """
+        self._ensure_started()
+        yield b'retry: 3000\n\n'
+
+        seq, messages = self._resume(event_id, last_id)
+        yield from messages
+        while True:
+            with self._cond:
+                if self._seq == seq:
+                    self._cond.wait(self.heartbeat)
+            new_seq, messages = self._catch_up(event_id, seq)
+            if new_seq == seq:
+                yield b': keepalive\n\n'  # Also how a dropped viewer is noticed
+                continue
+            seq = new_seq
+            yield from messages
+
+    async def astream(self, event_id=None, last_id=None):
+        """stream() for an asyncio server: a viewer waits on the event loop, not on a thread"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._ensure_started)
+        wakeup = asyncio.Event()
+        with self._cond:
+            self._waiters.setdefault(loop, set()).add(wakeup)
+        try:
+            yield b'retry: 3000\n\n'
+
+            seq, messages = self._resume(event_id, last_id)
+            for message in messages:
+                yield message
+            while True:
+                if self._seq == seq:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), self.heartbeat)
+                    except asyncio.TimeoutError:
+                        pass
+                wakeup.clear()
+                new_seq, messages = self._catch_up(event_id, seq)
+                if new_seq == seq:
+                    yield b': keepalive\n\n'
+                    continue
+                seq = new_seq
+                for message in messages:
+                    yield message
+        finally:
+            with self._cond:
+                wakeups = self._waiters.get(loop)
+                wakeups.discard(wakeup)
+                if not wakeups:
+                    del self._waiters[loop]
+
+    def _resume(self, event_id, last_id):
+        """Where a new viewer starts: (seq, messages to send first)"""
+        with self._cond:
+            oldest = self._messages[0][0] if self._messages else self._seq + 1
+            if last_id is not None and oldest - 1 <= last_id <= self._seq:
+                return last_id, []
+            if event_id is None:
+                return self._seq, []
+        seq, message = self._snapshot_message(event_id)
+        return seq, [message]
+
+    def _catch_up(self, event_id, seq):
+        """A viewer's messages published after seq: (new seq, messages)"""
+        with self._cond:
+            behind = self._seq - seq
+            if behind <= len(self._messages):
+                pending = [self._messages[i] for i in range(len(self._messages) - behind, len(self._messages))]
+                return self._seq, [message for _, message_event_id, message in pending
+                                   if event_id is None or message_event_id == event_id]
+            if event_id is None:
+                return self._seq, []
+        # Fell out of the backlog
+        return self._resume(event_id, None)
+
+    # -- background recount -----------------------------------------------------
+
+    def load(self):
+        """Build the boards now rather than in the first request that needs them"""
+        if self.enabled and not self._loaded:
+            self.recount()
+
+    def _ensure_started(self):
+        if not self._loaded:
+            # First use in this process: build the boards before anyone reads them
+            with self.app.app_context():
+                self.recount()
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='live-stats', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.recount_interval)
+            try:
+                with self.app.app_context():
+                    self.recount()
+            except Exception as e:
+                self.app.logger.error(f'Live stats recount failed: {e}')
+
+    def recount(self):
+        """Rebuild every board from the database and send fresh snapshots where they changed"""
+        GameSession = self.GameSession
+        UserJourney = self.UserJourney
+        try:
+            answers = self.db.session.query(
+                GameSession.event_id, GameSession.journey_id, GameSession.company_name, GameSession.industry,
+                func.count(), func.sum(case((GameSession.is_correct, 1), else_=0))
+            ).group_by(
+                GameSession.event_id, GameSession.journey_id, GameSession.company_name, GameSession.industry
+            ).all()
+            journeys = self.db.session.query(
+                UserJourney.event_id, func.count(), func.sum(case((UserJourney.is_completed, 1), else_=0))
+            ).group_by(UserJourney.event_id).all()
+        finally:
+            self.db.session.remove()
+
+        boards = {}
+        for event_id, journey_id, company, industry, count, correct in answers:
+            board = boards.setdefault(event_id, EventBoard())
+            correct = int(correct or 0)
+            company = ' '.join((company or 'Unknown').split())
+            industry = clean_industry(industry or 'Unknown')
+            board.companies.add(company_key(company), company, count, correct, journey_id)
+            board.industries.add(industry_key(industry), industry, count, correct, journey_id)
+            board.answers += count
+            board.correct += correct
+        for event_id, players, completed in journeys:
+            board = boards.setdefault(event_id, EventBoard())
+            board.players = players
+            board.completed = int(completed or 0)
+
+        with self._cond:
+            previous = self._boards
+            self._boards = boards
+            self._loaded = True
+            for event_id, board in boards.items():
+                old = previous.get(event_id)
+                if old is None or self._snapshot_data(event_id, old) != self._snapshot_data(event_id, board):
+                    board.version = (old.version if old else 0)
+                    self._publish(event_id, board, 'snapshot', self._snapshot_data(event_id, board))
+                else:
+                    board.version = old.version
+
+
+# Process-wide live statistics
+live_stats = LiveStats()
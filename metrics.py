@@ -0,0 +1,437 @@
+"""
+Request-level instrumentation for the game server.
+
+A WSGI middleware times every request and measures response sizes, SQLAlchemy
+engine events count and time SQL statements, and everything is kept in an
+in-process registry that can be rendered in the Prometheus text format.
+A sampling profiler can be switched on per request to find hot paths during
+live events.
+
+In development and testing the same hooks enforce per-endpoint query budgets
+and flag repeated statement shapes, the usual sign of an N+1 query pattern.
+"""
+
+import collections
+import hmac
+import itertools
+import re
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds (seconds) for request and query latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+# Upper bounds (bytes) for response size histograms
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_local = threading.local()
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {self.count}')
+        lines.append(f'{name}_sum{_labels(labels)} {_number(self.total)}')
+        lines.append(f'{name}_count{_labels(labels)} {self.count}')
+        return lines
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:[^()]|\([^()]*\))*\)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Reduce a SQL statement to its shape: literals and IN-lists collapsed"""
+    shape = _LITERAL_RE.sub('?', statement)
+    shape = _IN_LIST_RE.sub('IN (...)', shape)
+    return _WHITESPACE_RE.sub(' ', shape).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in testing when a request breaks its query budget"""
+
+
+class RequestStats:
+    """Per-request counters, kept in a thread local while the request runs"""
+
+    __slots__ = ('endpoint', 'query_count', 'query_time', 'shapes')
+
+    def __init__(self, track_shapes=False):
+        self.endpoint = None
+        self.query_count = 0
+        self.query_time = 0.0
+        self.shapes = collections.Counter() if track_shapes else None
+
+    def repeated_shapes(self, threshold):
+        """Statement shapes issued at least ``threshold`` times"""
+        if not self.shapes:
+            return []
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def current_request_stats():
+    """Stats for the request being handled on this thread, or None"""
+    return getattr(_local, 'stats', None)
+
+
+class MetricsRegistry:
+    """Thread-safe store for all collected metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.request_latency = {}
+        self.response_size = {}
+        self.request_queries = {}
+        self.request_status = collections.Counter()
+        self.query_latency = {}
+        self.db_errors = collections.Counter()
+
+    def observe_request(self, method, endpoint, status, duration, size, stats):
+        key = (('method', method), ('endpoint', endpoint))
+        with self._lock:
+            self.request_status[key + (('status', status),)] += 1
+            self.request_latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.response_size.setdefault(key, Histogram(SIZE_BUCKETS)).observe(size)
+            queries = self.request_queries.setdefault(key, [0, 0.0])
+            queries[0] += stats.query_count
+            queries[1] += stats.query_time
+
+    def observe_query(self, verb, duration):
+        key = (('verb', verb),)
+        with self._lock:
+            self.query_latency.setdefault(key, Histogram(QUERY_BUCKETS)).observe(duration)
+
+    def observe_db_error(self, kind):
+        with self._lock:
+            self.db_errors[(('kind', kind),)] += 1
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines.append('# HELP app_uptime_seconds Seconds since the metrics registry was created.')
+            lines.append('# TYPE app_uptime_seconds gauge')
+            lines.append(f'app_uptime_seconds {_number(time.time() - self.started_at)}')
+
+            lines.append('# HELP http_requests_total Requests handled, by endpoint and status.')
+            lines.append('# TYPE http_requests_total counter')
+            for key, count in sorted(self.request_status.items()):
+                lines.append(f'http_requests_total{_labels(key)} {count}')
+
+            lines.append('# HELP http_request_duration_seconds Request latency.')
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for key, histogram in sorted(self.request_latency.items()):
+                lines.extend(histogram.render('http_request_duration_seconds', key))
+
+            lines.append('# HELP http_response_size_bytes Response body size.')
+            lines.append('# TYPE http_response_size_bytes histogram')
+            for key, histogram in sorted(self.response_size.items()):
+                lines.extend(histogram.render('http_response_size_bytes', key))
+
+            lines.append('# HELP http_request_queries_total SQL statements issued while handling requests.')
+            lines.append('# TYPE http_request_queries_total counter')
+            for key, (count, _) in sorted(self.request_queries.items()):
+                lines.append(f'http_request_queries_total{_labels(key)} {count}')
+
+            lines.append('# HELP http_request_query_seconds_total Time spent in SQL while handling requests.')
+            lines.append('# TYPE http_request_query_seconds_total counter')
+            for key, (_, seconds) in sorted(self.request_queries.items()):
+                lines.append(f'http_request_query_seconds_total{_labels(key)} {_number(seconds)}')
+
+            lines.append('# HELP db_query_duration_seconds SQL statement latency, by statement verb.')
+            lines.append('# TYPE db_query_duration_seconds histogram')
+            for key, histogram in sorted(self.query_latency.items()):
+                lines.extend(histogram.render('db_query_duration_seconds', key))
+
+            lines.append('# HELP db_errors_total Database errors, by kind.')
+            lines.append('# TYPE db_errors_total counter')
+            for key, count in sorted(self.db_errors.items()):
+                lines.append(f'db_errors_total{_labels(key)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval while a request runs.
+
+    Output is in the collapsed-stack format used by flame graph tools:
+    one ``frame;frame;frame count`` line per distinct stack.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common())
+
+
+class MetricsMiddleware:
+    """WSGI middleware that records latency, size and SQL usage per request"""
+
+    def __init__(self, wsgi_app, registry, profiles=None, profile_interval=0.005, track_shapes=False,
+                 profile_token=None):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+        self.profiles = profiles
+        self.profile_interval = profile_interval
+        self.profile_token = profile_token
+        self.track_shapes = track_shapes
+        self._profile_ids = itertools.count(1)
+
+    def _wants_profile(self, environ):
+        # Only operators holding the shared token can slow a request down with the profiler
+        if self.profiles is None or not self.profile_token:
+            return False
+        supplied = environ.get('HTTP_X_PROFILE', '')
+        return bool(supplied) and hmac.compare_digest(supplied.encode('utf-8'), self.profile_token.encode('utf-8'))
+
+    def __call__(self, environ, start_response):
+        stats = RequestStats(track_shapes=self.track_shapes)
+        _local.stats = stats
+        started = time.perf_counter()
+        status_holder = {}
+
+        profiler = None
+        profile_id = None
+        if self._wants_profile(environ):
+            profiler = SamplingProfiler(threading.get_ident(), self.profile_interval)
+            profile_id = next(self._profile_ids)
+            profiler.start()
+
+        def _start_response(status, headers, exc_info=None):
+            status_holder['status'] = status.split(' ', 1)[0]
+            status_holder['length'] = next((int(v) for k, v in headers if k.lower() == 'content-length'), 0)
+            if profile_id is not None:
+                headers = list(headers) + [('X-Profile-Id', str(profile_id))]
+            return start_response(status, headers, exc_info)
+
+        def _finish(size):
+            duration = time.perf_counter() - started
+            if profiler is not None:
+                profiler.stop()
+                self.profiles.append({
+                    'id': profile_id,
+                    'method': environ.get('REQUEST_METHOD'),
+                    'path': environ.get('PATH_INFO'),
+                    'duration': round(duration, 6),
+                    'samples': sum(profiler.samples.values()),
+                    'stacks': profiler.collapsed()
+                })
+            self.registry.observe_request(
+                environ.get('REQUEST_METHOD', 'GET'),
+                stats.endpoint or 'unmatched',
+                status_holder.get('status', '500'),
+                duration,
+                size,
+                stats
+            )
+            _local.stats = None
+
+        try:
+            body = self.wsgi_app(environ, _start_response)
+        except Exception:
+            _finish(0)
+            raise
+
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if isinstance(file_wrapper, type) and isinstance(body, file_wrapper):
+            # Wrapping a file body would stop the server from using sendfile();
+            # record it now, without the transfer time
+            _finish(status_holder.get('length', 0))
+            return body
+        
+        return _MeasuredBody(body, _finish)
+
+
+class _MeasuredBody:
+    """Wraps a WSGI response iterable to count bytes and detect completion"""
+
+    def __init__(self, body, on_close):
+        self._body = body
+        self._on_close = on_close
+        self._size = 0
+        self._closed = False
+
+    def __iter__(self):
+        for chunk in self._body:
+            self._size += len(chunk)
+            yield chunk
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            self._on_close(self._size)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start_time'].pop()
+    verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else 'unknown'
+    registry.observe_query(verb, duration)
+
+    stats = current_request_stats()
+    if stats is not None:
+        stats.query_count += 1
+        stats.query_time += duration
+        if stats.shapes is not None:
+            stats.shapes[statement_shape(statement)] += 1
+
+
+def _handle_error(exception_context):
+    message = str(exception_context.original_exception).lower()
+    if 'database is locked' in message or 'deadlock' in message:
+        registry.observe_db_error('lock')
+    else:
+        registry.observe_db_error('other')
+
+
+def query_budget(max_queries):
+    """Declare the most SQL statements a view may issue per request.
+
+    Place it directly under ``@app.route`` so the budget is attached to the
+    registered view function. Budgets are only checked when
+    QUERY_BUDGET_ENABLED is set.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def check_query_budget(stats, budget, repeat_threshold):
+    """List the budget and N+1 problems found in one request's stats"""
+    problems = []
+    if budget is not None and stats.query_count > budget:
+        problems.append(f'{stats.query_count} queries issued, budget is {budget}')
+    for shape, count in stats.repeated_shapes(repeat_threshold):
+        problems.append(f'statement repeated {count} times (possible N+1): {shape[:200]}')
+    return problems
+
+
+# Process-wide registry and recent profiles
+registry = MetricsRegistry()
+profiles = collections.deque(maxlen=20)
+
+
+def init_metrics(app):
+    """Install the middleware, SQL event hooks and endpoint tagging on an app"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    budgets_enabled = app.config.get('QUERY_BUDGET_ENABLED', False)
+
+    @app.before_request
+    def _tag_endpoint():
+        from flask import request
+        stats = current_request_stats()
+        if stats is not None:
+            stats.endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+
+    if budgets_enabled:
+        @app.after_request
+        def _enforce_query_budget(response):
+            from flask import request
+            stats = current_request_stats()
+            if stats is None:
+                return response
+
+            response.headers['X-Query-Count'] = str(stats.query_count)
+            view = app.view_functions.get(request.endpoint)
+            problems = check_query_budget(
+                stats,
+                getattr(view, 'query_budget', None),
+                app.config.get('QUERY_REPEAT_THRESHOLD', 3)
+            )
+            if problems:
+                message = f'{request.method} {request.path}: ' + '; '.join(problems)
+                if app.config.get('TESTING'):
+                    raise QueryBudgetExceeded(message)
+                app.logger.warning(f'Query budget: {message}')
+            return response
+
+    app.wsgi_app = MetricsMiddleware(
+        app.wsgi_app,
+        registry,
+        profiles=profiles if app.config.get('PROFILING_ENABLED') else None,
+        profile_interval=app.config.get('PROFILER_INTERVAL', 0.005),
+        track_shapes=budgets_enabled,
+        profile_token=app.config.get('PROFILING_TOKEN')
+    )
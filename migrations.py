@@ -0,0 +1,343 @@
+"""
+Idempotent schema migrations for existing databases.
+
+db.create_all() only creates missing tables, so column changes to existing
+tables are applied here. Every step checks the live schema first and is safe
+to run on every start.
+"""
+
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from question_format import LETTERS, content_hash, question_record
+from tenancy import DEFAULT_EVENT_SLUG
+
+DEFAULT_QUESTION_FILE = 'all_industries_questions.txt'
+
+
+def _columns(db, table):
+    return {column['name'] for column in inspect(db.engine).get_columns(table)}
+
+
+def drop_user_journey_contact_columns(db):
+    """UserJourney used to duplicate the player's contact details from User"""
+    obsolete = ['name', 'company_name', 'email', 'phone', 'job_title', 'department']
+    existing = _columns(db, 'user_journey')
+    for column in obsolete:
+        if column in existing:
+            # Needs SQLite 3.35+ (or any PostgreSQL)
+            db.session.execute(text(f'ALTER TABLE user_journey DROP COLUMN {column}'))
+            print(f"Migration: dropped user_journey.{column}")
+    db.session.commit()
+
+
+def add_event_columns(db):
+    """Sessions and journeys are scoped to an event; older rows join the first event"""
+    for table in ('user_journey', 'game_session'):
+        if 'event_id' not in _columns(db, table):
+            db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN event_id INTEGER REFERENCES event(id)'))
+            print(f"Migration: added {table}.event_id")
+        db.session.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_event_id ON {table} (event_id)'))
+
+    unassigned = db.session.execute(text(
+        'SELECT EXISTS (SELECT 1 FROM user_journey WHERE event_id IS NULL) '
+        'OR EXISTS (SELECT 1 FROM game_session WHERE event_id IS NULL)'
+    )).scalar()
+    if unassigned:
+        event_id = db.session.execute(text('SELECT MIN(id) FROM event')).scalar()
+        if event_id is None:
+            db.session.execute(text(
+                "INSERT INTO event (name, started_at, created_at) VALUES ('Event 1', :now, :now)"
+            ), {'now': datetime.utcnow()})
+            event_id = db.session.execute(text('SELECT MIN(id) FROM event')).scalar()
+        for table in ('user_journey', 'game_session'):
+            db.session.execute(text(f'UPDATE {table} SET event_id = :event_id WHERE event_id IS NULL'),
+                               {'event_id': event_id})
+        print(f"Migration: assigned existing sessions and journeys to event {event_id}")
+    db.session.commit()
+
+
+def add_event_tenancy_columns(db):
+    """Several events can run at once, each with its own questions, industries and attendees"""
+    event_columns = _columns(db, 'event')
+    for column, ddl in (('slug', 'VARCHAR(50)'), ('question_file', 'VARCHAR(200)'), ('highlighted_industries', 'TEXT')):
+        if column not in event_columns:
+            db.session.execute(text(f'ALTER TABLE event ADD COLUMN {column} {ddl}'))
+            print(f"Migration: added event.{column}")
+    db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_event_slug ON event (slug)'))
+
+    for table in ('industry', 'question', 'pre_registered_user'):
+        if 'event_id' not in _columns(db, table):
+            db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN event_id INTEGER REFERENCES event(id)'))
+            print(f"Migration: added {table}.event_id")
+        db.session.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_event_id ON {table} (event_id)'))
+
+    # The event that was running before events had slugs becomes the default one
+    has_default = db.session.execute(text(
+        "SELECT 1 FROM event WHERE slug = 'default' AND ended_at IS NULL"
+    )).first()
+    if not has_default:
+        updated = db.session.execute(text(
+            "UPDATE event SET slug = 'default' WHERE id = "
+            "(SELECT MAX(id) FROM event WHERE ended_at IS NULL AND slug IS NULL)"
+        )).rowcount
+        if updated:
+            print("Migration: marked the open event as the default event")
+    db.session.commit()
+
+
+def add_question_content_hash(db):
+    """Questions are identified by their content; exact duplicates from repeated imports are merged.
+
+    Runs once: the unique index it finishes with marks the questions as
+    hashed and merged.
+    """
+    indexes = {index['name'] for index in inspect(db.engine).get_indexes('question')}
+    if 'ix_question_content_hash' in indexes:
+        return
+
+    if 'content_hash' not in _columns(db, 'question'):
+        db.session.execute(text('ALTER TABLE question ADD COLUMN content_hash VARCHAR(40)'))
+        print("Migration: added question.content_hash")
+
+    rows = db.session.execute(text(
+        'SELECT question.id, category.name, question_text, option_a, option_b, option_c, option_d '
+        'FROM question JOIN category ON category.id = question.category_id '
+        'WHERE content_hash IS NULL ORDER BY question.id'
+    )).all()
+    kept = {digest: question_id for digest, question_id in db.session.execute(
+        text('SELECT content_hash, id FROM question WHERE content_hash IS NOT NULL'))}
+    # Until remap_answer_question_ids has run, answers hold file positions, not Question ids
+    answers_by_row = 'ix_game_session_question_id' in {
+        index['name'] for index in inspect(db.engine).get_indexes('game_session')}
+    hashed = merged = 0
+    for row in rows:
+        digest = content_hash(row[1], row[2], row[3:])
+        if digest not in kept:
+            db.session.execute(text('UPDATE question SET content_hash = :digest WHERE id = :id'),
+                               {'digest': digest, 'id': row[0]})
+            kept[digest] = row[0]
+            hashed += 1
+        else:
+            if answers_by_row:
+                # Answers to the duplicate move to the question it repeats
+                db.session.execute(text('UPDATE game_session SET question_id = :kept WHERE question_id = :id'),
+                                   {'kept': kept[digest], 'id': row[0]})
+            db.session.execute(text('DELETE FROM question WHERE id = :id'), {'id': row[0]})
+            merged += 1
+    if hashed or merged:
+        print(f"Migration: hashed {hashed} questions, merged {merged} exact duplicates")
+    db.session.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_question_content_hash ON question (content_hash)'
+    ))
+    db.session.commit()
+
+
+def add_industry_to_question_hash(db):
+    """Question hashes include the industry, so the same question in two industries is two questions.
+
+    Hashes that left it out are recomputed; the question files' copies merged
+    into another industry's row are stored again when the files are.
+    """
+    if 'content_hash' not in _columns(db, 'question'):
+        return
+    rows = db.session.execute(text(
+        'SELECT question.id, category.name, question_text, option_a, option_b, option_c, option_d, content_hash '
+        'FROM question JOIN category ON category.id = question.category_id'
+    )).all()
+    updates = []
+    for row in rows:
+        digest = content_hash(row[1], row[2], row[3:7])
+        if digest != row[7]:
+            updates.append({'id': row[0], 'digest': digest})
+    if updates:
+        db.session.execute(text('UPDATE question SET content_hash = :digest WHERE id = :id'), updates)
+        print(f"Migration: added the industry to {len(updates)} question hashes")
+    db.session.commit()
+
+
+def _legacy_questions(path):
+    """A question file as the game numbered it before question_format.py: position -> QuestionRecord.
+
+    The old parser kept repeated questions and numbered every complete block
+    from 1, so positions recorded with it only line up with this parse.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        content = file.read()
+
+    questions = {}
+    sections = re.split(r'INDUSTRY:\s*([^\n]+)', content)
+    for i in range(1, len(sections) - 1, 2):
+        industry = sections[i].strip()
+        for block in re.split(r'\n(?=\d+\.)', sections[i + 1].strip()):
+            lines = block.strip().split('\n')
+            if not block.strip() or len(lines) < 6:
+                continue
+            match = re.match(r'\d+\.\s*(.+)', lines[0])
+            if not match:
+                continue
+            options = {}
+            answer = None
+            for line in lines[1:]:
+                line = line.strip()
+                if line.startswith(('A.', 'B.', 'C.', 'D.')):
+                    options[line[0]] = line[2:].strip()
+                elif line.startswith('Correct Answer:'):
+                    answer = line.replace('Correct Answer:', '').strip()
+            question = match.group(1).strip()
+            if len(options) == 4 and answer and question:
+                questions[len(questions) + 1] = question_record(
+                    industry, question, [options[letter] for letter in LETTERS], answer[:1].upper())
+    return questions
+
+
+def _question_row_id(db, record):
+    """Id of the Question row for a parsed question, stored first if it is not there"""
+    question_id = db.session.execute(text('SELECT id FROM question WHERE content_hash = :digest AND event_id IS NULL'),
+                                     {'digest': record.content_hash}).scalar()
+    if question_id is not None:
+        return question_id
+
+    category_id = db.session.execute(text('SELECT id FROM category WHERE name = :name'),
+                                     {'name': record.industry}).scalar()
+    if category_id is None:
+        category_id = db.session.execute(
+            text('INSERT INTO category (name, created_at) VALUES (:name, :now) RETURNING id'),
+            {'name': record.industry, 'now': datetime.utcnow()}
+        ).scalar()
+    return db.session.execute(text(
+        'INSERT INTO question (category_id, question_text, option_a, option_b, option_c, option_d, '
+        'correct_answer, content_hash, created_at) '
+        'VALUES (:category_id, :question_text, :option_a, :option_b, :option_c, :option_d, '
+        ':correct_answer, :content_hash, :now) RETURNING id'
+    ), dict(record.model_fields(), category_id=category_id, content_hash=record.content_hash,
+            now=datetime.utcnow())).scalar()
+
+
+def remap_answer_question_ids(db):
+    """Answers used to record a question's position in its file; they now point at its Question row.
+
+    Runs once: the game_session.question_id index it finishes with marks the
+    answers as remapped. Positions are read from the question files as they
+    are now, the best record left of what was asked, numbered the way the
+    old parser numbered them.
+    """
+    indexes = {index['name'] for index in inspect(db.engine).get_indexes('game_session')}
+    if 'ix_game_session_question_id' in indexes:
+        return
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    files = dict(db.session.execute(text('SELECT id, question_file FROM event')).all())
+    answers = db.session.execute(text('SELECT id, event_id, question_id FROM game_session')).all()
+    positions = {}  # question file -> {position: Question.id}
+    updates = []
+    unknown = 0
+    for answer_id, event_id, position in answers:
+        question_file = files.get(event_id) or DEFAULT_QUESTION_FILE
+        if question_file not in positions:
+            path = os.path.join(root, question_file)
+            records = _legacy_questions(path) if os.path.exists(path) else {}
+            positions[question_file] = {
+                number: _question_row_id(db, record) for number, record in records.items()
+            }
+        question_id = positions[question_file].get(position)
+        if question_id is None:
+            unknown += 1
+        elif question_id != position:
+            updates.append({'id': answer_id, 'question_id': question_id})
+
+    if updates:
+        db.session.execute(text('UPDATE game_session SET question_id = :question_id WHERE id = :id'), updates)
+        print(f"Migration: pointed {len(updates)} answers at their Question rows")
+    if unknown:
+        print(f"Migration: {unknown} answers refer to positions past the end of their question file, left as they were")
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_game_session_question_id ON game_session (question_id)'
+    ))
+    db.session.commit()
+
+
+def _rebuild_sqlite_table(db, table_name):
+    """SQLite cannot drop a constraint: recreate the table from its model and copy the rows over"""
+    table = db.metadata.tables[table_name]
+    columns = ', '.join(column for column in _columns(db, table_name) if column in table.c)
+    for index in inspect(db.engine).get_indexes(table_name):
+        db.session.execute(text(f'DROP INDEX {index["name"]}'))
+    # Keep other tables' foreign keys pointing at the name, not at the renamed copy
+    db.session.execute(text('PRAGMA legacy_alter_table = ON'))
+    db.session.execute(text(f'ALTER TABLE {table_name} RENAME TO _{table_name}_old'))
+    db.session.execute(text('PRAGMA legacy_alter_table = OFF'))
+    table.create(bind=db.session.connection())
+    db.session.execute(text(f'INSERT INTO {table_name} ({columns}) SELECT {columns} FROM _{table_name}_old'))
+    db.session.execute(text(f'DROP TABLE _{table_name}_old'))
+
+
+def scope_unique_names_to_events(db):
+    """Industry names and question content are unique per event, so two events can each have their own"""
+    inspector = inspect(db.engine)
+    name_constraints = [constraint for constraint in inspector.get_unique_constraints('industry')
+                        if constraint['column_names'] == ['name']]
+    if name_constraints:
+        if db.engine.dialect.name == 'sqlite':
+            _rebuild_sqlite_table(db, 'industry')
+        else:
+            for constraint in name_constraints:
+                db.session.execute(text(f'ALTER TABLE industry DROP CONSTRAINT {constraint["name"]}'))
+        print("Migration: industry names are unique per event")
+
+    hash_index = {index['name']: index for index in inspector.get_indexes('question')}.get('ix_question_content_hash')
+    if hash_index is not None and hash_index['unique']:
+        db.session.execute(text('DROP INDEX ix_question_content_hash'))
+        db.session.execute(text('CREATE INDEX ix_question_content_hash ON question (content_hash)'))
+        print("Migration: question content is unique per event")
+
+    for statement in (
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_industry_event_name ON industry (event_id, name)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_industry_shared_name ON industry (name) WHERE event_id IS NULL',
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_question_event_content ON question (event_id, content_hash)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_question_shared_content ON question (content_hash) '
+        'WHERE event_id IS NULL',
+    ):
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def create_default_event(db):
+    """The event kiosks play without ?event=, created once here rather than racing in requests"""
+    open_event = db.session.execute(
+        text('SELECT id FROM event WHERE slug = :slug AND ended_at IS NULL LIMIT 1'), {'slug': DEFAULT_EVENT_SLUG}
+    ).scalar()
+    if open_event is None:
+        now = datetime.utcnow()
+        db.session.execute(
+            text('INSERT INTO event (name, slug, started_at, created_at, archived_sessions, archived_journeys) '
+                 'VALUES (:name, :slug, :now, :now, 0, 0)'),
+            {'name': f'Event {now:%Y-%m-%d}', 'slug': DEFAULT_EVENT_SLUG, 'now': now}
+        )
+        db.session.commit()
+        print("Migration: created the default event")
+
+
+MIGRATIONS = [
+    drop_user_journey_contact_columns,
+    add_event_columns,
+    add_event_tenancy_columns,
+    add_question_content_hash,
+    add_industry_to_question_hash,
+    remap_answer_question_ids,
+    scope_unique_names_to_events,
+    create_default_event,
+]
+
+
+def run_migrations(db):
+    """Apply every migration step in order (call inside an app context)"""
+    for migration in MIGRATIONS:
+        try:
+            migration(db)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Migration {migration.__name__} failed: {e}")
@@ -0,0 +1,303 @@
+"""
+Fuzzy lookup of pre-registered attendees by name and company.
+
+Attendees type their own names at the kiosk, with typos, honorifics ("Dr.",
+"Shri") and their own idea of spacing, so exact or substring matching either
+misses them or finds the wrong person first. Names and companies are
+normalized (accents, case, punctuation, honorifics, company suffixes and
+spaces dropped) and indexed by character trigrams. A query scores each
+candidate by trigram overlap - the Dice coefficient averaged with how much
+of the query the candidate covers, so a typed first name still finds the
+full name - and returns the best few with their scores.
+
+The index is built once per process from PreRegisteredUser (preloaded by
+wsgi.py). Every lookup first compares the attendee count and highest id
+with what is indexed, so attendees uploaded through any worker process are
+added as soon as they are committed, and deletions rebuild the index.
+Edits committed in this process are applied when they commit; edits made
+elsewhere are picked up by a full rebuild every NAME_MATCH_REBUILD_INTERVAL
+seconds. Scoring visits the posting
+lists of the query's trigrams rarest first and stops when the time budget
+runs out, which only drops the most common trigrams.
+"""
+
+import math
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+
+from sqlalchemy import event as sa_event, func
+from sqlalchemy.orm import Session, object_session
+
+HONORIFICS = {'mr', 'mrs', 'ms', 'miss', 'mx', 'dr', 'prof', 'sir', 'shri', 'sri', 'smt', 'kumari',
+              'er', 'adv', 'capt', 'col'}
+COMPANY_SUFFIXES = {'pvt', 'private', 'ltd', 'limited', 'llp', 'inc', 'incorporated', 'corp', 'corporation',
+                    'co', 'company', 'plc', 'gmbh', 'llc', 'group'}
+
+
+def split_words(value):
+    """Words of a name without accents, case or punctuation"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return re.sub(r'[^\w\s]', ' ', value.casefold()).split()
+
+
+def normalize_name(value):
+    """Lookup key for a person's name: no honorifics, punctuation, case or spaces"""
+    words = split_words(value)
+    while len(words) > 1 and words[0] in HONORIFICS:
+        words = words[1:]
+    return ''.join(words)
+
+
+def normalize_company(value):
+    """Lookup key for a company name: as for names, without legal suffixes ("Pvt. Ltd.")"""
+    words = split_words(value)
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words = words[:-1]
+    return ''.join(words)
+
+
+def trigrams(key):
+    """Character trigrams of a normalized key, padded so the start of the name counts double"""
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} if key else set()
+
+
+class TrigramIndex:
+    """Trigram postings over normalized keys, for one kind of value.
+
+    Entries are identified by an id chosen by the caller; removed entries are
+    tombstoned and their slots dropped from results.
+    """
+
+    def __init__(self, normalize):
+        self.normalize = normalize
+        self._lock = threading.Lock()
+        self._postings = {}  # trigram -> array of entry slots, ascending
+        self._ids = []  # slot -> entry id, None once removed
+        self._values = []  # slot -> display value
+        self._events = []  # slot -> event id (None = every event)
+        self._sizes = array('H')  # slot -> number of trigrams
+        self._slots = {}  # entry id -> slot
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, entry_id, value, event_id=None):
+        key = self.normalize(value)
+        grams = trigrams(key)
+        with self._lock:
+            if entry_id in self._slots:
+                self._remove(entry_id)
+            if not grams:
+                return
+            slot = len(self._ids)
+            self._ids.append(entry_id)
+            self._values.append(value.strip())
+            self._events.append(event_id)
+            self._sizes.append(min(len(grams), 65535))
+            self._slots[entry_id] = slot
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array('l')
+                postings.append(slot)
+
+    def remove(self, entry_id):
+        with self._lock:
+            self._remove(entry_id)
+
+    def _remove(self, entry_id):
+        slot = self._slots.pop(entry_id, None)
+        if slot is not None:
+            self._ids[slot] = None
+
+    def search(self, query, event_id=None, limit=5, min_score=0.5, budget=0.05):
+        """Best matches as [(entry id, value, score)], highest score first.
+
+        event_id restricts results to that event's entries plus shared ones;
+        budget is the time in seconds allowed for scoring.
+        """
+        grams = trigrams(self.normalize(query))
+        if not grams:
+            return []
+
+        deadline = time.perf_counter() + budget
+        postings = self._postings
+        # Rarest first: they narrow the candidates most, and are what is left if time runs out
+        lists = sorted((postings[gram] for gram in grams if gram in postings), key=len)
+        shared = Counter()
+        for slots in lists:
+            shared.update(slots)
+            if time.perf_counter() > deadline:
+                break
+
+        size = len(grams)
+        # A candidate with fewer shared trigrams than this cannot reach min_score
+        needed = max(1, math.ceil(min_score * size / (2 - min_score)))
+        ids, values, events, sizes = self._ids, self._values, self._events, self._sizes
+        results = []
+        for slot, count in shared.items():
+            if count < needed or ids[slot] is None:
+                continue
+            if event_id is not None and events[slot] is not None and events[slot] != event_id:
+                continue
+            dice = 2 * count / (size + sizes[slot])
+            coverage = count / size
+            score = (dice + coverage) / 2
+            if score >= min_score:
+                results.append((score, -abs(sizes[slot] - size), ids[slot], values[slot]))
+
+        results.sort(reverse=True)
+        return [(entry_id, value, round(score, 3)) for score, _, entry_id, value in results[:limit]]
+
+
+class RegistrantIndexes:
+    """Name and company indexes over one snapshot of the attendees"""
+
+    def __init__(self):
+        self.names = TrigramIndex(normalize_name)
+        self.companies = TrigramIndex(normalize_company)
+        self.company_refs = Counter()  # (event id, company key) -> attendees with that company
+        self.attendee_companies = {}  # attendee id -> (event id, company key)
+        self.ids = set()  # attendees indexed
+        self.max_id = 0
+        self.built_at = time.time()
+
+    def add(self, attendee_id, event_id, name, company_name):
+        self.ids.add(attendee_id)
+        self.max_id = max(self.max_id, attendee_id)
+        self.names.add(attendee_id, name or '', event_id)
+        company_key = (event_id, normalize_company(company_name))
+        previous = self.attendee_companies.get(attendee_id)
+        if previous == company_key:
+            return
+        if previous is not None:
+            self._release_company(attendee_id)
+        if company_key[1]:
+            self.attendee_companies[attendee_id] = company_key
+            self.company_refs[company_key] += 1
+            if self.company_refs[company_key] == 1:
+                self.companies.add(company_key, company_name, event_id)
+
+    def remove(self, attendee_id):
+        self.ids.discard(attendee_id)
+        self.names.remove(attendee_id)
+        self._release_company(attendee_id)
+
+    def _release_company(self, attendee_id):
+        company_key = self.attendee_companies.pop(attendee_id, None)
+        if company_key is None:
+            return
+        self.company_refs[company_key] -= 1
+        if self.company_refs[company_key] <= 0:
+            del self.company_refs[company_key]
+            self.companies.remove(company_key)
+
+
+class RegistrantMatcher:
+    """Name and company indexes over the pre-registered attendees"""
+
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.PreRegisteredUser = None
+        self.min_score = 0.5
+        self.budget = 0.05
+        self.rebuild_interval = 600
+        self._indexes = None  # RegistrantIndexes, swapped whole when rebuilt
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db, preregistered_model):
+        self.app = app
+        self.db = db
+        self.PreRegisteredUser = preregistered_model
+        self.min_score = app.config.get('NAME_MATCH_MIN_SCORE', 0.5)
+        self.budget = app.config.get('NAME_MATCH_BUDGET_MS', 50) / 1000
+        self.rebuild_interval = app.config.get('NAME_MATCH_REBUILD_INTERVAL', 600)
+
+        # Changes are collected at flush and applied once their transaction commits
+        sa_event.listen(preregistered_model, 'after_insert', self._row_saved)
+        sa_event.listen(preregistered_model, 'after_update', self._row_saved)
+        sa_event.listen(preregistered_model, 'after_delete', self._row_deleted)
+        sa_event.listen(Session, 'after_commit', self._committed)
+        sa_event.listen(Session, 'after_rollback', self._rolled_back)
+
+    def load(self):
+        """Bring both indexes up to date with the database (call inside an app context)"""
+        Attendee = self.PreRegisteredUser
+        count, max_id = self.db.session.query(func.count(Attendee.id), func.max(Attendee.id)).one()
+        indexes = self._indexes
+        if indexes is not None and self._current(indexes, count, max_id):
+            return
+        with self._lock:
+            indexes = self._indexes
+            if indexes is not None and self._current(indexes, count, max_id):
+                return
+            if (indexes is None or (max_id or 0) < indexes.max_id
+                    or time.time() - indexes.built_at > self.rebuild_interval):
+                self._rebuild()
+                return
+            # Attendees added since, by any process
+            for row in self.db.session.query(Attendee.id, Attendee.event_id, Attendee.name,
+                                             Attendee.company_name).filter(Attendee.id > indexes.max_id):
+                indexes.add(*row)
+            if len(indexes.ids) != count:
+                self._rebuild()  # Attendees were also deleted
+
+    def _current(self, indexes, count, max_id):
+        return (len(indexes.ids) == count and indexes.max_id == (max_id or 0)
+                and time.time() - indexes.built_at <= self.rebuild_interval)
+
+    def _rebuild(self):
+        Attendee = self.PreRegisteredUser
+        indexes = RegistrantIndexes()
+        for row in self.db.session.query(Attendee.id, Attendee.event_id, Attendee.name, Attendee.company_name):
+            indexes.add(*row)
+        self._indexes = indexes
+
+    def _row_saved(self, mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault('registrant_changes', []).append(
+                (target.id, target.event_id, target.name, target.company_name))
+
+    def _row_deleted(self, mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault('registrant_changes', []).append((target.id, None))
+
+    def _committed(self, session):
+        changes = session.info.pop('registrant_changes', None)
+        # Before the first load there is nothing to update; load() will read the rows
+        if not changes or self._indexes is None:
+            return
+        with self._lock:
+            indexes = self._indexes
+            for change in changes:
+                if len(change) == 2:
+                    indexes.remove(change[0])
+                else:
+                    indexes.add(*change)
+
+    def _rolled_back(self, session):
+        session.info.pop('registrant_changes', None)
+
+    def match_names(self, query, event_id=None, limit=5):
+        """Attendees whose names best match, as [(attendee id, name, score)]"""
+        self.load()
+        return self._indexes.names.search(query, event_id, limit, self.min_score, self.budget)
+
+    def match_companies(self, query, event_id=None, limit=5):
+        """Distinct company names that best match, as [(company name, score)]"""
+        self.load()
+        return [(value, score) for _, value, score in
+                self._indexes.companies.search(query, event_id, limit, self.min_score, self.budget)]
+
+
+# Process-wide matcher
+registrant_matcher = RegistrantMatcher()
@@ -0,0 +1,108 @@
+"""
+Offline kiosk mode.
+
+Event Wi-Fi drops out, so once a player has registered the rest of the game
+can run without the server: the kiosk downloads the event's questions in one
+compact "question pack", a service worker (templates/game/sw.js) serves the
+pack and the game pages from its cache, and answers, selfies and the final
+"game completed" are queued in IndexedDB (static/js/kiosk.js) and sent to
+/api/sync in batches whenever the network is there.
+
+Queued items can reach the server long after the player left, when the
+kiosk's session cookie already belongs to the next player, so every item
+carries a signed journey token issued at registration instead of relying on
+the session. Each item also has a client-generated id; ids seen recently are
+remembered so a batch retried after a lost response is not recorded twice.
+The memory is per process, which covers the usual retry of the same request.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Fields of the player's session that queued items need on the server
+JOURNEY_FIELDS = ('user_id', 'journey_id', 'event_id', 'user_name', 'company_name', 'industry')
+
+# Precached by the service worker and served from its cache while it revalidates;
+# /company-info depends on the player's industry, so it is fetched network-first
+OFFLINE_PAGES = ['/', '/user-info', '/industry-select', '/selfie-capture', '/question',
+                 '/feedback', '/company-info', '/thank-you']
+OFFLINE_ASSETS = ['css/main.css', 'css/mobile.css', 'js/kiosk.js', 'js/suggestions.js',
+                  'logo/logo.png', 'logo/ET-CISO-logo.png']
+
+
+def journey_from_session(session):
+    """The player's journey as carried in a journey token"""
+    return {field: session.get(field) for field in JOURNEY_FIELDS}
+
+
+def parse_client_time(value):
+    """A kiosk's ISO 8601 timestamp as naive UTC (like datetime.utcnow()); None if absent or invalid"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class OfflineSync:
+    """Journey tokens and duplicate detection for batched offline submissions"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.max_batch = 50
+        self.token_max_age = 86400
+        self.remember = 10000
+        self._serializer = None
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()  # client item id -> None, oldest first
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('OFFLINE_KIOSK_ENABLED', True)
+        self.max_batch = app.config.get('OFFLINE_SYNC_MAX_BATCH', 50)
+        self.token_max_age = app.config.get('OFFLINE_SYNC_TOKEN_MAX_AGE', 86400)
+        self.remember = app.config.get('OFFLINE_SYNC_REMEMBER', 10000)
+        self._serializer = URLSafeTimedSerializer(app.secret_key, salt='offline-journey')
+
+    def journey_token(self, session):
+        """Signed copy of the player's journey, for items queued on the kiosk"""
+        if not self.enabled:
+            return None
+        return self._serializer.dumps(journey_from_session(session))
+
+    def read_journey(self, token):
+        """The journey a token was issued for; None if it is forged or too old"""
+        if not token:
+            return None
+        try:
+            return self._serializer.loads(token, max_age=self.token_max_age)
+        except BadSignature:
+            return None
+
+    def claim(self, item_id):
+        """True the first time an item id is seen; False for a resent item"""
+        with self._lock:
+            if item_id in self._seen:
+                self._seen.move_to_end(item_id)
+                return False
+            self._seen[item_id] = None
+            while len(self._seen) > self.remember:
+                self._seen.popitem(last=False)
+            return True
+
+    def release(self, item_id):
+        """Forget an item that failed, so the kiosk's retry is processed"""
+        with self._lock:
+            self._seen.pop(item_id, None)
+
+
+# Process-wide offline sync state
+offline_sync = OfflineSync()
@@ -0,0 +1,208 @@
+"""
+In-memory question bank for the game API.
+
+Questions are parsed from the industry text file once, and every question's
+JSON payload is serialized up front so /api/get-question can hand out bytes
+instead of rebuilding and re-encoding a dict on every request. Those payloads
+leave out the correct answer, since /api/questions/<id> lets anyone cache
+them; answers are graded on the server. Offline kiosks grade their own
+answers, so the "question packs" they download join a second set of payloads
+that include it.
+
+Question ids come from the bank's question_ids callable, which looks parsed
+questions up in the Question table by content hash (question_dedup.py), so
+the ids answers record stay the same when the file is edited or reordered.
+Questions not stored yet are left out until they are (at startup, or when
+an event's question file is set). Without a callable, questions are
+numbered by their position in the file. An event's bank also serves the
+questions added for that event alone, from its event_questions callable.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from question_format import parse_question_file
+
+# Convert correct answer letter to index for frontend
+ANSWER_TO_INDEX = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
+INDEX_TO_ANSWER = {index: letter for letter, index in ANSWER_TO_INDEX.items()}
+
+
+def parse_questions_from_file(file_path, question_ids=None):
+    """Parse all questions from an industry question text file.
+
+    question_ids maps the parsed records to their ids, None for a question
+    to leave out; without it questions are numbered from 1 in file order.
+    """
+    if not os.path.exists(file_path):
+        return []
+
+    try:
+        records, errors = parse_question_file(file_path)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error parsing questions file: {e}")
+        return []
+
+    if errors:
+        print(f"{file_path}: {len(errors)} problems, first: {errors[0]}")
+    ids = question_ids(records) if question_ids else range(1, len(records) + 1)
+    questions = [record.bank_question(question_id) for question_id, record in zip(ids, records)
+                 if question_id is not None]
+    if len(questions) < len(records):
+        print(f"{file_path}: {len(records) - len(questions)} questions are not in the database yet, left out")
+    return questions
+
+
+def serialize_question(question, with_answer=False):
+    """Encode the client-facing payload for a single question (with its answer for packs)"""
+    payload = {
+        'id': question['id'],
+        'question': question['question'],
+        'options': question['options'],
+        'category': question['industry']
+    }
+    if with_answer:
+        payload['correct_answer'] = ANSWER_TO_INDEX.get(question['correct_answer'], 0)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class QuestionBank:
+    """Parsed questions plus their precomputed payloads and ETags.
+
+    The source file is re-parsed only when its modification time changes, so
+    edits to the question file are still picked up without a restart. The
+    modification time is checked at most once every check_interval seconds.
+    """
+
+    def __init__(self, file_path, question_ids=None, event_questions=None, check_interval=2):
+        self.file_path = file_path
+        self.question_ids = question_ids  # records -> ids, e.g. QuestionDedup.question_ids
+        self.event_questions = event_questions  # () -> [(id, QuestionRecord)] that no file lists
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._loaded = False
+        self.questions = []
+        self.ids = []
+        self.version = ''
+        self._by_id = {}
+        self._payloads = {}
+        self._pack_payloads = {}  # id -> payload with the correct answer, for offline packs
+        self._etags = {}
+        self._packs = {}  # industry key -> (pack bytes, etag), for the current version
+
+    def _source_mtime(self):
+        try:
+            return os.path.getmtime(self.file_path)
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Reload the bank if the question file changed since the last load"""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_interval:
+            return
+        mtime = self._source_mtime()
+        self._checked_at = now
+        if self._loaded and mtime == self._mtime:
+            return
+
+        with self._lock:
+            if self._loaded and mtime == self._mtime:
+                return
+
+            try:
+                questions = parse_questions_from_file(self.file_path, self.question_ids)
+                if self.event_questions:
+                    listed = {q['id'] for q in questions}
+                    questions += [record.bank_question(question_id) for question_id, record in self.event_questions()
+                                  if question_id not in listed]
+            except Exception as e:
+                # Keep serving the last load; the next request tries again
+                print(f"Error loading question bank {self.file_path}: {e}")
+                return
+            by_id = {}
+            payloads = {}
+            pack_payloads = {}
+            etags = {}
+            bank_hash = hashlib.sha1()
+
+            for q in questions:
+                payload = serialize_question(q)
+                digest = hashlib.sha1(payload).hexdigest()
+                by_id[q['id']] = q
+                payloads[q['id']] = payload
+                pack_payloads[q['id']] = serialize_question(q, with_answer=True)
+                etags[q['id']] = digest[:16]
+                # The version also changes when only an answer does, so kiosks reload their packs
+                bank_hash.update(hashlib.sha1(pack_payloads[q['id']]).digest())
+
+            # Swap everything in at once so readers never see a half-built bank
+            self.questions = questions
+            self.ids = [q['id'] for q in questions]
+            self.version = bank_hash.hexdigest()[:12]
+            self._by_id = by_id
+            self._payloads = payloads
+            self._pack_payloads = pack_payloads
+            self._etags = etags
+            self._packs = {}
+            self._mtime = mtime
+            self._loaded = True
+
+    def invalidate(self):
+        """Reload on next use, e.g. after the event's own questions changed"""
+        self._loaded = False
+
+    def get(self, question_id):
+        self.refresh()
+        return self._by_id.get(question_id)
+
+    def index(self):
+        """All questions by id, for checking a batch of answers with one freshness check"""
+        self.refresh()
+        return self._by_id
+
+    def payload(self, question_id):
+        self.refresh()
+        return self._payloads.get(question_id)
+
+    def etag(self, question_id):
+        self.refresh()
+        return self._etags.get(question_id)
+
+    def all_ids(self):
+        self.refresh()
+        return self.ids
+
+    def pack(self, industry=None):
+        """Every question for an industry as one JSON document, plus its ETag.
+
+        Falls back to the whole bank when the industry has no questions of its
+        own, which is also what /api/get-question draws from.
+        """
+        self.refresh()
+        key = (industry or '').strip().casefold()
+        cached = self._packs.get(key)
+        if cached is not None:
+            return cached
+
+        ids = self._pack_ids(key)
+        header = json.dumps({'version': self.version, 'industry': industry or None}, separators=(',', ':'))
+        body = b''.join([
+            header[:-1].encode('utf-8'), b',"questions":[',
+            b','.join(self._pack_payloads[qid] for qid in ids), b']}'
+        ])
+        cached = self._packs[key] = (body, hashlib.sha1(body).hexdigest()[:16])
+        return cached
+
+    def pack_ids(self, industry=None):
+        """Ids of the questions in an industry's pack, the ones an offline kiosk may answer"""
+        self.refresh()
+        return set(self._pack_ids((industry or '').strip().casefold()))
+
+    def _pack_ids(self, key):
+        return [q['id'] for q in self.questions if key and q['industry'].casefold() == key] or self.ids
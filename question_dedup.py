@@ -0,0 +1,320 @@
+"""
+Question identity across imports: content hashes, upserts and near duplicates.
+
+Every Question row carries the content hash of its industry (category),
+normalized text and options (question_format.content_hash), set on every
+insert or update (and for a category's questions when it is renamed) and
+unique within an event and among the questions shared by every event.
+Imports create shared questions and are upserts against it: a question already
+in the database is updated if its answer or category differ ("changed") and
+otherwise left alone ("unchanged"), so uploading the same file twice no
+longer doubles the bank. Question files served by QuestionBank are stored
+the same way at startup and when an event's file is set; the bank then only
+looks its questions up by hash, and each question is served, and its answers
+recorded, under the id of its Question row, so editing the file cannot
+re-map the answers already given.
+
+Questions that are nearly, but not exactly, the same - one industry's copy
+of another's with a reworded option - are found with MinHash: each question
+is shingled into character 4-grams, given a NUM_PERM-value MinHash signature
+and bucketed by bands of the signature (LSH), so only questions sharing a
+bucket are compared exactly. That keeps the pass close to linear in the
+size of the bank instead of comparing every pair.
+"""
+
+import os
+import random
+import zlib
+from collections import defaultdict
+
+from sqlalchemy import event as sa_event, or_, select
+
+from question_format import LETTERS, content_hash, normalize_text, parse_question_file, question_record
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands of 4 rows: pairs above ~0.5 Jaccard usually share a bucket
+SHINGLE = 4
+_PRIME = (1 << 61) - 1
+
+
+def question_hash(question, industry):
+    """Content hash of a Question row under its category's name"""
+    return content_hash(industry, question.question_text, [question.option_a, question.option_b,
+                                                           question.option_c, question.option_d])
+
+
+def shingles(text):
+    """Hashed character 4-grams of normalized text"""
+    text = normalize_text(text)
+    if len(text) <= SHINGLE:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {zlib.crc32(text[i:i + SHINGLE].encode('utf-8')) for i in range(len(text) - SHINGLE + 1)}
+
+
+class MinHasher:
+    """One-permutation MinHash: a single hash per shingle, split into num_perm bins.
+
+    Each bin keeps its minimum, which estimates Jaccard similarity like
+    num_perm separate permutations would at 1/num_perm of the cost. Empty
+    bins borrow from the next filled bin to their right (densification).
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.a = rng.randrange(1, _PRIME)
+        self.b = rng.randrange(_PRIME)
+
+    def signature(self, shingle_set):
+        num_perm, a, b = self.num_perm, self.a, self.b
+        bins = [None] * num_perm
+        for value in shingle_set:
+            index, rest = divmod((a * value + b) % _PRIME, _PRIME // num_perm + 1)
+            if bins[index] is None or rest < bins[index]:
+                bins[index] = rest
+        filled = [i for i, value in enumerate(bins) if value is not None]
+        if len(filled) < num_perm:
+            for i in range(num_perm):
+                if bins[i] is None:
+                    source = next((j for j in filled if j > i), filled[0])
+                    distance = (source - i) % num_perm
+                    bins[i] = ('borrowed', distance, bins[source])
+        return tuple(bins)
+
+
+def near_duplicate_pairs(items, threshold=0.6, bands=BANDS):
+    """Pairs of similar items as [(similarity, id, other id)], most similar first.
+
+    items is an iterable of (id, text); similarity is the exact Jaccard
+    similarity of the two shingle sets, for candidates found by LSH.
+    """
+    hasher = MinHasher()
+    rows = hasher.num_perm // bands
+    shingle_sets = {}
+    buckets = defaultdict(list)
+    for item_id, text in items:
+        shingle_set = shingles(text)
+        shingle_sets[item_id] = shingle_set
+        signature = hasher.signature(shingle_set)
+        for band in range(bands):
+            buckets[(band, signature[band * rows:(band + 1) * rows])].append(item_id)
+
+    candidates = set()
+    for members in buckets.values():
+        if 1 < len(members) <= 50:  # a huge bucket is boilerplate shared by everything
+            for i, item_id in enumerate(members):
+                for other in members[i + 1:]:
+                    candidates.add((item_id, other) if item_id < other else (other, item_id))
+
+    pairs = []
+    for item_id, other in candidates:
+        a, b = shingle_sets[item_id], shingle_sets[other]
+        similarity = len(a & b) / len(a | b)
+        if similarity >= threshold:
+            pairs.append((round(similarity, 3), item_id, other))
+    pairs.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+    return pairs
+
+
+class QuestionDedup:
+    """Keeps Question content hashes current, upserts imports and finds near duplicates"""
+
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.Question = None
+        self.Category = None
+        self.threshold = 0.6
+        self.batch_size = 500
+
+    def init_app(self, app, db, question_model, category_model):
+        self.app = app
+        self.db = db
+        self.Question = question_model
+        self.Category = category_model
+        self.threshold = app.config.get('QUESTION_SIMILARITY', 0.6)
+
+        sa_event.listen(question_model, 'before_insert', self._set_hash)
+        sa_event.listen(question_model, 'before_update', self._set_hash)
+
+    def _set_hash(self, mapper, connection, target):
+        # Imports set the category object; admin edits only its id
+        category = target.__dict__.get('category')
+        if category is not None and category.id in (None, target.category_id):
+            industry = category.name
+        else:
+            industry = connection.execute(
+                select(self.Category.name).where(self.Category.id == target.category_id)
+            ).scalar()
+        target.content_hash = question_hash(target, industry)
+
+    def rehash_category(self, category):
+        """Update the hashes of a renamed category's questions; the caller commits"""
+        for question in self.Question.query.filter_by(category_id=category.id):
+            question.content_hash = question_hash(question, category.name)
+
+    def find(self, industry, question_text, options, exclude_id=None, event_id=None):
+        """The event's (by default the shared) question in this industry with this text and these options, if any"""
+        query = self.Question.query.filter_by(content_hash=content_hash(industry, question_text, options),
+                                              event_id=event_id)
+        if exclude_id is not None:
+            query = query.filter(self.Question.id != exclude_id)
+        return query.first()
+
+    def upsert(self, records):
+        """Insert new questions and update changed ones from QuestionRecords.
+
+        Records are consumed in batches, one lookup query per batch, so a
+        streamed file is never held in memory. Returns counts of new,
+        changed and unchanged questions; the caller commits.
+        """
+        counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+        categories = {category.name: category for category in self.Category.query.all()}
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self._upsert_batch(batch, categories, counts)
+                batch = []
+        if batch:
+            self._upsert_batch(batch, categories, counts)
+        return counts
+
+    def _upsert_batch(self, batch, categories, counts):
+        Question = self.Question
+        with self.db.session.no_autoflush:
+            existing = {
+                question.content_hash: question
+                for question in Question.query.filter(Question.content_hash.in_([r.content_hash for r in batch]),
+                                                      Question.event_id.is_(None))
+            }
+            for record in batch:
+                category = categories.get(record.industry)
+                if category is None:
+                    category = categories[record.industry] = self.Category(name=record.industry)
+                    self.db.session.add(category)
+
+                fields = record.model_fields()
+                question = existing.get(record.content_hash)
+                if question is None:
+                    question = existing[record.content_hash] = Question(category=category, **fields)
+                    self.db.session.add(question)
+                    counts['new'] += 1
+                    continue
+
+                if question.id is None:
+                    changed = question.category is not category  # repeated in this upload
+                else:
+                    # Compared by id, so checking a batch loads no categories
+                    changed = category.id is None or question.category_id != category.id
+                for name, value in fields.items():
+                    if getattr(question, name) != value:
+                        setattr(question, name, value)
+                        changed = True
+                if changed:
+                    question.category = category
+                    counts['changed'] += 1
+                else:
+                    counts['unchanged'] += 1
+        self.db.session.flush()
+
+    def store_records(self, records):
+        """Add the questions not stored yet (by content hash); stored ones are left as they are.
+
+        Used for the question files the game serves, at startup and when an
+        event's file is set. Returns how many were added; the caller commits.
+        """
+        Question = self.Question
+        categories = {category.name: category for category in self.Category.query.all()}
+        added = 0
+        with self.db.session.no_autoflush:
+            for start in range(0, len(records), self.batch_size):
+                batch = records[start:start + self.batch_size]
+                stored = {digest for (digest,) in self.db.session.query(Question.content_hash).filter(
+                    Question.content_hash.in_([record.content_hash for record in batch]),
+                    Question.event_id.is_(None))}
+                for record in batch:
+                    if record.content_hash in stored:
+                        continue
+                    category = categories.get(record.industry)
+                    if category is None:
+                        category = categories[record.industry] = self.Category(name=record.industry)
+                        self.db.session.add(category)
+                    self.db.session.add(Question(category=category, **record.model_fields()))
+                    stored.add(record.content_hash)
+                    added += 1
+        self.db.session.flush()
+        return added
+
+    def store_file(self, path):
+        """Store a question file's questions (see store_records); returns how many were added"""
+        records, _ = parse_question_file(path)
+        added = self.store_records(records)
+        if added:
+            print(f"{os.path.basename(path)}: added {added} questions to the database")
+        return added
+
+    def question_ids(self, records, event_id=None):
+        """Question.id for each QuestionRecord (in order), None for questions not stored yet.
+
+        An event's own copy of a question is used over the shared one.
+        Read-only, one query per batch, so QuestionBank can resolve its ids
+        while serving a request.
+        """
+        Question = self.Question
+        scope = Question.event_id.is_(None)
+        if event_id is not None:
+            scope = or_(scope, Question.event_id == event_id)
+        ids = {}
+        for start in range(0, len(records), self.batch_size):
+            batch = records[start:start + self.batch_size]
+            for digest, question_id, question_event_id in self.db.session.query(
+                    Question.content_hash, Question.id, Question.event_id).filter(
+                    Question.content_hash.in_([record.content_hash for record in batch]), scope):
+                if question_event_id is not None or digest not in ids:
+                    ids[digest] = question_id
+        return [ids.get(record.content_hash) for record in records]
+
+    def event_questions(self, event_id):
+        """(Question.id, QuestionRecord) for each question added for one event alone"""
+        Question, Category = self.Question, self.Category
+        rows = self.db.session.query(
+            Question.id, Category.name, Question.question_text,
+            Question.option_a, Question.option_b, Question.option_c, Question.option_d, Question.correct_answer
+        ).join(Category, Question.category_id == Category.id).filter(
+            Question.event_id == event_id
+        ).order_by(Question.id).all()
+        return [(row[0], question_record(row[1], row[2], row[3:7], row[7])) for row in rows]
+
+    def near_duplicates(self, threshold=None, limit=200, cross_industry=False):
+        """Pairs of similar questions, most similar first, as [{similarity, same_industry, questions}]"""
+        Question, Category = self.Question, self.Category
+        rows = self.db.session.query(
+            Question.id, Category.name, Question.question_text,
+            Question.option_a, Question.option_b, Question.option_c, Question.option_d
+        ).join(Category, Question.category_id == Category.id).all()
+        by_id = {row[0]: row for row in rows}
+        texts = ((row[0], ' '.join(row[2:])) for row in rows)
+
+        results = []
+        for similarity, question_id, other_id in near_duplicate_pairs(texts, threshold or self.threshold):
+            first, second = by_id[question_id], by_id[other_id]
+            if cross_industry and first[1] == second[1]:
+                continue
+            results.append({
+                'similarity': similarity,
+                'same_industry': first[1] == second[1],
+                'questions': [{
+                    'id': row[0],
+                    'category': row[1],
+                    'question_text': row[2],
+                    'options': dict(zip(LETTERS, row[3:])),
+                } for row in (first, second)]
+            })
+            if len(results) >= limit:
+                break
+        return results
+
+
+# Process-wide question deduplication
+question_dedup = QuestionDedup()
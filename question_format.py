@@ -0,0 +1,193 @@
+"""
+Parser for the industry question text format.
+
+    INDUSTRY: BFSI
+
+    1. What does BFSI stand for?
+    A. Banking, Financial Services, Insurance
+    B. Business, Finance, Securities, Investment
+    C. Banking, Finance, Stock, Insurance
+    D. Business, Financial, Services, Insurance
+    Correct Answer: A
+
+The file is read line by line in a single pass, so a large upload is never
+held in memory, and every problem is reported with the line it is on:
+questions outside an industry, missing or repeated options, a missing or
+invalid answer, stray lines. Incomplete questions are skipped, never
+guessed at. A question that wraps onto further lines before its options
+is joined up. Options are recognised only by their leading letter, so
+"A." inside an option's text is left alone.
+
+Each question becomes a QuestionRecord carrying a content hash of its
+normalized text and options; a question repeated in the file is reported
+and kept once. Records feed both the in-memory QuestionBank and the
+database import.
+"""
+
+import hashlib
+import re
+import unicodedata
+from collections import namedtuple
+
+LETTERS = ('A', 'B', 'C', 'D')
+
+_INDUSTRY = re.compile(r'INDUSTRY\s*:\s*(?:\d+\.\s+)?(.*)$', re.IGNORECASE)
+_QUESTION = re.compile(r'(\d+)[.)]\s+(.*)$')
+_OPTION = re.compile(r'([A-Da-d])[.)]\s*(.*)$')
+_ANSWER = re.compile(r'Correct\s+Answer\s*:\s*(.*)$', re.IGNORECASE)
+_ANSWER_LETTER = re.compile(r'([A-Da-d])(?:$|[\s.)])')
+
+
+def normalize_text(value):
+    """Text as compared for duplicates: Unicode-normalized, case-folded, single-spaced"""
+    return ' '.join(unicodedata.normalize('NFKC', value or '').casefold().split())
+
+
+def content_hash(industry, question, options):
+    """Identity of a question: its industry, normalized text and options, not its answer.
+
+    The same question under two industries is two questions, so every
+    industry's bank keeps its own copy.
+    """
+    parts = [normalize_text(industry), normalize_text(question)] + [normalize_text(option) for option in options]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class QuestionRecord(namedtuple('QuestionRecord', 'industry question options correct_answer line content_hash')):
+    """One parsed question: options is (A, B, C, D), correct_answer a letter, line where it starts"""
+
+    __slots__ = ()
+
+    def bank_question(self, question_id):
+        """The question as QuestionBank holds it"""
+        return {
+            'id': question_id,
+            'industry': self.industry,
+            'question': self.question,
+            'options': dict(zip(LETTERS, self.options)),
+            'correct_answer': self.correct_answer,
+        }
+
+    def model_fields(self):
+        """Column values for a Question row (the category is resolved by the caller)"""
+        return {
+            'question_text': self.question,
+            'option_a': self.options[0],
+            'option_b': self.options[1],
+            'option_c': self.options[2],
+            'option_d': self.options[3],
+            'correct_answer': self.correct_answer,
+        }
+
+
+def question_record(industry, question, options, correct_answer, line=None):
+    """A QuestionRecord for a question from elsewhere, e.g. a spreadsheet row"""
+    options = tuple(options)
+    return QuestionRecord(industry, question, options, correct_answer, line, content_hash(industry, question, options))
+
+
+class QuestionParser:
+    """Single-pass parser; problems and skipped duplicates are collected in errors"""
+
+    def __init__(self):
+        self.errors = []  # 'Line N: ...'
+        self.duplicates = 0
+        self._seen = {}  # content hash -> line of its first occurrence
+
+    def _error(self, line_number, message):
+        self.errors.append(f'Line {line_number}: {message}')
+
+    def parse(self, lines):
+        """Yield a QuestionRecord for every complete question in an iterable of lines"""
+        industry = None
+        pending = None  # [line, text parts, {letter: option}] for the question being read
+
+        for line_number, raw in enumerate(lines, start=1):
+            line = raw.strip().lstrip('\ufeff')
+            if not line:
+                continue
+
+            match = _INDUSTRY.match(line)
+            if match:
+                self._unfinished(pending)
+                pending = None
+                industry = match.group(1).strip() or None
+                if industry is None:
+                    self._error(line_number, 'INDUSTRY: without a name')
+                continue
+
+            match = _ANSWER.match(line)
+            if match:
+                if pending is None:
+                    self._error(line_number, 'Correct Answer without a question')
+                    continue
+                record = self._finish(pending, industry, match.group(1).strip(), line_number)
+                pending = None
+                if record is not None:
+                    yield record
+                continue
+
+            match = _OPTION.match(line)
+            if match and pending is not None:
+                letter = match.group(1).upper()
+                options = pending[2]
+                if letter in options:
+                    self._error(line_number, f'option {letter} given twice')
+                elif not match.group(2).strip():
+                    self._error(line_number, f'option {letter} is empty')
+                else:
+                    options[letter] = match.group(2).strip()
+                continue
+
+            match = _QUESTION.match(line)
+            if match:
+                self._unfinished(pending)
+                pending = None
+                if industry is None:
+                    self._error(line_number, 'question before any INDUSTRY: line')
+                    continue
+                pending = [line_number, [match.group(2).strip()], {}]
+                continue
+
+            if pending is not None and not pending[2]:
+                # The question wraps onto another line
+                pending[1].append(line)
+            else:
+                self._error(line_number, f'unexpected line "{line[:50]}"')
+
+        self._unfinished(pending)
+
+    def _unfinished(self, pending):
+        if pending is not None:
+            self._error(pending[0], f'question "{" ".join(pending[1])[:50]}" has no Correct Answer line')
+
+    def _finish(self, pending, industry, answer, line_number):
+        question_line, parts, options = pending
+        question = ' '.join(parts)
+        missing = [letter for letter in LETTERS if letter not in options]
+        if missing:
+            self._error(question_line, f'question "{question[:50]}" is missing option {", ".join(missing)}')
+            return None
+
+        match = _ANSWER_LETTER.match(answer)
+        if not match:
+            self._error(line_number, f'invalid answer "{answer}" (expected A, B, C or D)')
+            return None
+
+        record = question_record(industry, question, [options[letter] for letter in LETTERS],
+                                 match.group(1).upper(), question_line)
+        first_line = self._seen.get(record.content_hash)
+        if first_line is not None:
+            self.duplicates += 1
+            self._error(question_line, f'duplicate of the question on line {first_line}, skipped')
+            return None
+        self._seen[record.content_hash] = question_line
+        return record
+
+
+def parse_question_file(file_path):
+    """All questions in a question file, and the problems found: (records, errors)"""
+    parser = QuestionParser()
+    with open(file_path, 'r', encoding='utf-8') as file:
+        records = list(parser.parse(file))
+    return records, parser.errors
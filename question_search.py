@@ -0,0 +1,224 @@
+"""
+Full-text search and keyset pagination for the admin question list.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers; PostgreSQL
+uses a GIN index over a tsvector expression. Results are ranked when searching
+and paged with opaque cursors on (rank, created_at, id) instead of OFFSET.
+Total counts are cached briefly so paging does not run COUNT(*) every time.
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import and_, event, func, literal, literal_column, or_, text
+from sqlalchemy.orm import contains_eager
+
+# Sort key used for rows that predate created_at being populated
+EPOCH = datetime(1970, 1, 1)
+COUNT_CACHE_TTL = 60  # seconds
+
+SQLITE_FTS_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS question_fts USING fts5(
+        question_text, option_a, option_b, option_c, option_d,
+        content='question', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS question_fts_ai AFTER INSERT ON question BEGIN
+        INSERT INTO question_fts(rowid, question_text, option_a, option_b, option_c, option_d)
+        VALUES (new.id, new.question_text, new.option_a, new.option_b, new.option_c, new.option_d);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS question_fts_ad AFTER DELETE ON question BEGIN
+        INSERT INTO question_fts(question_fts, rowid, question_text, option_a, option_b, option_c, option_d)
+        VALUES ('delete', old.id, old.question_text, old.option_a, old.option_b, old.option_c, old.option_d);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS question_fts_au AFTER UPDATE ON question BEGIN
+        INSERT INTO question_fts(question_fts, rowid, question_text, option_a, option_b, option_c, option_d)
+        VALUES ('delete', old.id, old.question_text, old.option_a, old.option_b, old.option_c, old.option_d);
+        INSERT INTO question_fts(rowid, question_text, option_a, option_b, option_c, option_d)
+        VALUES (new.id, new.question_text, new.option_a, new.option_b, new.option_c, new.option_d);
+    END""",
+]
+
+# The query must use exactly this expression for PostgreSQL to pick the index
+PG_DOCUMENT = ("to_tsvector('english', question.question_text || ' ' || question.option_a || ' ' || "
+               "question.option_b || ' ' || question.option_c || ' ' || question.option_d)")
+PG_FTS_SETUP = [
+    "CREATE INDEX IF NOT EXISTS ix_question_search ON question USING GIN ((" + PG_DOCUMENT + "))",
+]
+
+
+class QuestionSearch:
+    """Search backend for the Question table, chosen by database dialect"""
+
+    def __init__(self, db, question_model, category_model):
+        self.db = db
+        self.Question = question_model
+        self.Category = category_model
+        self.backend = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._count_cache = {}
+
+        # Any write to questions invalidates cached totals
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(question_model, event_name, self._bump_generation)
+
+    def _bump_generation(self, mapper, connection, target):
+        self._generation += 1
+
+    def ensure_index(self):
+        """Create the full-text index on first use; returns the backend name"""
+        if self.backend is not None:
+            return self.backend
+
+        with self._lock:
+            if self.backend is not None:
+                return self.backend
+
+            dialect = self.db.engine.dialect.name
+            backend = 'like'
+            try:
+                if dialect == 'sqlite':
+                    with self.db.engine.begin() as conn:
+                        existed = conn.execute(text(
+                            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'question_fts'"
+                        )).first() is not None
+                        for statement in SQLITE_FTS_SETUP:
+                            conn.execute(text(statement))
+                        if not existed:
+                            # Index the questions that were there before the triggers
+                            conn.execute(text("INSERT INTO question_fts(question_fts) VALUES ('rebuild')"))
+                    backend = 'fts5'
+                elif dialect == 'postgresql':
+                    with self.db.engine.begin() as conn:
+                        for statement in PG_FTS_SETUP:
+                            conn.execute(text(statement))
+                    backend = 'tsvector'
+            except Exception as e:
+                # e.g. SQLite built without FTS5: fall back to LIKE matching
+                print(f"Full-text index unavailable, using LIKE search: {e}")
+
+            self.backend = backend
+            return backend
+
+    def _match_filter(self, query, search):
+        """Apply the search condition; returns (query, rank expression)"""
+        backend = self.ensure_index()
+        Question = self.Question
+
+        if backend == 'fts5':
+            tokens = re.findall(r'\w+', search)
+            if not tokens:
+                return query, literal(0.0)
+            # Every token must match, each as a prefix ("bank*" finds "banking")
+            match = ' '.join('"' + token + '"*' for token in tokens)
+            fts = text(
+                "SELECT rowid AS id, bm25(question_fts) AS rank FROM question_fts WHERE question_fts MATCH :match"
+            ).bindparams(match=match).columns(id=self.db.Integer, rank=self.db.Float).subquery('fts')
+            return query.join(fts, fts.c.id == Question.id), fts.c.rank
+
+        if backend == 'tsvector':
+            document = literal_column(PG_DOCUMENT)
+            tsquery = func.websearch_to_tsquery('english', search)
+            # Negate ts_rank so that, as with bm25, lower sorts first
+            return query.filter(document.op('@@')(tsquery)), -func.ts_rank(document, tsquery)
+
+        pattern = f'%{search}%'
+        return query.filter(or_(
+            Question.question_text.ilike(pattern),
+            Question.option_a.ilike(pattern),
+            Question.option_b.ilike(pattern),
+            Question.option_c.ilike(pattern),
+            Question.option_d.ilike(pattern)
+        )), literal(0.0)
+
+    def _cached_count(self, query, search, category_id, event_id):
+        key = (self._generation, search, category_id, event_id)
+        now = time.time()
+        cached = self._count_cache.get(key)
+        if cached and now - cached[1] < COUNT_CACHE_TTL:
+            return cached[0]
+
+        total = query.order_by(None).with_entities(func.count(self.Question.id)).scalar()
+        if len(self._count_cache) > 256:
+            self._count_cache.clear()
+        self._count_cache[key] = (total, now)
+        return total
+
+    def search(self, search='', category_id=None, cursor=None, limit=10, page=None, event_id=None):
+        """Return (questions, pagination dict) for one page of results"""
+        Question = self.Question
+        query = Question.query.join(self.Category).options(contains_eager(Question.category))
+
+        if category_id:
+            query = query.filter(Question.category_id == category_id)
+        if event_id:
+            # The event's own questions plus the shared ones
+            query = query.filter(or_(Question.event_id == event_id, Question.event_id.is_(None)))
+
+        rank = literal(0.0)
+        if search:
+            query, rank = self._match_filter(query, search)
+
+        total = self._cached_count(query, search, category_id, event_id)
+
+        created = func.coalesce(Question.created_at, EPOCH)
+        query = query.add_columns(rank.label('rank'), created.label('sort_created'))
+
+        if cursor:
+            last_rank, last_created, last_id = decode_cursor(cursor)
+            after_created = or_(
+                created < last_created,
+                and_(created == last_created, Question.id < last_id)
+            )
+            if search:
+                query = query.filter(or_(rank > last_rank, and_(rank == last_rank, after_created)))
+            else:
+                query = query.filter(after_created)
+
+        ordering = [created.desc(), Question.id.desc()]
+        if search:
+            ordering.insert(0, rank.asc())
+        query = query.order_by(*ordering)
+
+        if page and not cursor:
+            # Legacy page-number callers; the admin UI pages by cursor
+            query = query.offset((page - 1) * limit)
+
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        next_cursor = None
+        if has_more and rows:
+            last_question, last_rank, last_created = rows[-1]
+            next_cursor = encode_cursor(float(last_rank or 0), last_created, last_question.id)
+
+        pagination = {
+            'per_page': limit,
+            'total': total,
+            'pages': (total + limit - 1) // limit if limit else 0,
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        }
+        return [row[0] for row in rows], pagination
+
+
+def encode_cursor(rank, created, question_id):
+    if isinstance(created, str):
+        created = datetime.fromisoformat(created)
+    raw = json.dumps([rank, created.isoformat(), question_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into (rank, created_at, id); raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, created, question_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return float(rank), datetime.fromisoformat(created), int(question_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
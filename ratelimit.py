@@ -0,0 +1,232 @@
+"""
+Rate limiting and admission control for the public game APIs.
+
+Two mechanisms, both declared on the view like query budgets:
+
+- ``@rate_limit(rate, burst)``: a token bucket per client and endpoint. A
+  bucket holds up to ``burst`` tokens and refills at ``rate`` per second;
+  each request takes one, and a request finding the bucket empty gets a 429
+  with Retry-After. Buckets live in this process (``memory://``) or in a
+  small SQLite file shared by every worker on the host (``sqlite:///path``),
+  chosen by RATELIMIT_STORAGE_URL.
+- ``@concurrency_limit(n)``: at most ``n`` requests of an expensive endpoint
+  run at once per process; the next one is turned away with a 429 straight
+  away instead of queueing for a thread. That keeps bursts of selfie uploads
+  or exports from occupying every thread while answers wait behind them.
+  Admin views pass ``login_required=True``, so a request that is not signed
+  in never takes a slot and is left to the view's login check.
+
+Both checks run before the request body is read, so a rejected 16MB upload
+costs almost nothing. Clients are identified by IP address plus the player's
+journey once registered, so kiosks sharing an event's NAT address are
+limited per player rather than all together.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request, session
+from flask_login import current_user
+
+
+def rate_limit(rate, burst):
+    """Allow a client ``burst`` requests at once, refilling at ``rate`` per second.
+
+    Place it directly under ``@app.route``, like ``query_budget``.
+    """
+    def decorator(view):
+        view.rate_limit = (float(rate), float(burst))
+        return view
+    return decorator
+
+
+def concurrency_limit(max_concurrent, login_required=False):
+    """Run at most ``max_concurrent`` requests of this view at once per process.
+
+    With ``login_required``, only signed-in users take a slot.
+    """
+    def decorator(view):
+        view.concurrency_limit = max_concurrent
+        view.concurrency_login_required = login_required
+        return view
+    return decorator
+
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+class MemoryBuckets:
+    """Token buckets in this process; the least recently used are dropped past max_keys"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> [tokens, updated]
+
+    def take(self, key, rate, burst, now=None):
+        """Take a token; returns 0 if granted, else seconds until one is available"""
+        now = time.time() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = _refill(bucket[0], bucket[1], now, rate, burst)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / rate
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file, shared by all worker processes on the host.
+
+    Kept out of the application database (and off SQLAlchemy) so limiter
+    writes never queue behind game writes or count against query budgets.
+    Each take is one short IMMEDIATE transaction; if the file stays locked
+    past the busy timeout the request is let through rather than failed.
+    """
+
+    def __init__(self, path, busy_timeout=0.05, prune_every=1000, idle_seconds=3600):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.prune_every = prune_every
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._takes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+
+    def _connection(self):
+        # One connection per thread (and per process: a forked worker opens its own)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = self._connect()
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key, rate, burst, now=None):
+        """Take a token; returns 0 if granted, else seconds until one is available"""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError:
+            return 0
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = burst if row is None else _refill(row[0], row[1], now, rate, burst)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            conn.execute('INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                         'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                         (key, tokens, now))
+
+            self._takes += 1
+            if self._takes % self.prune_every == 0:
+                # Buckets idle this long are full again; forgetting them changes nothing
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - self.idle_seconds,))
+            conn.execute('COMMIT')
+            return wait
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            return 0
+
+
+class Limiter:
+    """Applies the rate and concurrency limits declared on views"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.buckets = None
+        self.proxy_count = 0
+        self._lock = threading.Lock()
+        self._slots = {}  # endpoint -> BoundedSemaphore
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        self.proxy_count = app.config.get('RATELIMIT_PROXY_COUNT', 0)
+
+        storage = app.config.get('RATELIMIT_STORAGE_URL') or 'memory://'
+        if storage.startswith('sqlite:///'):
+            self.buckets = SQLiteBuckets(storage[len('sqlite:///'):])
+        elif storage == 'memory://':
+            self.buckets = MemoryBuckets(app.config.get('RATELIMIT_MAX_KEYS', 100000))
+        else:
+            raise ValueError(f'Unsupported RATELIMIT_STORAGE_URL: {storage}')
+
+        # Ahead of every other hook, so a rejected request does no other work
+        app.before_request_funcs.setdefault(None, []).insert(0, self._admit)
+        app.teardown_request(self._release)
+
+    def client_key(self):
+        """The client a bucket belongs to: its address, plus the player once registered"""
+        address = request.remote_addr or ''
+        if self.proxy_count:
+            # Behind N trusted proxies the client is the Nth address from the right
+            forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+            if len(forwarded) >= self.proxy_count:
+                address = forwarded[-self.proxy_count]
+        journey_id = session.get('journey_id')
+        return f'{address}|{journey_id}' if journey_id else address
+
+    def _reject(self, message, retry_after):
+        response = jsonify({'error': message, 'retry_after': retry_after})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def _admit(self):
+        if not self.enabled or request.endpoint is None:
+            return None
+        view = self.app.view_functions.get(request.endpoint)
+
+        limit = getattr(view, 'rate_limit', None)
+        if limit is not None:
+            rate, burst = limit
+            wait = self.buckets.take(f'{request.endpoint}:{self.client_key()}', rate, burst)
+            if wait:
+                return self._reject('Too many requests, slow down', max(1, math.ceil(wait)))
+
+        max_concurrent = getattr(view, 'concurrency_limit', None)
+        if getattr(view, 'concurrency_login_required', False) and not current_user.is_authenticated:
+            max_concurrent = None  # Turned away by the login check without holding a slot
+        if max_concurrent is not None:
+            slots = self._slots.get(request.endpoint)
+            if slots is None:
+                with self._lock:
+                    slots = self._slots.setdefault(request.endpoint, threading.BoundedSemaphore(max_concurrent))
+            if not slots.acquire(blocking=False):
+                return self._reject('Server busy, try again shortly', 2)
+            g.concurrency_slot = slots
+        return None
+
+    def _release(self, exc=None):
+        slots = g.pop('concurrency_slot', None)
+        if slots is not None:
+            slots.release()
+
+
+# Process-wide limiter
+limiter = Limiter()
@@ -0,0 +1,97 @@
+"""
+Render cache for the game pages.
+
+The kiosk pages are large templates that render to the same HTML for every
+player, apart from a handful of inputs (the player's industry on the company
+page, the event's industry cards). Templates are compiled once at startup,
+each page is rendered once per distinct set of inputs, and the encoded bytes
+are served with an ETag so a kiosk that already has the page gets a 304.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app, render_template, request
+
+# Rendered for every player; compiled at startup so the first kiosk isn't slow
+GAME_TEMPLATES = [
+    'game/welcome.html',
+    'game/user_info.html',
+    'game/industry_select.html',
+    'game/_industry_grids.html',
+    'game/selfie_capture.html',
+    'game/question.html',
+    'game/feedback.html',
+    'game/company_info.html',
+    'game/thank_you.html',
+    'game/leaderboard.html',
+]
+
+
+class RenderCache:
+    """Rendered pages as bytes, keyed by template and inputs, with ETags"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.max_entries = 256
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()  # (template, key) -> (body, etag, compiled template)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('RENDER_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('RENDER_CACHE_SIZE', 256)
+
+        # Parse and compile the templates now rather than on the first request
+        for name in GAME_TEMPLATES:
+            app.jinja_env.get_template(name)
+
+    def _render(self, template, cache_key, context):
+        key = (template, cache_key)
+        # Jinja hands back a new template object when the file was edited and
+        # auto-reload is on (debug); otherwise this is a dict lookup
+        compiled = self.app.jinja_env.get_template(template)
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None and cached[2] is compiled:
+                self._pages.move_to_end(key)
+                return cached[0], cached[1]
+
+        body = render_template(compiled, **context).encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()[:16]
+        with self._lock:
+            self._pages[key] = (body, etag, compiled)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return body, etag
+
+    def page(self, template, cache_key=None, **context):
+        """Response for a cached page.
+
+        The page is cached per template and cache_key, which defaults to the
+        context itself; pass an explicit key when the context holds large
+        values that are already versioned (e.g. a rendered fragment).
+        """
+        if not self.enabled:
+            return render_template(template, **context)
+
+        if cache_key is None:
+            cache_key = tuple(sorted(context.items()))
+        body, etag = self._render(template, cache_key, context)
+
+        response = current_app.response_class(body, mimetype='text/html')
+        response.set_etag(etag)
+        # Always revalidate, so template changes after a deploy show up at once
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+# Process-wide render cache
+render_cache = RenderCache()
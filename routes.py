@@ -1,11 +1,14 @@
-from app import app, db, Admin, Category, Question, Industry, PreRegisteredUser, User, GameSession, UserJourney
-from flask import render_template, request, jsonify, redirect, url_for, session, send_file, flash
+from app import app, db, Admin, Category, Question, Industry, PreRegisteredUser, NameAlias, User, GameSession, UserJourney, Event, ensure_industries
+from flask import render_template, request, jsonify, redirect, url_for, session, send_file, flash, Response
 from flask_login import login_user, login_required, logout_user, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from sqlalchemy import func, or_
+from sqlalchemy.orm import contains_eager, joinedload
 import os
 import json
+import hashlib
 import random
 import csv
 import openpyxl
@@ -15,151 +18,125 @@ import io
 import base64
 from PIL import Image
 import re
+import uuid
+from question_bank import QuestionBank, ANSWER_TO_INDEX, INDEX_TO_ANSWER
+from question_format import QuestionParser, question_record
+from question_dedup import question_dedup
+from question_search import QuestionSearch
+from answer_log import answer_log
+from event_archive import event_archive
+from tenancy import events, parse_industry_list
+from industry_stats import industry_stats
+from render_cache import render_cache
+from assets import asset_manifest
+from live_stats import live_stats
+from offline_sync import offline_sync, journey_from_session, parse_client_time, OFFLINE_PAGES, OFFLINE_ASSETS
+import metrics
+from metrics import query_budget
+from ratelimit import limiter, rate_limit, concurrency_limit
+from name_match import registrant_matcher
+from canonical import canonicalizer, KINDS as ALIAS_KINDS
 
-# Function to parse questions from all_industries_questions.txt
-def parse_questions_from_file():
-    """Parse all questions from all_industries_questions.txt file"""
-    questions = []
-    file_path = os.path.join(os.path.dirname(__file__), 'all_industries_questions.txt')
-    
-    if not os.path.exists(file_path):
-        return questions
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Split by industry sections
-        industry_sections = re.split(r'INDUSTRY:\s*([^\n]+)', content)
-        
-        # Process each industry section (skip first empty element)
-        for i in range(1, len(industry_sections), 2):
-            if i + 1 < len(industry_sections):
-                industry_name = industry_sections[i].strip()
-                industry_content = industry_sections[i + 1].strip()
-                
-                # Split questions by number pattern
-                question_blocks = re.split(r'\n(?=\d+\.)', industry_content)
-                
-                for block in question_blocks:
-                    if not block.strip():
-                        continue
-                    
-                    lines = block.strip().split('\n')
-                    if len(lines) < 6:  # Need at least question + 4 options + answer
-                        continue
-                    
-                    # Parse question
-                    question_line = lines[0]
-                    question_match = re.match(r'\d+\.\s*(.+)', question_line)
-                    if not question_match:
-                        continue
-                    
-                    question_text = question_match.group(1).strip()
-                    
-                    # Parse options
-                    options = {}
-                    option_lines = []
-                    correct_answer = None
-                    
-                    for line in lines[1:]:
-                        line = line.strip()
-                        if line.startswith(('A.', 'B.', 'C.', 'D.')):
-                            option_letter = line[0]
-                            option_text = line[2:].strip()
-                            options[option_letter] = option_text
-                            option_lines.append(line)
-                        elif line.startswith('Correct Answer:'):
-                            correct_answer = line.replace('Correct Answer:', '').strip()
-                    
-                    # Validate we have all required parts
-                    if len(options) == 4 and correct_answer and question_text:
-                        question_data = {
-                            'id': len(questions) + 1,  # Generate unique ID
-                            'industry': industry_name,
-                            'question': question_text,
-                            'options': options,
-                            'correct_answer': correct_answer
-                        }
-                        questions.append(question_data)
-    
-    except Exception as e:
-        print(f"Error parsing questions file: {e}")
-    
-    return questions
+# Questions are parsed once and served from memory
+question_bank = QuestionBank(os.path.join(os.path.dirname(__file__), 'all_industries_questions.txt'),
+                             question_ids=question_dedup.question_ids,
+                             check_interval=app.config.get('QUESTION_BANK_CHECK_INTERVAL', 2))
+
+# Full-text search over the Question table for the admin panel
+question_search = QuestionSearch(db, Question, Category)
+
+# Answers are written behind the request in journaled batches
+answer_log.init_app(app, db, GameSession)
+
+# Sessions and journeys are kept per event and archived when the event closes
+event_archive.init_app(app, db, Event, [GameSession, UserJourney])
+
+# Per-event question banks and autocomplete indexes, cached LRU
+events.init_app(app, db, Event, Industry, PreRegisteredUser, question_bank, question_dedup)
+
+# Popular industries are ranked from registrant and player data in the background
+industry_stats.init_app(app, db, Industry, PreRegisteredUser, UserJourney)
+
+# Game pages are rendered once per set of inputs and served with ETags
+render_cache.init_app(app)
+
+# Fingerprinted static files from build_assets.py, served immutable and precompressed
+asset_manifest.init_app(app)
+
+# Offline kiosk mode: question packs, a service worker and batched /api/sync
+offline_sync.init_app(app)
+
+# Leaderboard and dashboard figures pushed to browsers as answers come in
+live_stats.init_app(app, db, GameSession, UserJourney)
+
+# Token buckets per client and endpoint, and concurrency caps on expensive views
+limiter.init_app(app)
+
+# Typo-tolerant lookup of pre-registered attendees, kept current as they are uploaded
+registrant_matcher.init_app(app, db, PreRegisteredUser)
+
+# One spelling per company and industry in registrant uploads
+canonicalizer.init_app(app, db, PreRegisteredUser, Industry, NameAlias)
+
+# Content hashes on questions, so imports update rather than duplicate them
+question_dedup.init_app(app, db, Question, Category)
 
 # Game Routes
 @app.route('/')
 def welcome():
-    return render_template('game/welcome.html')
+    return render_cache.page('game/welcome.html')
 
 @app.route('/user-info')
 def user_info():
-    return render_template('game/user_info.html')
+    return render_cache.page('game/user_info.html')
 
 @app.route('/industry-select')
+@query_budget(3)  # Zero once the event and its industry list are cached
 def industry_select():
-    # Top 8 most frequent industries from bulk upload analysis
-    top_industries = ['BFSI', 'Manufacturing', 'New-Age', 'IT/ITES', 'Healthcare/Pharma', 'Automotive', 'Conglomerate', 'Aviation']
-    
-    # Get highlighted industries based on frequency analysis
-    highlighted_industries = []
-    for industry_name in top_industries:
-        industry = Industry.query.filter_by(name=industry_name).first()
-        if industry:
-            highlighted_industries.append(industry)
-        else:
-            # Create industry if it doesn't exist
-            new_industry = Industry(name=industry_name, is_highlighted=True)
-            db.session.add(new_industry)
-            highlighted_industries.append(new_industry)
-    
-    # Get remaining industries
-    other_industries = Industry.query.filter(~Industry.name.in_(top_industries)).all()
-    
-    # Commit any new industries
-    db.session.commit()
-    
-    return render_template('game/industry_select.html',
-                         highlighted_industries=highlighted_industries,
-                         other_industries=other_industries)
+    # The industry cards are rendered once per event and catalog version, and the
+    # page around them once per cards version; seeding happens at startup, so a view never writes
+    context = events.context()
+    version, industry_grids = context.industry_grids()
+    return render_cache.page('game/industry_select.html', cache_key=(context.id, version),
+                             industry_grids=industry_grids)
 
 @app.route('/game/selfie_capture')
 def selfie_capture():
-    return render_template('game/selfie_capture.html')
+    return render_cache.page('game/selfie_capture.html')
 
 @app.route('/selfie-capture')
 def selfie_capture_alt():
-    return render_template('game/selfie_capture.html')
+    return render_cache.page('game/selfie_capture.html')
 
 @app.route('/question')
 def question():
-    return render_template('game/question.html')
+    return render_cache.page('game/question.html')
 
 @app.route('/feedback')
 def feedback():
-    return render_template('game/feedback.html')
+    return render_cache.page('game/feedback.html')
 
 @app.route('/answer-feedback')
 def answer_feedback():
-    return render_template('game/feedback.html')
+    return render_cache.page('game/feedback.html')
 
 @app.route('/company-info')
 def company_info():
     # Get industry from session, default to 'Technology' if not found
     industry = session.get('industry', 'Technology')
-    return render_template('game/company_info.html', industry=industry)
+    return render_cache.page('game/company_info.html', industry=industry)
 
 @app.route('/industry-message')
 def industry_message():
-    return render_template('game/company_info.html')
+    return render_cache.page('game/company_info.html')
 
 @app.route('/thank-you')
 def thank_you():
-    return render_template('game/thank_you.html')
+    return render_cache.page('game/thank_you.html')
 
 # API Routes
 @app.route('/api/get-suggestions', methods=['POST'])
+@rate_limit(5, burst=20)  # Fired as the player types
 def get_suggestions():
     data = request.get_json()
     query = data.get('query', '').strip().lower()
@@ -168,38 +145,51 @@ def get_suggestions():
     if not query or len(query) < 2:
         return jsonify({'suggestions': []})
     
-    suggestions = []
-    
     try:
-        if suggestion_type == 'name':
-            # Read names from bulk upload file
-            names_file = os.path.join('bulk_uploads', 'names_20250914_230351.txt')
-            if os.path.exists(names_file):
-                with open(names_file, 'r', encoding='utf-8') as f:
-                    names = [line.strip() for line in f.readlines() if line.strip()]
-                
-                # Filter names that match the query
-                matching_names = [name for name in names if query in name.lower()]
-                suggestions = matching_names[:10]  # Limit to 10 suggestions
-        
-        elif suggestion_type == 'company':
-            # Read companies from bulk upload file
-            companies_file = os.path.join('bulk_uploads', 'companies_20250914_230351.txt')
-            if os.path.exists(companies_file):
-                with open(companies_file, 'r', encoding='utf-8') as f:
-                    companies = [line.strip() for line in f.readlines() if line.strip()]
-                
-                # Filter companies that match the query
-                matching_companies = [company for company in companies if query in company.lower()]
-                suggestions = matching_companies[:10]  # Limit to 10 suggestions
+        # Names and companies of this event's attendees, indexed in memory per event;
+        # kiosks normally search their own copy (/api/suggestions-index) instead
+        suggestions = events.suggestions().search(suggestion_type, query, limit=10)
+        
+        # Kiosks ask here when their copy has nothing, so fill up with near misses
+        if len(suggestions) < 10 and len(query) >= 3:
+            event_id = events.current_event_id()
+            if suggestion_type == 'company':
+                fuzzy = [company for company, _ in registrant_matcher.match_companies(query, event_id, limit=10)]
+            else:
+                fuzzy = [name for _, name, _ in registrant_matcher.match_names(query, event_id, limit=10)]
+            seen = {value.lower() for value in suggestions}
+            for value in fuzzy:
+                if value.lower() not in seen and len(suggestions) < 10:
+                    seen.add(value.lower())
+                    suggestions.append(value)
     
     except Exception as e:
-        print(f"Error reading bulk upload files: {e}")
+        print(f"Error loading suggestions: {e}")
         return jsonify({'suggestions': []})
     
     return jsonify({'suggestions': suggestions})
 
+@app.route('/api/suggestions-index', methods=['GET'])
+@query_budget(3)  # Event lookup and settings when (re)loaded, and the attendee list when it changed
+def suggestions_index():
+    """The event's autocomplete names and companies, sorted for kiosks to search locally"""
+    index = events.suggestions()
+    body, compressed = index.dictionary()
+    
+    if request.accept_encodings['gzip']:
+        response = app.response_class(compressed, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(index.version + '-gz')
+    else:
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(index.version)
+    response.vary.add('Accept-Encoding')
+    # Kiosks revalidate on every registration page; unchanged indexes cost a 304
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/api/check-user', methods=['POST'])
+@rate_limit(2, burst=10)
 def check_user():
     data = request.get_json()
     name = data.get('name', '').strip().lower()
@@ -207,22 +197,33 @@ def check_user():
     if not name:
         return jsonify({'found': False})
     
-    # Check if user exists in pre-registered users
-    user = PreRegisteredUser.query.filter(
-        PreRegisteredUser.name.ilike(f'%{name}%')
-    ).first()
-    
-    if user:
-        return jsonify({
-            'found': True,
-            'name': user.name,
-            'company_name': user.company_name,
-            'industry': user.industry
-        })
+    # Closest pre-registered attendees, allowing for typos, honorifics and spacing
+    candidates = registrant_matcher.match_names(name, events.current_event_id(), limit=5)
+    if candidates:
+        users = {user.id: user for user in PreRegisteredUser.query.filter(
+            PreRegisteredUser.id.in_([attendee_id for attendee_id, _, _ in candidates])
+        )}
+        # Rows from a rolled-back upload can linger in the index; they are not in the table
+        ranked = [(users[attendee_id], score) for attendee_id, _, score in candidates if attendee_id in users]
+        if ranked:
+            user, score = ranked[0]
+            return jsonify({
+                'found': True,
+                'name': user.name,
+                'company_name': user.company_name,
+                'industry': user.industry,
+                'score': score,
+                'candidates': [
+                    {'name': u.name, 'company_name': u.company_name, 'industry': u.industry, 'score': s}
+                    for u, s in ranked
+                ]
+            })
     
     return jsonify({'found': False})
 
 @app.route('/api/start-game', methods=['POST'])
+@query_budget(3)  # 2, plus one when the current event id is refreshed
+@rate_limit(2, burst=30)  # Keyed by address alone before registration, so a booth's kiosks share it
 def start_game():
     data = request.get_json()
     
@@ -238,13 +239,17 @@ def start_game():
     # Check if this is an industry update for existing session
     if industry and not name and not company_name and 'journey_id' in session:
         try:
-            # Update existing journey with industry
-            journey = UserJourney.query.get(session['journey_id'])
-            if journey:
-                journey.industry = industry
+            # Update existing journey with industry in a single UPDATE, no read first
+            updated = UserJourney.query.filter_by(id=session['journey_id']).update(
+                {'industry': industry}, synchronize_session=False
+            )
+            db.session.commit()
+            if updated:
+                # Bulk UPDATEs bypass the ORM events the statistics listen to
+                industry_stats.record(session.get('event_id'), industry)
                 session['industry'] = industry
-                db.session.commit()
-                return jsonify({'success': True, 'message': 'Industry updated'})
+                return jsonify({'success': True, 'message': 'Industry updated',
+                                'journey': offline_sync.journey_token(session)})
         except Exception as e:
             print(f"Error updating industry: {e}")
             return jsonify({'success': False, 'message': 'Failed to update industry'}), 500
@@ -261,8 +266,7 @@ def start_game():
     
     # Save user information to database
     try:
-        # Generate unique session ID
-        import uuid
+        # One unique ID identifies both the user's session and the journey
         session_id = str(uuid.uuid4())
         
         # Get client information
@@ -283,36 +287,36 @@ def start_game():
             user_agent=user_agent
         )
         
-        db.session.add(new_user)
-        db.session.flush()  # Get the user ID without committing
-        
-        # Create new user journey record to track complete session
-        journey_session_id = str(uuid.uuid4())
+        # Journey record tracks the complete session; contact details stay on the user
+        event_id = events.current_event_id()
         new_journey = UserJourney(
-            user_id=new_user.id,
-            journey_session_id=journey_session_id,
-            name=name,
-            company_name=company_name,
+            user=new_user,
+            event_id=event_id,
+            journey_session_id=session_id,
             industry=industry,
-            email=email,
-            phone=phone,
-            job_title=job_title,
-            department=department,
             journey_start=datetime.utcnow(),
             is_completed=False
         )
         
+        # Both rows go out in one flush and one transaction; read the IDs before
+        # commit expires the objects so no follow-up SELECTs are needed
         db.session.add(new_journey)
+        db.session.flush()
+        user_id = new_user.id
+        journey_id = new_journey.id
         db.session.commit()
         
         # Store user ID and journey ID in session for later reference
-        session['user_id'] = new_user.id
-        session['journey_id'] = new_journey.id
-        session['journey_session_id'] = journey_session_id
+        session['user_id'] = user_id
+        session['journey_id'] = journey_id
+        session['journey_session_id'] = session_id
+        session['event_id'] = event_id
+        live_stats.record_player(event_id)
         
         return jsonify({
             'success': True,
-            'user_id': new_user.id,
+            'user_id': user_id,
+            'journey': offline_sync.journey_token(session),
             'message': 'User information saved successfully'
         })
         
@@ -323,51 +327,47 @@ def start_game():
         # Still allow game to continue even if database save fails
         return jsonify({
             'success': True,
+            'journey': offline_sync.journey_token(session),
             'message': 'Game started (user info stored in session)'
         })
 
 @app.route('/api/get-question', methods=['GET'])
+@query_budget(2)  # Only when the event's settings are (re)loaded, plus its question bank's id lookup
 def get_question():
-    # Get all questions from the text file
-    all_questions = parse_questions_from_file()
+    question_bank = events.question_bank(events.game_event_id())
+    all_ids = question_bank.all_ids()
     
-    if not all_questions:
+    if not all_ids:
         return jsonify({'error': 'No questions available'}), 404
     
     # Get questions that haven't been asked to this user yet
     asked_questions = session.get('asked_questions', [])
+    asked_set = set(asked_questions)
     
     # Filter out already asked questions
-    available_questions = [q for q in all_questions if q['id'] not in asked_questions]
+    available_ids = [qid for qid in all_ids if qid not in asked_set]
     
     # If all questions have been asked, reset the list
-    if not available_questions:
-        available_questions = all_questions
+    if not available_ids:
+        available_ids = all_ids
         session['asked_questions'] = []
         asked_questions = []
     
     # Select a random question from available questions
-    question = random.choice(available_questions)
+    question_id = random.choice(available_ids)
+    question = question_bank.get(question_id)
     
     # Add this question to the asked questions list
-    asked_questions.append(question['id'])
+    asked_questions.append(question_id)
     session['asked_questions'] = asked_questions
     
     # Store question ID in session for answer validation
-    session['current_question_id'] = question['id']
+    session['current_question_id'] = question_id
     session['current_question_correct_answer'] = question['correct_answer']
     
-    # Convert correct answer letter to index for frontend
-    answer_to_index = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
-    correct_answer_index = answer_to_index.get(question['correct_answer'], 0)
-    
-    response = jsonify({
-        'id': question['id'],
-        'question': question['question'],
-        'options': question['options'],
-        'correct_answer': correct_answer_index,
-        'category': question['industry']
-    })
+    # Serve the precomputed payload; only the choice of question is per-user
+    response = app.response_class(question_bank.payload(question_id), mimetype='application/json')
+    response.headers['X-Question-Bank-Version'] = question_bank.version
     
     # Add cache-busting headers
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
@@ -376,11 +376,33 @@ def get_question():
     
     return response
 
+@app.route('/api/questions/<int:question_id>', methods=['GET'])
+def get_question_content(question_id):
+    """Static question content, cacheable by kiosks and revalidated by ETag"""
+    question_bank = events.question_bank(events.game_event_id())
+    payload = question_bank.payload(question_id)
+    if payload is None:
+        return jsonify({'error': 'Question not found'}), 404
+    
+    response = app.response_class(payload, mimetype='application/json')
+    response.set_etag(question_bank.etag(question_id))
+    
+    # Versioned URLs (?v=<bank version>) never change, so they can be cached for good
+    if request.args.get('v') == question_bank.version:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    
+    return response.make_conditional(request)
+
 @app.route('/api/submit-answer', methods=['POST'])
+@query_budget(2)  # Synchronous answer insert, plus reloading the event's settings
+@rate_limit(1, burst=10)  # One answer per question shown
 def submit_answer():
     data = request.get_json()
     selected_answer_index = data.get('selected_answer')
-    question_id = data.get('question_id')
+    # The answer is checked against the question this session was served, so that is the one recorded
+    question_id = session.get('current_question_id')
     time_taken = data.get('time_taken', 30)
     is_timeout = data.get('is_timeout', False)
     
@@ -396,13 +418,9 @@ def submit_answer():
     
     is_correct = selected_answer == correct_answer
     
-    # Get question text from file for display
-    all_questions = parse_questions_from_file()
-    question_text = "Question not found"
-    for q in all_questions:
-        if q['id'] == question_id:
-            question_text = q['question']
-            break
+    # Get question text from the in-memory bank for display
+    bank_question = events.question_bank(events.game_event_id()).get(question_id)
+    question_text = bank_question['question'] if bank_question else "Question not found"
     
     # Store answer in session for feedback
     session['selected_answer'] = selected_answer
@@ -411,91 +429,244 @@ def submit_answer():
     session['question_text'] = question_text
     session['time_taken'] = time_taken
     
-    # Save to database (using question_id as text since it's from file, not DB)
+    # Queue the answer row; the answer log journals it and inserts in batches
+    now = datetime.utcnow()
     try:
-        game_session = GameSession(
-            user_id=session.get('user_id'),
-            journey_id=session.get('journey_id'),  # Link to complete user journey
-            name=session.get('user_name', 'Anonymous'),
-            company_name=session.get('company_name', 'Unknown'),
-            industry=session.get('industry', 'Unknown'),
-            question_id=question_id,  # This will be the file-based question ID
-            selected_answer=selected_answer,
-            is_correct=is_correct,
-            selfie_filename=session.get('selfie_filename'),
-            session_end=datetime.utcnow()
-        )
-        db.session.add(game_session)
-        db.session.commit()
-        print(f"Game session saved with selfie: {session.get('selfie_filename')}")
+        row = {
+            'user_id': session.get('user_id'),
+            'journey_id': session.get('journey_id'),  # Link to complete user journey
+            'event_id': session.get('event_id'),  # Answers stay with the event the journey started in
+            'name': session.get('user_name') or 'Anonymous',
+            'company_name': session.get('company_name') or 'Unknown',
+            'industry': session.get('industry') or 'Unknown',
+            'question_id': question_id,  # Question.id, stable across edits of the question file
+            'selected_answer': selected_answer,
+            'is_correct': is_correct,
+            'selfie_filename': session.get('selfie_filename'),
+            'session_end': now,
+            'created_at': now
+        }
+        answer_log.append(row)
+        live_stats.record_answers([row], committed=not answer_log.enabled)
     except Exception as e:
-        print(f"Error saving game session: {e}")
-        db.session.rollback()
+        app.logger.error(f"Error saving game session: {e}")
     
     return jsonify({
         'correct': is_correct,
-        'correct_answer': question.correct_answer,
-        'explanation': f"The correct answer is {question.correct_answer}"
+        'correct_answer': correct_answer,
+        'explanation': f"The correct answer is {correct_answer}"
     })
 
+def grade_answer(answer, journey, questions, issued):
+    """GameSession row for one submitted answer, checked against a question index.
+
+    Raises ValueError for an unknown question, one the journey was not
+    served (not in issued), or a malformed answer.
+    """
+    if not isinstance(answer, dict):
+        raise ValueError('Answer must be an object')
+    question = questions.get(answer.get('question_id'))
+    if question is None:
+        raise ValueError('Unknown question')
+    if question['id'] not in issued:
+        raise ValueError('Question was not served to this journey')
+    selected_index = answer.get('selected_answer')
+    if selected_index is None and answer.get('is_timeout') is True:
+        selected_answer = ''  # Time ran out before an option was chosen
+    elif isinstance(selected_index, int) and not isinstance(selected_index, bool) and selected_index in INDEX_TO_ANSWER:
+        selected_answer = INDEX_TO_ANSWER[selected_index]
+    else:
+        raise ValueError('selected_answer must be 0, 1, 2 or 3')
+    answered_at = parse_client_time(answer.get('answered_at')) or datetime.utcnow()
+    return {
+        'user_id': journey.get('user_id'),
+        'journey_id': journey.get('journey_id'),
+        'event_id': journey.get('event_id'),
+        'name': journey.get('user_name') or 'Anonymous',
+        'company_name': journey.get('company_name') or 'Unknown',
+        'industry': journey.get('industry') or 'Unknown',
+        'question_id': question['id'],
+        'selected_answer': selected_answer,
+        'is_correct': selected_answer == question['correct_answer'],
+        'selfie_filename': None,
+        'session_end': answered_at,
+        'created_at': answered_at
+    }
+
+def stored_answers(rows):
+    """(journey id, question id) pairs of these rows that already have a stored answer"""
+    journey_ids = {row['journey_id'] for row in rows if row['journey_id']}
+    if not journey_ids:
+        return set()
+    return set(db.session.query(GameSession.journey_id, GameSession.question_id).filter(
+        GameSession.journey_id.in_(journey_ids),
+        GameSession.question_id.in_({row['question_id'] for row in rows})
+    ).all())
+
+def first_answers(rows, stored):
+    """Split rows into each journey's first answer to a question and the repeats"""
+    seen = set(stored)
+    first, repeats = [], []
+    for row in rows:
+        key = (row['journey_id'], row['question_id'])
+        if key in seen:
+            repeats.append(row)
+        else:
+            seen.add(key)
+            first.append(row)
+    return first, repeats
+
+@app.route('/api/submit-answers', methods=['POST'])
+@query_budget(4)  # Answers already stored, one INSERT for the whole batch, the journey's selfie, event settings
+@rate_limit(1, burst=5)  # A batch holds a whole game's answers
+def submit_answers():
+    """Record several answers of one journey in a single transaction.
+
+    The journey is the player's session, which must have started a game, or
+    a journey token from start-game for clients that submit after the
+    session has moved on. Only questions served to the journey count: the
+    session's questions, or the industry's pack for a token. A journey
+    answers each question once; a repeat, or an answer whose id was seen
+    before, is reported as a duplicate instead of stored again.
+    """
+    data = request.get_json(silent=True) or {}
+    answers = data.get('answers')
+    if not isinstance(answers, list) or not answers:
+        return jsonify({'error': 'answers must be a non-empty list'}), 400
+    if len(answers) > app.config.get('SUBMIT_ANSWERS_MAX_BATCH', 100):
+        return jsonify({'error': f"At most {app.config.get('SUBMIT_ANSWERS_MAX_BATCH', 100)} answers per request"}), 413
+    
+    if data.get('journey'):
+        journey = offline_sync.read_journey(data['journey'])
+        if journey is None:
+            return jsonify({'error': 'Invalid or expired journey token'}), 403
+    else:
+        journey = journey_from_session(session)
+    if not journey.get('journey_id'):
+        return jsonify({'error': 'Start a game before submitting answers'}), 403
+    
+    # One freshness check, then every answer is a dict lookup
+    question_bank = events.question_bank(journey.get('event_id') or events.game_event_id())
+    questions = question_bank.index()
+    if data.get('journey'):
+        issued = question_bank.pack_ids(journey.get('industry'))
+    else:
+        issued = set(session.get('asked_questions', []))
+    results = []
+    graded = []  # (answer row, result)
+    claimed = []
+    for answer in answers:
+        answer_id = answer.get('id') if isinstance(answer, dict) else None
+        result = {'id': answer_id} if answer_id else {}
+        results.append(result)
+        try:
+            row = grade_answer(answer, journey, questions, issued)
+        except ValueError as e:
+            result.update(status='rejected', error=str(e))
+            continue
+        if answer_id:
+            if not offline_sync.claim(answer_id):
+                result['status'] = 'duplicate'
+                continue
+            claimed.append(answer_id)
+        graded.append((row, result))
+    
+    # Whatever the client sends as ids, a journey scores each question once
+    rows, repeats = first_answers([row for row, _ in graded], stored_answers([row for row, _ in graded]))
+    repeats = {id(row) for row in repeats}
+    for row, result in graded:
+        if id(row) in repeats:
+            result['status'] = 'duplicate'
+        else:
+            result.update(status='ok', correct=row['is_correct'],
+                          correct_answer=ANSWER_TO_INDEX.get(questions[row['question_id']]['correct_answer'], 0))
+    
+    if rows:
+        selfie_filename = session.get('selfie_filename') if not data.get('journey') else None
+        if selfie_filename is None and journey.get('journey_id'):
+            selfie_filename = db.session.query(UserJourney.selfie_filename).filter_by(
+                id=journey['journey_id']
+            ).scalar()
+        for row in rows:
+            row['selfie_filename'] = selfie_filename
+        
+        try:
+            db.session.execute(db.insert(GameSession), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for answer_id in claimed:
+                offline_sync.release(answer_id)
+            app.logger.error(f"Error saving answer batch: {e}")
+            return jsonify({'error': 'Failed to save answers'}), 503
+        live_stats.record_answers(rows)
+    
+    return jsonify({
+        'results': results,
+        'saved': len(rows),
+        'correct': sum(1 for row in rows if row['is_correct'])
+    })
+
+def store_selfie(image_data, user_name=None):
+    """Write a base64 (or data URL) selfie to the uploads folder and return its filename.
+
+    Raises ValueError for undecodable image data and OSError when the file
+    cannot be written.
+    """
+    # Remove data URL prefix (data:image/jpeg;base64,)
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    
+    # Decode base64 image
+    try:
+        image_binary = base64.b64decode(image_data)
+    except Exception as decode_error:
+        raise ValueError(f'Invalid image data format: {decode_error}')
+    
+    # Ensure selfies directory exists
+    selfies_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'selfies')
+    if not os.path.exists(selfies_dir):
+        os.makedirs(selfies_dir, exist_ok=True)
+    
+    # Generate filename; the random suffix keeps kiosks syncing at once from colliding
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    user_name = (user_name or 'user').replace(' ', '_').replace('/', '_')
+    filename = f"selfie_{timestamp}_{user_name}_{uuid.uuid4().hex[:6]}.jpg"
+    filepath = os.path.join(selfies_dir, filename)
+    
+    with open(filepath, 'wb') as f:
+        f.write(image_binary)
+    
+    app.logger.debug(f"Selfie saved: {filename} ({len(image_binary)} bytes)")
+    return filename
+
 @app.route('/api/save-selfie', methods=['POST'])
+@query_budget(2)
+@rate_limit(0.5, burst=5)
+@concurrency_limit(4)  # Up to 16MB decoded and written each
 def save_selfie():
     try:
-        print("=== SAVE SELFIE REQUEST RECEIVED ===")
         data = request.get_json()
-        print(f"Request data type: {type(data)}")
         
         if not data:
-            print("ERROR: No JSON data received")
             return jsonify({'error': 'No JSON data received'}), 400
             
         image_data = data.get('image')
-        print(f"Image data length: {len(image_data) if image_data else 0}")
         
         if not image_data:
-            print("ERROR: No image data provided")
             return jsonify({'error': 'No image data provided'}), 400
         
-        # Remove data URL prefix (data:image/jpeg;base64,)
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
-            print("Removed data URL prefix")
-        
-        # Decode base64 image
         try:
-            image_binary = base64.b64decode(image_data)
-            print(f"Decoded image size: {len(image_binary)} bytes")
-        except Exception as decode_error:
-            print(f"ERROR: Failed to decode base64 image: {decode_error}")
+            filename = store_selfie(image_data, session.get('user_name'))
+        except ValueError as decode_error:
+            app.logger.warning(f"Failed to decode base64 selfie: {decode_error}")
             return jsonify({'error': 'Invalid image data format'}), 400
-        
-        # Ensure selfies directory exists
-        selfies_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'selfies')
-        print(f"Selfies directory: {selfies_dir}")
-        if not os.path.exists(selfies_dir):
-            os.makedirs(selfies_dir, exist_ok=True)
-            print("Created selfies directory")
-        
-        # Generate filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        user_name = session.get('user_name') or 'user'
-        user_name = user_name.replace(' ', '_').replace('/', '_')
-        filename = f"selfie_{timestamp}_{user_name}.jpg"
-        filepath = os.path.join(selfies_dir, filename)
-        print(f"Saving to: {filepath}")
-        
-        # Save image
-        try:
-            with open(filepath, 'wb') as f:
-                f.write(image_binary)
-            print(f"File written successfully: {os.path.getsize(filepath)} bytes")
-        except Exception as file_error:
-            print(f"ERROR: Failed to write file: {file_error}")
+        except OSError as file_error:
+            app.logger.error(f"Failed to write selfie file: {file_error}")
             return jsonify({'error': 'Failed to write image file'}), 500
         
         # Store filename in session
         session['selfie_filename'] = filename
-        print(f"Session updated with filename: {filename}")
         
         # Update UserJourney record with selfie filename
         try:
@@ -505,62 +676,257 @@ def save_selfie():
                 if journey:
                     journey.selfie_filename = filename
                     db.session.commit()
-                    print(f"UserJourney updated with selfie: {filename}")
         except Exception as journey_error:
-            print(f"Warning: Failed to update UserJourney with selfie: {journey_error}")
+            app.logger.warning(f"Failed to update UserJourney with selfie: {journey_error}")
             # Don't fail the request if journey update fails
         
-        print(f"=== SELFIE SAVED SUCCESSFULLY: {filename} ===")
         return jsonify({'success': True, 'filename': filename})
     
     except Exception as e:
-        print(f"=== ERROR SAVING SELFIE: {str(e)} ===")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception(f"Error saving selfie: {e}")
         return jsonify({'success': False, 'error': f'Failed to save selfie: {str(e)}'}), 500
 
+def end_player_session():
+    """Clear the player's session, but keep the kiosk on its event"""
+    event_slug = session.get('event_slug')
+    session.clear()
+    if event_slug:
+        session['event_slug'] = event_slug
+
 @app.route('/api/complete-game', methods=['POST'])
+@query_budget(1)
 def complete_game():
     try:
-        # Mark UserJourney as completed when user reaches gift collection
+        # Mark UserJourney as completed when user reaches gift collection.
+        # The answer itself was already recorded by submit_answer.
         journey_id = session.get('journey_id')
         if journey_id:
-            journey = UserJourney.query.get(journey_id)
-            if journey:
-                journey.is_completed = True
-                journey.journey_end = datetime.utcnow()
-                print(f"UserJourney {journey_id} marked as completed")
-                # Commit the journey completion immediately to ensure it's saved
-                db.session.commit()
-        
-        # Create final game session record if needed
-        if session.get('current_question_id'):
-            game_session = GameSession(
-                user_id=session.get('user_id'),
-                journey_id=journey_id,
-                name=session.get('user_name'),
-                company_name=session.get('company_name'),
-                industry=session.get('industry'),
-                question_id=session.get('current_question_id'),
-                selected_answer=session.get('selected_answer'),
-                is_correct=session.get('is_correct'),
-                selfie_filename=session.get('selfie_filename'),
-                session_end=datetime.utcnow()
+            UserJourney.query.filter_by(id=journey_id).update(
+                {'is_completed': True, 'journey_end': datetime.utcnow()},
+                synchronize_session=False
             )
-            
-            db.session.add(game_session)
             db.session.commit()
+            live_stats.record_completion(session.get('event_id'))
         
-        # Clear session
-        session.clear()
+        end_player_session()
         
         return jsonify({'success': True})
     
     except Exception as e:
         db.session.rollback()
-        print(f"Error completing game: {e}")
+        app.logger.error(f"Error completing game: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Offline Kiosk Routes
+@app.route('/sw.js')
+def service_worker():
+    """Service worker for offline kiosks; served from the root so it controls every game page"""
+    if not offline_sync.enabled:
+        return jsonify({'error': 'Offline kiosk mode is disabled'}), 404
+    
+    assets = [url_for('static', filename=name) for name in OFFLINE_ASSETS]
+    # Fingerprinted asset URLs change with every build, and with them the cache name
+    version = hashlib.sha1(json.dumps([OFFLINE_PAGES, assets]).encode('utf-8')).hexdigest()[:12]
+    body = render_template('game/sw.js', pages=OFFLINE_PAGES, assets=assets, version=version)
+    response = app.response_class(body, mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Service-Worker-Allowed'] = '/'
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/api/question-pack', methods=['GET'])
+@query_budget(2)  # Only when the event's settings are (re)loaded, plus its question bank's id lookup
+def question_pack():
+    """All of an event's questions for an industry in one response, for offline play"""
+    if not offline_sync.enabled:
+        return jsonify({'error': 'Offline kiosk mode is disabled'}), 404
+    
+    question_bank = events.question_bank(events.game_event_id())
+    industry = request.args.get('industry') or session.get('industry')
+    body, etag = question_bank.pack(industry)
+    
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['X-Question-Bank-Version'] = question_bank.version
+    # The service worker serves its copy and revalidates in the background
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/sync', methods=['POST'])
+@query_budget(6)  # Answers and selfies already stored, selfie and completion updates, one answer INSERT, event settings
+@rate_limit(2, burst=10)
+@concurrency_limit(4)  # Kiosks retry rejected batches on their next flush
+def sync_offline_items():
+    """Apply a batch of answers, selfies and completions queued by an offline kiosk.
+
+    Items are applied in order and each gets its own result, so the kiosk can
+    drop what was stored (or rejected for good) and resend only what failed.
+    """
+    if not offline_sync.enabled:
+        return jsonify({'error': 'Offline kiosk mode is disabled'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list):
+        return jsonify({'error': 'items must be a list'}), 400
+    if len(items) > offline_sync.max_batch:
+        return jsonify({'error': f'At most {offline_sync.max_batch} items per batch'}), 413
+    
+    results = []
+    questions = {}  # event id -> question index
+    packs = {}  # (event id, industry) -> ids of the questions a kiosk may answer
+    answers = []  # (answer row, journey, result)
+    selfies = {}  # journey id -> selfie filename from this batch
+    completed = {}  # journey id -> event id
+    
+    for item in items:
+        item_id = item.get('id') if isinstance(item, dict) else None
+        result = {'id': item_id}
+        results.append(result)
+        
+        journey = offline_sync.read_journey(item.get('journey')) if item_id else None
+        if journey is None:
+            result.update(status='rejected', error='Missing id or invalid journey token')
+            continue
+        if not offline_sync.claim(item_id):
+            result['status'] = 'duplicate'
+            continue
+        
+        kind = item.get('type')
+        try:
+            if kind == 'answer':
+                event_id = journey['event_id']
+                if event_id not in questions:
+                    questions[event_id] = events.question_bank(event_id).index()
+                pack = (event_id, journey['industry'])
+                if pack not in packs:
+                    packs[pack] = events.question_bank(event_id).pack_ids(journey['industry'])
+                row = grade_answer(item, journey, questions[event_id], packs[pack])
+                answers.append((row, journey, result))
+                result.update(status='ok', correct=row['is_correct'])
+            elif kind == 'selfie':
+                filename = store_selfie(item.get('image') or '', journey['user_name'])
+                if journey['journey_id']:
+                    selfies[journey['journey_id']] = filename
+                result.update(status='ok', filename=filename)
+            elif kind == 'complete':
+                if journey['journey_id']:
+                    completed[journey['journey_id']] = journey['event_id']
+                result['status'] = 'ok'
+            else:
+                raise ValueError(f'Unknown item type: {kind}')
+        except (ValueError, KeyError, TypeError) as e:
+            result.update(status='rejected', error=str(e))
+        except OSError as e:
+            offline_sync.release(item_id)
+            app.logger.error(f"Offline sync failed to store {kind}: {e}")
+            result.update(status='retry', error='Could not be stored, will be retried')
+    
+    try:
+        # A journey scores each question once, whatever item ids the kiosk sends
+        _, repeats = first_answers([row for row, _, _ in answers], stored_answers([row for row, _, _ in answers]))
+        repeats = {id(row) for row in repeats}
+        for row, _, result in answers:
+            if id(row) in repeats:
+                result.pop('correct')
+                result['status'] = 'duplicate'
+        answers = [(row, journey) for row, journey, _ in answers if id(row) not in repeats]
+        
+        # Answers record the journey's selfie, whether it came in this batch or an earlier one
+        missing = {journey['journey_id'] for _, journey in answers
+                   if journey['journey_id'] and journey['journey_id'] not in selfies}
+        saved_selfies = dict(db.session.query(UserJourney.id, UserJourney.selfie_filename).filter(
+            UserJourney.id.in_(missing), UserJourney.selfie_filename.isnot(None)
+        ).all()) if missing else {}
+        
+        for journey_id, filename in selfies.items():
+            UserJourney.query.filter_by(id=journey_id).update(
+                {'selfie_filename': filename}, synchronize_session=False
+            )
+        if completed:
+            UserJourney.query.filter(UserJourney.id.in_(list(completed))).update(
+                {'is_completed': True, 'journey_end': datetime.utcnow()}, synchronize_session=False
+            )
+        if answers:
+            for row, journey in answers:
+                row['selfie_filename'] = selfies.get(journey['journey_id']) or saved_selfies.get(journey['journey_id'])
+            db.session.execute(db.insert(GameSession), [row for row, _ in answers])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Offline sync failed to save the batch: {e}")
+        # Nothing in this batch is stored; the kiosk resends all of it
+        for result in results:
+            if result.get('status') == 'ok':
+                offline_sync.release(result['id'])
+                result.update(status='retry', error='Could not be stored, will be retried')
+        return jsonify({'results': results}), 503
+    
+    live_stats.record_answers([row for row, _ in answers])
+    for event_id in completed.values():
+        live_stats.record_completion(event_id)
+    
+    # The kiosk finished this player's game while its session still belongs to them
+    if session.get('journey_id') in completed:
+        end_player_session()
+    
+    return jsonify({'results': results})
+
+# Live Leaderboard Routes
+@app.route('/leaderboard')
+def leaderboard():
+    """Booth screen with the event's live leaderboard"""
+    return render_cache.page('game/leaderboard.html')
+
+@app.route('/api/leaderboard/stream')
+@query_budget(1)  # Only when the current event id is refreshed
+def leaderboard_stream():
+    """Server-sent events with the event's leaderboard snapshot and then deltas.
+
+    Admins can pass ?scope=all to receive the deltas of every event, which is
+    what the dashboard counters use.
+    """
+    if not live_stats.enabled:
+        return jsonify({'error': 'Live statistics are disabled'}), 404
+    
+    if request.args.get('scope') == 'all':
+        if not current_user.is_authenticated:
+            return jsonify({'error': 'Login required'}), 401
+        event_id = None
+    else:
+        event_id = events.current_event_id()
+    
+    async_body = request.environ.get('game.async_body')
+    threaded = async_body is None
+    if not live_stats.connect(threaded):
+        # Pages fall back to polling /api/leaderboard
+        response = jsonify({'error': 'Too many viewers, try again shortly'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if async_body is not None:
+        # Served by asgi.py: the stream waits on the event loop instead of holding a thread
+        async_body(live_stats.astream(event_id, last_id))
+        response = Response(iter(()), mimetype='text/event-stream')
+    else:
+        response = Response(live_stats.stream(event_id, last_id), mimetype='text/event-stream')
+    response.call_on_close(lambda: live_stats.disconnect(threaded))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+@app.route('/api/leaderboard', methods=['GET'])
+@query_budget(1)  # Only when the current event id is refreshed
+def leaderboard_snapshot():
+    """The event's leaderboard once, for screens polling when the stream is full"""
+    if not live_stats.enabled:
+        return jsonify({'error': 'Live statistics are disabled'}), 404
+    
+    response = jsonify(live_stats.snapshot(events.current_event_id()))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # Admin Routes
 @app.route('/admin')
 @app.route('/admin/dashboard')
@@ -568,8 +934,8 @@ def admin_dashboard():
     if not current_user.is_authenticated:
         return redirect(url_for('admin_login'))
     
-    # Get statistics
-    total_sessions = GameSession.query.count()
+    # Get statistics (sessions for the current event; closed events are archived)
+    total_sessions = GameSession.query.filter_by(event_id=events.current_event_id()).count()
     total_questions = Question.query.count()
     total_categories = Category.query.count()
     total_users = PreRegisteredUser.query.count()
@@ -625,7 +991,7 @@ def admin_logout():
 @app.route('/admin/questions')
 @login_required
 def admin_questions():
-    questions = Question.query.join(Category).all()
+    questions = Question.query.join(Category).options(contains_eager(Question.category)).all()
     categories = Category.query.all()
     return render_template('admin/questions.html', questions=questions, categories=categories)
 
@@ -634,6 +1000,12 @@ def admin_questions():
 def admin_analytics():
     return render_template('admin/analytics.html')
 
+@app.route('/admin/kiosk')
+@login_required
+def admin_kiosk():
+    """Enroll the browser this page is opened on as an offline kiosk (see static/js/kiosk.js)"""
+    return render_template('admin/kiosk.html')
+
 @app.route('/admin/users')
 @login_required
 def admin_users():
@@ -647,6 +1019,8 @@ def admin_users():
                          industries=industries)
 
 @app.route('/admin/export-data')
+@query_budget(2)
+@concurrency_limit(2, login_required=True)
 @login_required
 def export_data():
     # Create Excel workbook
@@ -665,9 +1039,13 @@ def export_data():
         cell.alignment = Alignment(horizontal='center')
     
     # Data
-    sessions = GameSession.query.join(User, GameSession.user_id == User.id, isouter=True).all()
+    # Load users and questions in the same query instead of once per row
+    sessions = GameSession.query.options(
+        joinedload(GameSession.user),
+        joinedload(GameSession.question)
+    ).all()
     for row, session in enumerate(sessions, 2):
-        user = session.user if hasattr(session, 'user') and session.user else None
+        user = session.user
         
         ws.cell(row=row, column=1, value=session.id)
         ws.cell(row=row, column=2, value=session.name)
@@ -702,54 +1080,50 @@ def export_data():
 
 # Questions CRUD API
 @app.route('/admin/api/questions', methods=['GET'])
+@query_budget(3)
 @login_required
 def get_questions():
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-        search = request.args.get('search', '')
+        per_page = min(int(request.args.get('per_page', 10)), 100)
+        search = request.args.get('search', '').strip()
         category_id = request.args.get('category', '')
+        event_id = request.args.get('event_id', type=int)
+        cursor = request.args.get('cursor') or None
+        page = request.args.get('page', type=int)
         
-        query = Question.query
-        
-        # Apply search filter
-        if search:
-            query = query.filter(Question.question_text.contains(search))
-        
-        # Apply category filter
-        if category_id:
-            query = query.filter(Question.category_id == int(category_id))
-        
-        # Join with category for sorting and display
-        query = query.join(Category).order_by(Question.created_at.desc())
-        
-        # Paginate results
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        try:
+            questions_page, pagination = question_search.search(
+                search=search,
+                category_id=int(category_id) if category_id else None,
+                event_id=event_id,
+                cursor=cursor,
+                limit=per_page,
+                page=page
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         
         questions = [{
             'id': q.id,
             'category_id': q.category_id,
             'category_name': q.category.name,
+            'event_id': q.event_id,
             'question_text': q.question_text,
             'option_a': q.option_a,
             'option_b': q.option_b,
             'option_c': q.option_c,
             'option_d': q.option_d,
             'correct_answer': q.correct_answer,
-            'created_at': q.created_at.isoformat()
-        } for q in pagination.items]
+            'created_at': q.created_at.isoformat() if q.created_at else None
+        } for q in questions_page]
+        
+        if page:
+            pagination['page'] = page
         
         return jsonify({
             'success': True,
             'questions': questions,
-            'pagination': {
-                'page': page,
-                'pages': pagination.pages,
-                'per_page': per_page,
-                'total': pagination.total
-            }
+            'pagination': pagination
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -798,8 +1172,15 @@ def add_question():
         if not category:
             return jsonify({'success': False, 'message': 'Invalid category'}), 400
         
+        options = [data[f'option_{letter}'].strip() for letter in 'abcd']
+        duplicate = question_dedup.find(category.name, data['question_text'].strip(), options,
+                                        event_id=data.get('event_id'))
+        if duplicate:
+            return jsonify({'success': False, 'message': f'This question already exists (id {duplicate.id})'}), 409
+        
         question = Question(
             category_id=data['category_id'],
+            event_id=data.get('event_id'),  # Omit to use the question at every event
             question_text=data['question_text'].strip(),
             option_a=data['option_a'].strip(),
             option_b=data['option_b'].strip(),
@@ -810,6 +1191,9 @@ def add_question():
         
         db.session.add(question)
         db.session.commit()
+        if question.event_id:
+            # The event's games serve it from their next question on
+            events.forget(event_id=question.event_id)
         
         return jsonify({
             'success': True,
@@ -842,6 +1226,12 @@ def update_question(question_id):
         if not category:
             return jsonify({'success': False, 'message': 'Invalid category'}), 400
         
+        options = [data[f'option_{letter}'].strip() for letter in 'abcd']
+        duplicate = question_dedup.find(category.name, data['question_text'].strip(), options,
+                                        exclude_id=question_id, event_id=question.event_id)
+        if duplicate:
+            return jsonify({'success': False, 'message': f'Another question has the same text and options (id {duplicate.id})'}), 409
+        
         # Update question fields
         question.category_id = data['category_id']
         question.question_text = data['question_text'].strip()
@@ -852,6 +1242,8 @@ def update_question(question_id):
         question.correct_answer = data['correct_answer']
         
         db.session.commit()
+        if question.event_id:
+            events.forget(event_id=question.event_id)
         
         return jsonify({
             'success': True,
@@ -875,8 +1267,11 @@ def delete_question(question_id):
                 'message': f'Cannot delete question. It has been used in {game_sessions} game sessions.'
             }), 400
         
+        event_id = question.event_id
         db.session.delete(question)
         db.session.commit()
+        if event_id:
+            events.forget(event_id=event_id)
         
         return jsonify({
             'success': True,
@@ -886,7 +1281,32 @@ def delete_question(question_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def import_summary(counts):
+    """Response body for a question import from its new/changed/unchanged counts"""
+    return {
+        'success': True,
+        'imported_count': counts['new'],
+        'new_count': counts['new'],
+        'changed_count': counts['changed'],
+        'unchanged_count': counts['unchanged'],
+        'message': f"Imported {counts['new']} new questions, updated {counts['changed']}, "
+                   f"{counts['unchanged']} already up to date"
+    }
+
+@app.route('/admin/api/questions/near-duplicates', methods=['GET'])
+@login_required
+def question_near_duplicates():
+    """Pairs of similar questions, e.g. the same question under two industries with reworded options"""
+    try:
+        threshold = request.args.get('threshold', type=float)
+        pairs = question_dedup.near_duplicates(threshold, limit=request.args.get('limit', 200, type=int),
+                                               cross_industry=request.args.get('cross_industry') == '1')
+        return jsonify({'success': True, 'pairs': pairs})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @app.route('/admin/api/questions/bulk-import', methods=['POST'])
+@concurrency_limit(1, login_required=True)
 @login_required
 def bulk_import_questions():
     try:
@@ -906,7 +1326,7 @@ def bulk_import_questions():
         os.makedirs('temp', exist_ok=True)
         file.save(temp_path)
         
-        imported_count = 0
+        records = []
         errors = []
         
         try:
@@ -916,7 +1336,7 @@ def bulk_import_questions():
                     reader = csv.DictReader(csvfile)
                     for row_num, row in enumerate(reader, start=2):
                         try:
-                            imported_count += process_question_row(row, row_num)
+                            records.append(process_question_row(row, row_num))
                         except Exception as e:
                             errors.append(f'Row {row_num}: {str(e)}')
             else:
@@ -933,10 +1353,12 @@ def bulk_import_questions():
                     
                     try:
                         row_dict = dict(zip(headers, row))
-                        imported_count += process_question_row(row_dict, row_num)
+                        records.append(process_question_row(row_dict, row_num))
                     except Exception as e:
                         errors.append(f'Row {row_num}: {str(e)}')
             
+            # Questions already in the bank are updated, not added again
+            counts = question_dedup.upsert(records)
             db.session.commit()
             
         finally:
@@ -944,11 +1366,7 @@ def bulk_import_questions():
             if os.path.exists(temp_path):
                 os.remove(temp_path)
         
-        response_data = {
-            'success': True,
-            'imported_count': imported_count,
-            'message': f'Successfully imported {imported_count} questions'
-        }
+        response_data = import_summary(counts)
         
         if errors:
             response_data['errors'] = errors
@@ -961,7 +1379,7 @@ def bulk_import_questions():
         return jsonify({'success': False, 'message': f'Import failed: {str(e)}'}), 500
 
 def process_question_row(row, row_num):
-    """Process a single row of question data"""
+    """Validate a row of question data as a QuestionRecord"""
     # Map common column names
     column_mapping = {
         'category': ['category', 'category_name', 'Category', 'Category Name'],
@@ -992,28 +1410,11 @@ def process_question_row(row, row_num):
     if correct_answer not in ['A', 'B', 'C', 'D']:
         raise ValueError('Correct answer must be A, B, C, or D')
     
-    # Find or create category
-    category = Category.query.filter_by(name=data['category']).first()
-    if not category:
-        category = Category(name=data['category'])
-        db.session.add(category)
-        db.session.flush()  # Get the ID without committing
-    
-    # Create question
-    question = Question(
-        category_id=category.id,
-        question_text=data['question'],
-        option_a=data['option_a'],
-        option_b=data['option_b'],
-        option_c=data['option_c'],
-        option_d=data['option_d'],
-        correct_answer=correct_answer
-    )
-    
-    db.session.add(question)
-    return 1  # Successfully processed one question
+    options = [data['option_a'], data['option_b'], data['option_c'], data['option_d']]
+    return question_record(data['category'], data['question'], options, correct_answer, row_num)
 
 @app.route('/admin/api/questions/bulk-import-txt', methods=['POST'])
+@concurrency_limit(1, login_required=True)
 @login_required
 def bulk_import_questions_txt():
     """Bulk import questions from text file with industry-based format"""
@@ -1034,99 +1435,17 @@ def bulk_import_questions_txt():
         os.makedirs('question_files', exist_ok=True)
         file.save(question_files_path)
         
-        # Read file content from saved file
+        # Parsed as it is read, problems collected with their line numbers, and
+        # upserted so questions already in the bank are updated, not added again
+        parser = QuestionParser()
         with open(question_files_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        lines = [line.strip() for line in content.split('\n') if line.strip()]
-        
-        imported_count = 0
-        errors = []
-        current_industry = None
-        question_count_for_industry = 0
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            
-            # Check if this line is an industry name (starts with INDUSTRY:)
-            if line.startswith('INDUSTRY:'):
-                # Extract industry name after "INDUSTRY: "
-                current_industry = line.replace('INDUSTRY:', '').strip()
-                # Remove any numbering like "17. Construction" -> "Construction"
-                if '. ' in current_industry:
-                    current_industry = current_industry.split('. ', 1)[1]
-                question_count_for_industry = 0
-                i += 1
-                continue
-            
-            # Process question block (numbered questions like "1. What does...")
-            if current_industry and line and line[0].isdigit() and '. ' in line:
-                try:
-                    # Extract question text (remove number and dot)
-                    question_text = line.split('. ', 1)[1].strip()
-                    
-                    # Get options (next 4 lines)
-                    if i + 4 >= len(lines):
-                        errors.append(f'Incomplete question block for industry {current_industry}')
-                        break
-                    
-                    option_a = lines[i + 1].replace('A.', '').strip()
-                    option_b = lines[i + 2].replace('B.', '').strip()
-                    option_c = lines[i + 3].replace('C.', '').strip()
-                    option_d = lines[i + 4].replace('D.', '').strip()
-                    
-                    # Get correct answer (next line)
-                    if i + 5 >= len(lines) or not lines[i + 5].startswith('Correct Answer:'):
-                        errors.append(f'Missing answer for question: {question_text[:50]}...')
-                        i += 5
-                        continue
-                    
-                    correct_answer = lines[i + 5].replace('Correct Answer:', '').strip().upper()
-                    
-                    # Validate correct answer
-                    if correct_answer not in ['A', 'B', 'C', 'D']:
-                        errors.append(f'Invalid answer "{correct_answer}" for question: {question_text[:50]}...')
-                        i += 6
-                        continue
-                    
-                    # Find or create category for this industry
-                    category = Category.query.filter_by(name=current_industry).first()
-                    if not category:
-                        category = Category(name=current_industry)
-                        db.session.add(category)
-                        db.session.flush()
-                    
-                    # Create question
-                    question = Question(
-                        category_id=category.id,
-                        question_text=question_text,
-                        option_a=option_a,
-                        option_b=option_b,
-                        option_c=option_c,
-                        option_d=option_d,
-                        correct_answer=correct_answer
-                    )
-                    
-                    db.session.add(question)
-                    imported_count += 1
-                    question_count_for_industry += 1
-                    
-                    # Move to next question block
-                    i += 6
-                    
-                except Exception as e:
-                    errors.append(f'Error processing question in {current_industry}: {str(e)}')
-                    i += 6
-            else:
-                i += 1
+            counts = question_dedup.upsert(parser.parse(f))
+        errors = parser.errors
         
         db.session.commit()
         
-        response_data = {
-            'success': True,
-            'imported_count': imported_count,
-            'message': f'Successfully imported {imported_count} questions from text file'
-        }
+        response_data = import_summary(counts)
+        response_data['duplicates_skipped'] = parser.duplicates
         
         if errors:
             response_data['errors'] = errors
@@ -1146,7 +1465,8 @@ def add_user():
     user = PreRegisteredUser(
         name=data['name'],
         company_name=data['company_name'],
-        industry=data['industry']
+        industry=data['industry'],
+        event_id=data.get('event_id', events.current_event_id())  # null shares the attendee with every event
     )
     
     db.session.add(user)
@@ -1166,17 +1486,22 @@ def add_category():
     return jsonify({'success': True})
 
 @app.route('/admin/api/categories', methods=['GET'])
+@query_budget(2)
 @login_required
 def get_categories():
-    categories = Category.query.all()
+    # Count questions in the database instead of loading each category's questions
+    categories = db.session.query(
+        Category,
+        func.count(Question.id).label('question_count')
+    ).outerjoin(Question).group_by(Category.id).all()
     return jsonify({
         'success': True,
         'categories': [{
             'id': c.id, 
             'name': c.name, 
-            'created_at': c.created_at.isoformat(),
-            'question_count': len(c.questions)
-        } for c in categories]
+            'created_at': c.created_at.isoformat() if c.created_at else None,
+            'question_count': question_count
+        } for c, question_count in categories]
     })
 
 @app.route('/admin/api/categories/<int:category_id>', methods=['PUT'])
@@ -1185,6 +1510,8 @@ def update_category(category_id):
     data = request.get_json()
     category = Category.query.get_or_404(category_id)
     category.name = data['name']
+    # Question hashes include the industry, so the category's questions are re-identified
+    question_dedup.rehash_category(category)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -1193,13 +1520,34 @@ def update_category(category_id):
 def delete_category(category_id):
     category = Category.query.get_or_404(category_id)
     # Check if category has questions
-    if category.questions:
+    if db.session.query(Question.query.filter_by(category_id=category_id).exists()).scalar():
         return jsonify({'success': False, 'message': 'Cannot delete category with existing questions'}), 400
     db.session.delete(category)
     db.session.commit()
     return jsonify({'success': True})
 
+def import_registrants(entries, errors):
+    """Add uploaded (label, name, company, industry) entries to the current event with canonical
+    company and industry names, skipping attendees already registered or repeated in the upload.
+    
+    Returns the number added and the merge report; skipped entries are added to errors.
+    """
+    event_id = events.current_event_id()
+    rows, merge_report = canonicalizer.canonicalize([entry[1:] for entry in entries])
+    duplicates = canonicalizer.duplicates(rows, event_id)
+    users = []
+    for index, (entry, (name, company, industry)) in enumerate(zip(entries, rows)):
+        if index in duplicates:
+            earlier = duplicates[index]
+            where = 'already exists' if earlier is None else f'repeats {entries[earlier][0]}'
+            errors.append(f'{entry[0]}: User "{name}" from "{company}" in "{industry}" {where}')
+            continue
+        users.append(PreRegisteredUser(name=name, company_name=company, industry=industry, event_id=event_id))
+    db.session.add_all(users)
+    return len(users), merge_report
+
 @app.route('/admin/api/bulk-users', methods=['POST'])
+@concurrency_limit(1, login_required=True)
 @login_required
 def bulk_add_users():
     try:
@@ -1218,7 +1566,7 @@ def bulk_add_users():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
-        users_added = 0
+        entries = []
         errors = []
         
         try:
@@ -1233,13 +1581,7 @@ def bulk_add_users():
                                 errors.append(f'Row {row_num}: Missing required fields (name, company_name, industry)')
                                 continue
                             
-                            user = PreRegisteredUser(
-                                name=row['name'].strip(),
-                                company_name=row['company_name'].strip(),
-                                industry=row['industry'].strip()
-                            )
-                            db.session.add(user)
-                            users_added += 1
+                            entries.append((f'Row {row_num}', row['name'], row['company_name'], row['industry']))
                         except Exception as e:
                             errors.append(f'Row {row_num}: {str(e)}')
             
@@ -1271,16 +1613,12 @@ def bulk_add_users():
                             errors.append(f'Row {row_num}: Missing required fields')
                             continue
                         
-                        user = PreRegisteredUser(
-                            name=str(row_data['name']).strip(),
-                            company_name=str(row_data['company_name']).strip(),
-                            industry=str(row_data['industry']).strip()
-                        )
-                        db.session.add(user)
-                        users_added += 1
+                        entries.append((f'Row {row_num}', str(row_data['name']), str(row_data['company_name']),
+                                        str(row_data['industry'])))
                     except Exception as e:
                         errors.append(f'Row {row_num}: {str(e)}')
             
+            users_added, merge_report = import_registrants(entries, errors)
             db.session.commit()
             
         finally:
@@ -1292,13 +1630,15 @@ def bulk_add_users():
             'success': True,
             'message': f'Successfully added {users_added} users',
             'users_added': users_added,
-            'errors': errors
+            'errors': errors,
+            'merge_report': merge_report
         })
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error processing file: {str(e)}'}), 500
 
 @app.route('/admin/api/bulk-users-txt', methods=['POST'])
+@concurrency_limit(1, login_required=True)
 @login_required
 def bulk_add_users_txt():
     try:
@@ -1364,45 +1704,21 @@ def bulk_add_users_txt():
         if len(names) == 0:
             return jsonify({'success': False, 'message': 'All files are empty'}), 400
         
-        users_added = 0
         errors = []
-        
-        # Process each user serially
+        entries = []
         for i in range(len(names)):
-            try:
-                name = names[i]
-                company = companies[i]
-                industry = industries[i]
-                
-                # Validate that none are empty
-                if not name or not company or not industry:
-                    errors.append(f'Line {i+1}: Empty field(s) - Name: "{name}", Company: "{company}", Industry: "{industry}"')
-                    continue
-                
-                # Check if user already exists
-                existing_user = PreRegisteredUser.query.filter_by(
-                    name=name, 
-                    company_name=company, 
-                    industry=industry
-                ).first()
-                
-                if existing_user:
-                    errors.append(f'Line {i+1}: User "{name}" from "{company}" in "{industry}" already exists')
-                    continue
-                
-                # Create new user
-                user = PreRegisteredUser(
-                    name=name,
-                    company_name=company,
-                    industry=industry
-                )
-                db.session.add(user)
-                users_added += 1
-                
-            except Exception as e:
-                errors.append(f'Line {i+1}: {str(e)}')
+            name = names[i]
+            company = companies[i]
+            industry = industries[i]
+            
+            # Validate that none are empty
+            if not name or not company or not industry:
+                errors.append(f'Line {i+1}: Empty field(s) - Name: "{name}", Company: "{company}", Industry: "{industry}"')
+                continue
+            entries.append((f'Line {i+1}', name, company, industry))
         
-        # Commit all changes
+        # Canonicalized and checked for duplicates as one batch, then committed together
+        users_added, merge_report = import_registrants(entries, errors)
         db.session.commit()
         
         return jsonify({
@@ -1411,6 +1727,7 @@ def bulk_add_users_txt():
             'users_added': users_added,
             'total_processed': len(names),
             'errors': errors,
+            'merge_report': merge_report,
             'saved_files': {
                 'names_file': names_path,
                 'companies_file': companies_path,
@@ -1422,13 +1739,56 @@ def bulk_add_users_txt():
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Error processing files: {str(e)}'}), 500
 
+@app.route('/admin/api/aliases', methods=['GET'])
+@login_required
+def list_aliases():
+    """Company and industry spellings that uploads map to another name"""
+    aliases = NameAlias.query.order_by(NameAlias.kind, NameAlias.alias).all()
+    return jsonify({
+        'success': True,
+        'aliases': [{
+            'id': a.id,
+            'kind': a.kind,
+            'alias': a.alias,
+            'canonical': a.canonical
+        } for a in aliases]
+    })
+
+@app.route('/admin/api/aliases', methods=['POST'])
+@login_required
+def add_alias():
+    """Map a spelling to a company or industry name in future uploads (existing rows are not changed)"""
+    data = request.get_json() or {}
+    kind = data.get('kind')
+    alias = (data.get('alias') or '').strip()
+    canonical = (data.get('canonical') or '').strip()
+    if kind not in ALIAS_KINDS or not alias or not canonical:
+        return jsonify({'success': False, 'message': f'kind ({" or ".join(ALIAS_KINDS)}), alias and canonical are required'}), 400
+    
+    existing = NameAlias.query.filter_by(kind=kind, alias=alias).first()
+    if existing:
+        existing.canonical = canonical
+    else:
+        existing = NameAlias(kind=kind, alias=alias, canonical=canonical)
+        db.session.add(existing)
+    db.session.commit()
+    return jsonify({'success': True, 'id': existing.id})
+
+@app.route('/admin/api/aliases/<int:alias_id>', methods=['DELETE'])
+@login_required
+def delete_alias(alias_id):
+    alias = NameAlias.query.get_or_404(alias_id)
+    db.session.delete(alias)
+    db.session.commit()
+    return jsonify({'success': True})
+
 @app.route('/admin/api/dashboard-stats', methods=['GET'])
 @login_required
 def get_dashboard_stats():
     """Get comprehensive dashboard statistics"""
     try:
         from datetime import datetime, timedelta
-        from sqlalchemy import func, text
+        from sqlalchemy import case, func, text
         
         today = datetime.now().date()
         
@@ -1455,10 +1815,10 @@ def get_dashboard_stats():
         
         # Most difficult questions (lowest success rate)
         difficult_questions = db.session.query(
-            Question.question,
+            Question.question_text.label('question'),
             Category.name.label('category_name'),
             func.count(GameSession.id).label('attempts'),
-            func.avg(func.case([(GameSession.is_correct == True, 1)], else_=0)).label('success_rate')
+            func.avg(case((GameSession.is_correct == True, 1), else_=0)).label('success_rate')
         ).join(Category).outerjoin(GameSession).group_by(Question.id).having(
             func.count(GameSession.id) > 0
         ).order_by(text('success_rate ASC')).limit(5).all()
@@ -1477,6 +1837,7 @@ def get_dashboard_stats():
             'users_today': users_today,
             'games_today': games_today,
             'avg_score': avg_score,
+            'correct_answers': correct_answers,
             'recent_games': recent_games,
             'category_stats': [{
                 'name': stat.name,
@@ -1503,27 +1864,30 @@ def get_dashboard_stats():
 def get_question_analytics():
     """Get detailed question analytics"""
     try:
-        from sqlalchemy import func, text
+        from sqlalchemy import case, func
         
         # Question performance analytics
         question_performance = db.session.query(
             Question.id,
-            Question.question,
+            Question.question_text.label('question'),
             Category.name.label('category_name'),
             func.count(GameSession.id).label('total_attempts'),
-            func.sum(func.case([(GameSession.is_correct == True, 1)], else_=0)).label('correct_attempts'),
-            func.avg(func.case([(GameSession.is_correct == True, 100)], else_=0)).label('avg_score_when_answered')
+            func.sum(case((GameSession.is_correct == True, 1), else_=0)).label('correct_attempts'),
+            func.avg(case((GameSession.is_correct == True, 100), else_=0)).label('avg_score_when_answered')
         ).join(Category).outerjoin(GameSession).group_by(
-            Question.id, Question.question, Category.name
+            Question.id, Question.question_text, Category.name
         ).all()
         
-        # Category performance
+        # Category performance; a question's score is the share of its answers that were correct
         category_performance = db.session.query(
             Category.name,
-            func.count(Question.id).label('total_questions'),
+            func.count(func.distinct(Question.id)).label('total_questions'),
             func.count(GameSession.id).label('total_attempts'),
-            func.avg(GameSession.score).label('avg_score')
-        ).outerjoin(Question).outerjoin(GameSession).group_by(
+            func.avg(case((GameSession.id.is_(None), None), (GameSession.is_correct == True, 100),
+                          else_=0)).label('avg_score')
+        ).outerjoin(Question, Question.category_id == Category.id).outerjoin(
+            GameSession, GameSession.question_id == Question.id
+        ).group_by(
             Category.id, Category.name
         ).all()
         
@@ -1559,26 +1923,199 @@ def get_question_analytics():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/admin/api/metrics', methods=['GET'])
+@login_required
+def get_metrics():
+    """Request, SQL and response-size metrics in Prometheus text format"""
+    return app.response_class(
+        metrics.registry.render_prometheus(),
+        mimetype='text/plain; version=0.0.4'
+    )
+
+@app.route('/admin/api/profiles', methods=['GET'])
+@login_required
+def get_profiles():
+    """Recent per-request sampling profiles (collapsed stacks)"""
+    profile_id = request.args.get('id', type=int)
+    if profile_id is not None:
+        for profile in metrics.profiles:
+            if profile['id'] == profile_id:
+                return app.response_class(profile['stacks'], mimetype='text/plain')
+        return jsonify({'success': False, 'message': 'Profile not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'enabled': bool(app.config.get('PROFILING_ENABLED')),
+        'profiles': [{k: v for k, v in p.items() if k != 'stacks'} for p in metrics.profiles]
+    })
+
 @app.route('/admin/api/reset-sessions', methods=['POST'])
 @login_required
 def reset_sessions():
-    """Reset all game sessions and user journeys while keeping user data, questions, and other information intact"""
+    """Start a new event; the closed event's sessions and journeys are archived in the background"""
     try:
-        # Clear session-related data and user journeys
-        GameSession.query.delete()
-        UserJourney.query.delete()
-        db.session.commit()
+        data = request.get_json(silent=True) or {}
+        closed = event_archive.close_event(events.current_event_id(), data.get('name'))
+        events.forget(slug=closed.slug, event_id=closed.id)
+        event_archive.archive_event_async(closed.id)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Started a new event; sessions from "{closed.name}" are being archived',
+            'archived_event_id': closed.id,
+            'current_event_id': events.event_id_for_slug(closed.slug) if closed.slug else None
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+def serialize_event(event, live_rows=None):
+    return {
+        'id': event.id,
+        'name': event.name,
+        'slug': event.slug,
+        'question_file': event.question_file,
+        'highlighted_industries': parse_industry_list(event.highlighted_industries),
+        'started_at': event.started_at.isoformat() if event.started_at else None,
+        'ended_at': event.ended_at.isoformat() if event.ended_at else None,
+        'archived_at': event.archived_at.isoformat() if event.archived_at else None,
+        'archive_file': os.path.basename(event.archive_path) if event.archive_path else None,
+        'archived_sessions': event.archived_sessions or 0,
+        'archived_journeys': event.archived_journeys or 0,
+        'live_rows': live_rows
+    }
+
+def apply_event_settings(event, data):
+    """Copy editable settings from request JSON onto an event; returns an error message or None"""
+    if 'name' in data:
+        if not (data['name'] or '').strip():
+            return 'Event name is required'
+        event.name = data['name'].strip()
+    
+    if 'slug' in data:
+        slug = (data['slug'] or '').strip().lower()
+        if not re.match(r'^[a-z0-9][a-z0-9-]{0,49}$', slug):
+            return 'Slug may contain lowercase letters, digits and dashes'
+        clash = Event.query.filter(Event.slug == slug, Event.ended_at.is_(None), Event.id != event.id).first()
+        if clash:
+            return f'Slug "{slug}" is already used by "{clash.name}"'
+        event.slug = slug
+    
+    if 'question_file' in data:
+        question_file = (data['question_file'] or '').strip() or None
+        if question_file:
+            try:
+                path = events.resolve_question_file(question_file)
+            except ValueError as e:
+                return str(e)
+            if not os.path.exists(path):
+                return f'Question file not found: {question_file}'
+            # Stored now, so the event's question bank finds every question by hash
+            question_dedup.store_file(path)
+        event.question_file = question_file
+    
+    if 'highlighted_industries' in data:
+        highlighted = data['highlighted_industries'] or []
+        if isinstance(highlighted, str):
+            highlighted = parse_industry_list(highlighted)
+        event.highlighted_industries = ','.join(name.strip() for name in highlighted if name.strip()) or None
+    
+    return None
+
+@app.route('/admin/api/events', methods=['GET'])
+@login_required
+def list_events():
+    """List events with their archive status and rows still in the live tables"""
+    try:
+        event_list = Event.query.order_by(Event.id.desc()).all()
+        live_rows = event_archive.hot_row_counts()
         
         return jsonify({
             'success': True,
-            'message': 'All game sessions and user journeys have been reset successfully'
+            'current_event_id': events.current_event_id(),
+            'events': [serialize_event(event, live_rows.get(event.id, {})) for event in event_list]
         })
         
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/admin/api/events', methods=['POST'])
+@login_required
+def create_event():
+    """Open another event to run alongside the others; kiosks join it with ?event=<slug>"""
+    try:
+        data = request.get_json() or {}
+        if not data.get('name') or not data.get('slug'):
+            return jsonify({'success': False, 'message': 'Name and slug are required'}), 400
+        
+        event = Event(started_at=datetime.utcnow())
+        error = apply_event_settings(event, data)
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+        
+        db.session.add(event)
+        db.session.flush()
+        ensure_industries(parse_industry_list(event.highlighted_industries), event.id)
+        db.session.commit()
+        events.forget(slug=event.slug)
+        
+        return jsonify({'success': True, 'event': serialize_event(event)}), 201
+        
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/admin/api/events/<int:event_id>', methods=['PUT'])
+@login_required
+def update_event(event_id):
+    """Change an event's name, slug, question file or highlighted industries"""
+    event = Event.query.get_or_404(event_id)
+    try:
+        old_slug = event.slug
+        
+        error = apply_event_settings(event, request.get_json() or {})
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+        
+        ensure_industries(parse_industry_list(event.highlighted_industries), event.id)
+        db.session.commit()
+        events.forget(slug=old_slug, event_id=event.id)
+        events.forget(slug=event.slug)
+        
+        return jsonify({'success': True, 'event': serialize_event(event)})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/admin/api/events/<int:event_id>/archive', methods=['POST'])
+@login_required
+def archive_event(event_id):
+    """(Re)archive a closed event, e.g. to pick up answers that arrived after it closed"""
+    event = Event.query.get_or_404(event_id)
+    if event.ended_at is None:
+        return jsonify({'success': False, 'message': 'The current event cannot be archived'}), 400
+    
+    if not event_archive.archive_event_async(event.id, delay=0):
+        return jsonify({'success': False, 'message': 'This event is already being archived'}), 409
+    
+    return jsonify({'success': True, 'message': f'Archiving "{event.name}"'}), 202
+
+@app.route('/admin/api/events/<int:event_id>/archive', methods=['GET'])
+@login_required
+def download_event_archive(event_id):
+    """Download the most recent archive file of an event"""
+    event = Event.query.get_or_404(event_id)
+    if not event.archive_path or not os.path.exists(event.archive_path):
+        return jsonify({'success': False, 'message': 'This event has not been archived'}), 404
+    
+    return send_file(event.archive_path, as_attachment=True,
+                     download_name=os.path.basename(event.archive_path),
+                     mimetype='application/gzip')
+
 @app.route('/admin/api/excel-report', methods=['GET'])
+@concurrency_limit(2, login_required=True)  # Builds the whole workbook, with selfies, in memory
 @login_required
 def download_excel_report():
     """Generate and download complete Excel report with user data"""
@@ -1598,22 +2135,25 @@ def download_excel_report():
             cell.alignment = Alignment(horizontal='center')
         
         # Get all completed user journeys in chronological order (most recent first)
-        journeys = UserJourney.query.filter_by(is_completed=True).order_by(UserJourney.journey_start.desc()).all()
+        journeys = UserJourney.query.options(joinedload(UserJourney.user)).filter_by(
+            event_id=events.current_event_id(), is_completed=True
+        ).order_by(UserJourney.journey_start.desc()).all()
         
         # Set row height for images
         ws.row_dimensions[1].height = 20  # Header row
         
         row = 2
         for journey in journeys:
-            # Add user data directly from journey (all data is stored in UserJourney table)
-            ws.cell(row=row, column=1, value=journey.name or 'N/A')
+            # Contact details come from the journey's user, loaded in the same query
+            user = journey.user
+            ws.cell(row=row, column=1, value=user.name or 'N/A')
             ws.cell(row=row, column=2, value=journey.journey_start.strftime('%Y-%m-%d %H:%M:%S') if journey.journey_start else 'N/A')
-            ws.cell(row=row, column=3, value=journey.company_name or 'N/A')
-            ws.cell(row=row, column=4, value=journey.industry or 'N/A')
-            ws.cell(row=row, column=5, value=journey.email or 'N/A')
-            ws.cell(row=row, column=6, value=journey.phone or 'N/A')
-            ws.cell(row=row, column=7, value=journey.job_title or 'N/A')
-            ws.cell(row=row, column=8, value=journey.department or 'N/A')
+            ws.cell(row=row, column=3, value=user.company_name or 'N/A')
+            ws.cell(row=row, column=4, value=journey.industry or user.industry or 'N/A')
+            ws.cell(row=row, column=5, value=user.email or 'N/A')
+            ws.cell(row=row, column=6, value=user.phone or 'N/A')
+            ws.cell(row=row, column=7, value=user.job_title or 'N/A')
+            ws.cell(row=row, column=8, value=user.department or 'N/A')
             
             # Handle selfie image from journey - use filename only to avoid Excel corruption
             if journey.selfie_filename:
@@ -0,0 +1,175 @@
+// Offline kiosk mode: question packs, the IndexedDB outbox and batched sync (see offline_sync.py)
+const Kiosk = (() => {
+    const DB_NAME = 'kiosk';
+    const OUTBOX = 'outbox';
+    const BATCH_SIZE = 20;
+    const SYNC_INTERVAL = 30000; // ms between retries while items are waiting
+    const ENROLLED_KEY = 'kioskEnrolled'; // Set on the kiosk itself from /admin/kiosk
+
+    let dbPromise = null;
+    let flushing = null;
+
+    function supported() {
+        return 'indexedDB' in window && 'serviceWorker' in navigator;
+    }
+
+    // Only browsers an admin enrolled as kiosks play offline; players' own phones stay online
+    function enrolled() {
+        return localStorage.getItem(ENROLLED_KEY) === '1';
+    }
+
+    function enroll() {
+        localStorage.setItem(ENROLLED_KEY, '1');
+        register();
+    }
+
+    // Stop playing offline; anything still queued is sent first
+    async function unenroll() {
+        if (supported()) {
+            await flush();
+            const registrations = await navigator.serviceWorker.getRegistrations();
+            await Promise.all(registrations.map(registration => registration.unregister()));
+        }
+        localStorage.removeItem(ENROLLED_KEY);
+    }
+
+    // Offline play needs a journey token, which the server only issues with offline mode on
+    function active() {
+        return supported() && enrolled() && !!sessionStorage.getItem('journeyToken');
+    }
+
+    // A new player registered: forget what the previous one was asked
+    function newPlayer(token) {
+        sessionStorage.removeItem('askedQuestions');
+        sessionStorage.removeItem('industry');
+        setJourney(token);
+    }
+
+    function setJourney(token, industry) {
+        if (token) {
+            sessionStorage.setItem('journeyToken', token);
+        }
+        if (industry) {
+            sessionStorage.setItem('industry', industry);
+        }
+    }
+
+    function register() {
+        if (!supported()) {
+            return;
+        }
+        navigator.serviceWorker.register('/sw.js', {scope: '/'}).catch(error => {
+            console.warn('Offline kiosk mode unavailable:', error);
+        });
+    }
+
+    function openDb() {
+        if (!dbPromise) {
+            dbPromise = new Promise((resolve, reject) => {
+                const request = indexedDB.open(DB_NAME, 1);
+                request.onupgradeneeded = () => {
+                    request.result.createObjectStore(OUTBOX, {keyPath: 'seq', autoIncrement: true});
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+        }
+        return dbPromise;
+    }
+
+    function transaction(mode, work) {
+        return openDb().then(db => new Promise((resolve, reject) => {
+            const tx = db.transaction(OUTBOX, mode);
+            const result = work(tx.objectStore(OUTBOX));
+            tx.oncomplete = () => resolve(result && 'result' in result ? result.result : result);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        }));
+    }
+
+    function newId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+    }
+
+    // The whole question pack for the player's industry; served by the service worker when offline
+    async function loadPack() {
+        const industry = sessionStorage.getItem('industry') || '';
+        const response = await fetch('/api/question-pack?industry=' + encodeURIComponent(industry));
+        if (!response.ok) {
+            throw new Error('Question pack unavailable');
+        }
+        return response.json();
+    }
+
+    // A question this player has not seen yet, chosen locally like /api/get-question does
+    function pickQuestion(pack) {
+        const asked = JSON.parse(sessionStorage.getItem('askedQuestions') || '[]');
+        let available = pack.questions.filter(q => !asked.includes(q.id));
+        if (!available.length) {
+            available = pack.questions;
+            asked.length = 0;
+        }
+        const question = available[Math.floor(Math.random() * available.length)];
+        asked.push(question.id);
+        sessionStorage.setItem('askedQuestions', JSON.stringify(asked));
+        return question;
+    }
+
+    // Queue an answer, selfie or completion for the server and try to send it straight away
+    async function enqueue(type, data) {
+        const item = Object.assign({id: newId(), type: type, journey: sessionStorage.getItem('journeyToken')}, data);
+        await transaction('readwrite', store => store.add(item));
+        flush();
+        return item.id;
+    }
+
+    function flush() {
+        if (!flushing) {
+            flushing = sendBatches().catch(error => {
+                console.warn('Offline sync postponed:', error);
+            }).finally(() => {
+                flushing = null;
+            });
+        }
+        return flushing;
+    }
+
+    async function sendBatches() {
+        for (;;) {
+            const batch = await transaction('readonly', store => store.getAll(undefined, BATCH_SIZE));
+            if (!batch.length) {
+                return;
+            }
+
+            const response = await fetch('/api/sync', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({items: batch.map(({seq, ...item}) => item)})
+            });
+            const body = await response.json().catch(() => ({}));
+            const results = body.results || [];
+
+            // Stored, already stored, or rejected for good: either way it leaves the outbox
+            const done = new Set(results.filter(r => r.status !== 'retry').map(r => r.id));
+            await transaction('readwrite', store => {
+                batch.filter(item => done.has(item.id)).forEach(item => store.delete(item.seq));
+            });
+            if (!response.ok || done.size < batch.length) {
+                throw new Error('Server asked to retry ' + (batch.length - done.size) + ' items');
+            }
+        }
+    }
+
+    if (supported() && enrolled()) {
+        register();
+        // Drain whatever earlier players left behind, on every page and whenever the network returns
+        window.addEventListener('online', flush);
+        setInterval(flush, SYNC_INTERVAL);
+        flush();
+    }
+
+    return {active, enrolled, enroll, unenroll, newPlayer, setJourney, loadPack, pickQuestion, enqueue, flush};
+})();
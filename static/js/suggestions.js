@@ -0,0 +1,119 @@
+// Registration autocomplete: the event's names and companies are downloaded once (/api/suggestions-index,
+// revalidated by ETag) and searched here; the server is only asked while no fresh copy is available, or for
+// near misses when nothing here matches
+const Suggestions = (() => {
+    const LIMIT = 10;
+
+    let index = null; // {version, maxAge, loadedAt, kinds: {name: {values, keys}, company: {...}}}
+    let loading = null;
+
+    function build(data) {
+        const kinds = {};
+        ['name', 'company'].forEach(kind => {
+            const values = data[kind] || [];
+            // Sorted by these keys on the server, so prefixes can be found by bisection
+            kinds[kind] = {values: values, keys: values.map(value => value.toLowerCase())};
+        });
+        return {version: data.version, maxAge: data.max_age || 600, loadedAt: Date.now(), kinds: kinds};
+    }
+
+    function load() {
+        if (!loading) {
+            loading = fetch('/api/suggestions-index', {cache: 'no-cache'})
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error('HTTP ' + response.status);
+                    }
+                    return response.json();
+                })
+                .then(data => {
+                    index = build(data);
+                })
+                .catch(error => {
+                    console.warn('Suggestion index unavailable:', error);
+                })
+                .finally(() => {
+                    loading = null;
+                });
+        }
+        return loading;
+    }
+
+    function fresh() {
+        return index !== null && Date.now() - index.loadedAt < index.maxAge * 1000;
+    }
+
+    function lowerBound(keys, query) {
+        let low = 0;
+        let high = keys.length;
+        while (low < high) {
+            const middle = (low + high) >> 1;
+            if (keys[middle] < query) {
+                low = middle + 1;
+            } else {
+                high = middle;
+            }
+        }
+        return low;
+    }
+
+    // Same order as the server: values starting with the query, then values containing it
+    function searchLocal(kind, query) {
+        const entries = index.kinds[kind];
+        if (!entries) {
+            return [];
+        }
+        const results = [];
+        for (let i = lowerBound(entries.keys, query); i < entries.keys.length && results.length < LIMIT; i++) {
+            if (!entries.keys[i].startsWith(query)) {
+                break;
+            }
+            results.push(entries.values[i]);
+        }
+        for (let i = 0; i < entries.keys.length && results.length < LIMIT; i++) {
+            const key = entries.keys[i];
+            if (!key.startsWith(query) && key.includes(query)) {
+                results.push(entries.values[i]);
+            }
+        }
+        return results;
+    }
+
+    async function searchServer(kind, query) {
+        const response = await fetch('/api/get-suggestions', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({query: query, type: kind})
+        });
+        if (!response.ok) {
+            throw new Error('HTTP ' + response.status);
+        }
+        const data = await response.json();
+        return data.suggestions || [];
+    }
+
+    async function search(kind, query) {
+        query = query.trim().toLowerCase();
+        if (!fresh()) {
+            // Replace a missing or stale copy first; the server only answers if that fails
+            await load();
+        }
+        if (fresh()) {
+            const results = searchLocal(kind, query);
+            if (results.length || query.length < 3) {
+                return results;
+            }
+            // Nothing starts with or contains it, perhaps a typo: the server also tries near misses
+        }
+        try {
+            return await searchServer(kind, query);
+        } catch (error) {
+            // Offline: an old copy is better than nothing
+            return index ? searchLocal(kind, query) : [];
+        }
+    }
+
+    load();
+
+    return {search, load};
+})();
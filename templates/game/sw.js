@@ -0,0 +1,76 @@
+// Service worker for offline kiosks (see offline_sync.py)
+const CACHE = 'kiosk-{{ version }}';
+const PAGES = {{ pages|tojson }};
+const ASSETS = {{ assets|tojson }};
+
+// Depends on the player's session, so the network wins when it is there
+const NETWORK_FIRST = ['/company-info'];
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE)
+            .then(cache => cache.addAll(PAGES.concat(ASSETS)))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    // Drop caches from previous builds
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => key.startsWith('kiosk-') && key !== CACHE).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (NETWORK_FIRST.includes(url.pathname)) {
+        event.respondWith(networkFirst(request));
+    } else if (url.pathname === '/api/question-pack' || PAGES.includes(url.pathname) || ASSETS.includes(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event, request));
+    }
+    // Everything else (registration, admin, other APIs) goes straight to the network
+});
+
+async function staleWhileRevalidate(event, request) {
+    const cache = await caches.open(CACHE);
+    // Pages are cached without the ?event= that pointed the kiosk at its event
+    const cached = await cache.match(request, {ignoreSearch: request.mode === 'navigate'});
+    const update = fetch(request)
+        .then(response => {
+            if (response.ok) {
+                return cache.put(request, response.clone()).then(() => response);
+            }
+            return response;
+        });
+
+    if (cached) {
+        // Refresh the copy for next time; offline, the cached copy is all there is
+        event.waitUntil(update.catch(() => undefined));
+        return cached;
+    }
+    return update;
+}
+
+async function networkFirst(request) {
+    const cache = await caches.open(CACHE);
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            await cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request, {ignoreSearch: true});
+        if (cached) {
+            return cached;
+        }
+        throw error;
+    }
+}
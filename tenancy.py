@@ -0,0 +1,407 @@
+"""
+Per-event data for running several conferences from one deployment.
+
+A kiosk is pointed at an event once with ?event=<slug> (remembered in its
+session); without one it plays the default event. Each event can have its own
+question file, highlighted industries, industries, questions and
+pre-registered attendees. Rows with no event_id are shared by every event.
+An event with questions of its own gets its own question bank (its rows,
+then its file's questions with its own copies taking their place); the
+others share one bank per question file.
+
+The in-memory data an event needs for play - its question bank, its
+autocomplete index and its rendered industry list - is built on first use and
+kept in a small LRU, so one process can serve many events without reloading
+anything per request.
+"""
+
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from flask import g, has_request_context, render_template, request, session
+from markupsafe import Markup
+from sqlalchemy import event as sa_event, exists as sa_exists, or_
+
+from industry_stats import industry_stats
+from question_bank import QuestionBank
+
+DEFAULT_EVENT_SLUG = 'default'
+
+# Highlighted on the industry screen until live industry statistics are available
+# (top 8 most frequent industries from bulk upload analysis)
+DEFAULT_TOP_INDUSTRIES = ['BFSI', 'Manufacturing', 'New-Age', 'IT/ITES', 'Healthcare/Pharma', 'Automotive', 'Conglomerate', 'Aviation']
+
+# Attendee lists uploaded before events existed; shared by every event
+SHARED_SUGGESTION_FILES = {
+    'name': os.path.join('bulk_uploads', 'names_20250914_230351.txt'),
+    'company': os.path.join('bulk_uploads', 'companies_20250914_230351.txt'),
+}
+
+
+def parse_industry_list(value):
+    """Event.highlighted_industries is stored comma-separated"""
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class SuggestionIndex:
+    """Autocomplete entries for one event, sorted by their lowercased form.
+
+    Values starting with the query come first (found by bisecting the sorted
+    keys), then values containing it elsewhere. Kiosks download the same
+    sorted lists (dictionary()) and search them the same way in
+    static/js/suggestions.js, so the server only answers the odd query from a
+    kiosk whose copy is missing or stale; those results are cached by
+    (kind, query) in a small LRU.
+    """
+
+    def __init__(self, entries, cache_size=1024, max_age=600):
+        # entries: {'name': [...], 'company': [...]}
+        self._values = {}
+        self._keys = {}
+        for kind, values in entries.items():
+            pairs = sorted((value.lower(), value) for value in values)
+            self._keys[kind] = [lowered for lowered, _ in pairs]
+            self._values[kind] = [value for _, value in pairs]
+        self.max_age = max_age
+        self.version = hashlib.sha1(
+            json.dumps(self._values, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:16]
+
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._results = OrderedDict()  # (kind, query, limit) -> suggestions
+        self._dictionary = None
+
+    def search(self, kind, query, limit=10):
+        key = (kind, query.lower(), limit)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                return cached
+
+        matches = self._search(kind, key[1], limit)
+        with self._lock:
+            self._results[key] = matches
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return matches
+
+    def _search(self, kind, query, limit):
+        keys = self._keys.get(kind, [])
+        values = self._values.get(kind, [])
+        matches = []
+        position = bisect.bisect_left(keys, query)
+        while position < len(keys) and keys[position].startswith(query) and len(matches) < limit:
+            matches.append(values[position])
+            position += 1
+        if len(matches) < limit:
+            for lowered, value in zip(keys, values):
+                if query in lowered and not lowered.startswith(query):
+                    matches.append(value)
+                    if len(matches) >= limit:
+                        break
+        return matches
+
+    def dictionary(self):
+        """The whole index as JSON for kiosks, plain and gzipped (built once)"""
+        if self._dictionary is None:
+            body = json.dumps(
+                dict(self._values, version=self.version, max_age=self.max_age),
+                separators=(',', ':'), ensure_ascii=False
+            ).encode('utf-8')
+            self._dictionary = (body, gzip.compress(body, compresslevel=6, mtime=0))
+        return self._dictionary
+
+
+class EventContext:
+    """Everything cached for one event"""
+
+    def __init__(self, registry, event, own_questions, question_bank):
+        self.registry = registry
+        self.id = event.id
+        self.slug = event.slug
+        self.name = event.name
+        self.configured_industries = parse_industry_list(event.highlighted_industries)
+        self.settings = (event.question_file, event.highlighted_industries, own_questions)
+        self.question_bank = question_bank
+        self.loaded_at = time.time()
+        self._suggestions = None
+        self._industry_grids = None  # ((catalog generation, ranking version), markup, digest of the markup)
+
+    @property
+    def suggestions(self):
+        if self._suggestions is None:
+            self._suggestions = self.registry._build_suggestions(self.id)
+        return self._suggestions
+
+    @property
+    def highlighted_industries(self):
+        """Configured for the event, else ranked from live registrant and player data"""
+        return (self.configured_industries
+                or industry_stats.top_industries(self.id)
+                or DEFAULT_TOP_INDUSTRIES)
+
+    def industry_grids(self):
+        """(version, markup) of the industry cards for the selection page, rebuilt when the catalog or ranking changes
+
+        The version is a digest of the markup, so it changes with every re-render
+        that changed the cards, including after reset().
+        """
+        generation = (self.registry.industry_generation, industry_stats.version)
+        cached = self._industry_grids
+        if cached is None or cached[0] != generation:
+            markup = self.registry._render_industry_grids(self)
+            cached = self._industry_grids = (generation, markup,
+                                             hashlib.sha1(markup.encode('utf-8')).hexdigest()[:12])
+        return cached[2], cached[1]
+
+    def reset(self):
+        """Forget derived data so it is rebuilt from the database on next use"""
+        self.loaded_at = time.time()
+        self._suggestions = None
+        self._industry_grids = None
+        if self.settings[2]:
+            # The event's own questions may have been edited in another process
+            self.question_bank.invalidate()
+
+
+class EventRegistry:
+    """Resolves the event for a request and caches per-event data"""
+
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.Event = None
+        self.Industry = None
+        self.PreRegisteredUser = None
+        self.default_bank = None
+        self.cache_size = 8
+        self.cache_ttl = 5
+        self.context_ttl = 300
+
+        self._lock = threading.Lock()
+        self._slugs = {}  # slug -> (event_id, fetched_at)
+        self._contexts = OrderedDict()  # event_id -> EventContext, least recently used first
+        self._banks = {}  # (question file, event id or None) -> QuestionBank, shared by events using the same file
+        self.dedup = None  # QuestionDedup, resolving a bank's questions to Question rows
+        self.industry_generation = 0  # Bumped on every Industry write in this process
+
+    def init_app(self, app, db, event_model, industry_model, preregistered_model, default_bank, dedup):
+        self.app = app
+        self.db = db
+        self.Event = event_model
+        self.Industry = industry_model
+        self.PreRegisteredUser = preregistered_model
+        self.default_bank = default_bank
+        self.dedup = dedup
+        self.cache_size = app.config.get('EVENT_CACHE_SIZE', 8)
+        self.cache_ttl = app.config.get('EVENT_CACHE_TTL', 5)
+        self.context_ttl = app.config.get('EVENT_CONTEXT_TTL', 300)
+
+        # New or edited attendees and industries show up in the cached data of their event
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            sa_event.listen(preregistered_model, event_name, self._attendees_changed)
+            sa_event.listen(industry_model, event_name, self._industries_changed)
+
+        app.before_request(self._remember_event)
+
+    # -- resolving the event ----------------------------------------------------
+
+    def _remember_event(self):
+        # A kiosk opened with ?event=<slug> stays on that event
+        slug = request.args.get('event')
+        if slug and slug != session.get('event_slug') and self.event_id_for_slug(slug) is not None:
+            session['event_slug'] = slug
+
+    def event_id_for_slug(self, slug):
+        """Open event for a slug (cached briefly); None if there is none"""
+        cached = self._slugs.get(slug)
+        if cached and time.time() - cached[1] < self.cache_ttl:
+            return cached[0]
+
+        event_id = self.db.session.query(self.Event.id).filter(
+            self.Event.slug == slug, self.Event.ended_at.is_(None)
+        ).order_by(self.Event.id.desc()).limit(1).scalar()
+
+        self._slugs[slug] = (event_id, time.time())
+        return event_id
+
+    def default_event_id(self):
+        # Created by the create_default_event migration at startup, never per request
+        return self.event_id_for_slug(DEFAULT_EVENT_SLUG)
+
+    def current_event_id(self):
+        """Event for this request: ?event=, then the kiosk's remembered event, then the default"""
+        if not has_request_context():
+            return self.default_event_id()
+        if 'event_id' in g:
+            return g.event_id
+
+        slug = request.args.get('event') or session.get('event_slug')
+        event_id = self.event_id_for_slug(slug) if slug else None
+        if event_id is None:
+            event_id = self.default_event_id()
+        g.event_id = event_id
+        return event_id
+
+    def game_event_id(self):
+        """Event of the player's journey, which outlives the event being closed mid-game"""
+        return session.get('event_id') or self.current_event_id()
+
+    def forget(self, slug=None, event_id=None):
+        """Drop cached data after an event is changed or closed"""
+        with self._lock:
+            if slug is not None:
+                self._slugs.pop(slug, None)
+            if event_id is not None:
+                self._contexts.pop(event_id, None)
+                for (_, bank_event_id), bank in self._banks.items():
+                    if bank_event_id == event_id:
+                        bank.invalidate()
+
+    # -- per-event data ---------------------------------------------------------
+
+    def context(self, event_id=None):
+        """Cached data for an event (the current one by default)"""
+        if event_id is None:
+            event_id = self.current_event_id()
+
+        with self._lock:
+            context = self._contexts.get(event_id)
+            if context is not None:
+                self._contexts.move_to_end(event_id)
+
+        if context is not None and time.time() - context.loaded_at < self.context_ttl:
+            return context
+
+        # Missing or due for a settings check (another process may have edited the event)
+        Question = self.dedup.Question
+        found = self.db.session.query(
+            self.Event, sa_exists().where(Question.event_id == self.Event.id)
+        ).filter(self.Event.id == event_id).first()
+        if found is None:
+            if event_id == self.default_event_id():
+                raise LookupError(f'Event {event_id} not found')
+            return self.context(self.default_event_id())
+        event, own_questions = found
+
+        if context is not None and context.settings == (event.question_file, event.highlighted_industries,
+                                                        own_questions):
+            # Settings unchanged; still pick up attendees, industries or questions edited elsewhere
+            context.reset()
+            return context
+
+        context = EventContext(self, event, own_questions,
+                               self._question_bank(event.question_file, event.id if own_questions else None))
+        with self._lock:
+            self._contexts[event_id] = context
+            self._contexts.move_to_end(event_id)
+            while len(self._contexts) > self.cache_size:
+                self._contexts.popitem(last=False)
+        return context
+
+    def question_bank(self, event_id=None):
+        return self.context(event_id).question_bank
+
+    def suggestions(self, event_id=None):
+        return self.context(event_id).suggestions
+
+    def resolve_question_file(self, question_file):
+        """Absolute path of an event's question file; must live inside the app directory"""
+        root = os.path.realpath(self.app.root_path)
+        path = os.path.realpath(os.path.join(root, question_file))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError('Question file must be inside the application directory')
+        return path
+
+    def _question_bank(self, question_file, event_id=None):
+        """The bank for a question file, or for an event with questions of its own"""
+        if not question_file and event_id is None:
+            return self.default_bank
+
+        path = self.resolve_question_file(question_file) if question_file else self.default_bank.file_path
+        key = (path, event_id)
+        with self._lock:
+            bank = self._banks.get(key)
+            if bank is None:
+                # QuestionBank parses lazily, on the first question served
+                if event_id is None:
+                    bank = QuestionBank(path, self.dedup.question_ids, check_interval=self.default_bank.check_interval)
+                else:
+                    bank = QuestionBank(path, partial(self.dedup.question_ids, event_id=event_id),
+                                        partial(self.dedup.event_questions, event_id),
+                                        check_interval=self.default_bank.check_interval)
+                self._banks[key] = bank
+            # Only keep banks that a cached event still uses
+            in_use = {bank_key for bank_key, cached in self._banks.items()
+                      if any(ctx.question_bank is cached for ctx in self._contexts.values())} | {key}
+            for stale in [k for k in self._banks if k not in in_use]:
+                del self._banks[stale]
+        return bank
+
+    def _build_suggestions(self, event_id):
+        entries = {'name': [], 'company': []}
+        seen = {'name': set(), 'company': set()}
+
+        def add(kind, value):
+            value = (value or '').strip()
+            if value and value.lower() not in seen[kind]:
+                seen[kind].add(value.lower())
+                entries[kind].append(value)
+
+        for kind, file_path in SHARED_SUGGESTION_FILES.items():
+            path = os.path.join(self.app.root_path, file_path)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        add(kind, line)
+
+        Attendee = self.PreRegisteredUser
+        attendees = self.db.session.query(Attendee.name, Attendee.company_name).filter(
+            or_(Attendee.event_id == event_id, Attendee.event_id.is_(None))
+        ).order_by(Attendee.id).all()
+        for name, company_name in attendees:
+            add('name', name)
+            add('company', company_name)
+
+        return SuggestionIndex(entries, cache_size=self.app.config.get('SUGGESTION_CACHE_SIZE', 1024),
+                               max_age=self.app.config.get('SUGGESTION_INDEX_MAX_AGE', 600))
+
+    def _render_industry_grids(self, context):
+        Industry = self.Industry
+        # An event's own industry may share its name with one every event has
+        names = list(dict.fromkeys(name for (name,) in self.db.session.query(Industry.name).filter(
+            or_(Industry.event_id.is_(None), Industry.event_id == context.id)
+        ).order_by(Industry.id).all()))
+
+        # Highlighted industries in the configured order; missing ones were never seeded
+        available = set(names)
+        highlighted = [name for name in context.highlighted_industries if name in available]
+        others = [name for name in names if name not in context.highlighted_industries]
+
+        return Markup(render_template(
+            'game/_industry_grids.html',
+            highlighted_industries=[{'name': name} for name in highlighted],
+            other_industries=[{'name': name} for name in others]
+        ))
+
+    def _industries_changed(self, mapper, connection, target):
+        self.industry_generation += 1
+
+    def _attendees_changed(self, mapper, connection, target):
+        with self._lock:
+            for context in self._contexts.values():
+                if target.event_id is None or target.event_id == context.id:
+                    context._suggestions = None
+
+
+# Process-wide event registry
+events = EventRegistry()
@@ -0,0 +1,49 @@
+"""
+Shared fixtures: the app under TestingConfig with an in-memory database.
+
+FLASK_ENV is set before the app is imported, since app.py reads its
+configuration at import time.
+"""
+
+import os
+import sys
+
+import pytest
+
+os.environ['FLASK_ENV'] = 'testing'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app, db, init_database  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    with flask_app.app_context():
+        init_database()
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(client):
+    """A client logged in as the default admin that init_database creates"""
+    response = client.post('/admin/login', json={
+        'username': os.environ.get('ADMIN_USERNAME', 'admin'),
+        'password': os.environ.get('ADMIN_PASSWORD', 'admin123')
+    })
+    assert response.status_code == 200, response.get_json()
+    return client
+
+
+@pytest.fixture
+def player(client):
+    """A client that has registered and started a game"""
+    response = client.post('/api/start-game', json={
+        'name': 'Test Player', 'company_name': 'Test Company', 'industry': 'Technology'
+    })
+    assert response.status_code == 200, response.get_json()
+    return client
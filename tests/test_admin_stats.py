@@ -0,0 +1,18 @@
+"""The admin dashboard and analytics endpoints answer once games have been played."""
+
+
+def test_dashboard_stats(admin, player):
+    question = player.get('/api/get-question').get_json()
+    player.post('/api/submit-answer', json={'question_id': question['id'], 'selected_answer': 0})
+
+    response = admin.get('/admin/api/dashboard-stats')
+    assert response.status_code == 200, response.get_json()
+    stats = response.get_json()['stats']
+    assert stats['total_games'] >= 1
+    assert stats['difficult_questions']
+
+
+def test_question_analytics(admin):
+    response = admin.get('/admin/api/question-analytics')
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['category_performance']
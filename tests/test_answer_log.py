@@ -0,0 +1,65 @@
+"""Answers survive a database that is down at start and a full queue."""
+
+import json
+import time
+from datetime import datetime
+
+from answer_log import AnswerLog
+from app import GameSession, db
+
+
+def make_log(app, journal_dir, **settings):
+    log = AnswerLog()
+    log.init_app(app, db, GameSession)
+    log.enabled = True
+    log.fsync = False
+    log.journal_dir = str(journal_dir)
+    for name, value in settings.items():
+        setattr(log, name, value)
+    return log
+
+
+def answer(company):
+    return {'name': 'Player', 'company_name': company, 'industry': 'Technology', 'question_id': 1,
+            'selected_answer': 'A', 'is_correct': True, 'created_at': datetime.utcnow()}
+
+
+def stored(app, company):
+    with app.app_context():
+        return GameSession.query.filter_by(company_name=company).count()
+
+
+def test_append_journals_while_orphan_replay_fails(app, tmp_path):
+    log = make_log(app, tmp_path, flush_interval=0.05)
+    (tmp_path / 'answers-999999.jsonl').write_text(json.dumps({'seq': 1, 'answer': answer('Orphan Co')}, default=str) + '\n')
+    real_insert = log._insert
+    failing = {'on': True}
+
+    def insert(records):
+        if failing['on']:
+            raise RuntimeError('database is locked')
+        real_insert(records)
+
+    log._insert = insert
+    log.append(answer('Down Co'))  # must not raise
+    assert 'Down Co' in (tmp_path / f'answers-{log._pid}.jsonl').read_text()
+
+    failing['on'] = False
+    orphan = tmp_path / 'answers-999999.jsonl'
+    deadline = time.time() + 5
+    while orphan.exists() and time.time() < deadline:  # replayed on the flusher's next tick
+        log._wakeup.set()
+        time.sleep(0.05)
+    log.close()
+    assert stored(app, 'Down Co') == 1
+    assert stored(app, 'Orphan Co') == 1
+
+
+def test_full_queue_keeps_every_answer(app, tmp_path):
+    log = make_log(app, tmp_path, flush_interval=60, batch_size=1000)
+    log._queue.maxsize = 2
+    log._ensure_started()
+    for _ in range(10):
+        log.append(answer('Overflow Co'))
+    log.close()
+    assert stored(app, 'Overflow Co') == 10
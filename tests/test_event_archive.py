@@ -0,0 +1,51 @@
+"""Archiving an event again never loses or duplicates archived rows."""
+
+import os
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, select
+
+from app import db, Event, GameSession, Question
+from event_archive import event_archive
+
+
+def closed_event_with_answer(app):
+    with app.app_context():
+        event = Event(name='Archived expo', slug='archived-expo', ended_at=datetime.utcnow())
+        db.session.add(event)
+        db.session.flush()
+        db.session.add(GameSession(event_id=event.id, name='Archived Player', company_name='Co', industry='BFSI',
+                                   question_id=db.session.query(Question.id).limit(1).scalar(),
+                                   selected_answer='A', is_correct=True))
+        db.session.commit()
+        return event.id
+
+
+def test_rearchive_keeps_earlier_files_and_rows(app, tmp_path, monkeypatch):
+    archive_url = f'sqlite:///{tmp_path / "archive.db"}'
+    monkeypatch.setitem(app.config, 'ARCHIVE_DATABASE_URL', archive_url)
+    monkeypatch.setattr(event_archive, 'archive_dir', str(tmp_path / 'archive'))
+    monkeypatch.setattr(event_archive, '_archive_engine', None)
+    event_id = closed_event_with_answer(app)
+
+    with app.app_context():
+        table = GameSession.__table__
+        rows = [dict(row) for row in db.session.execute(
+            select(table).where(table.c.event_id == event_id)).mappings()]
+        # A run that copied the rows to the archive database and then failed
+        event_archive._copy_to_archive_database(table, rows)
+
+        first = event_archive.archive_event(event_id)
+        assert first['deleted'] == {'game_session': 1, 'user_journey': 0}
+
+        # An answer that landed after the first run, which SQLite may give the archived row's id
+        db.session.add(GameSession(event_id=event_id, name='Late Player', company_name='Co',
+                                   industry='BFSI', question_id=rows[0]['question_id'],
+                                   selected_answer='B', is_correct=False))
+        db.session.commit()
+        second = event_archive.archive_event(event_id)
+
+    assert first['path'] != second['path']
+    assert os.path.exists(first['path']) and os.path.exists(second['path'])
+    with create_engine(archive_url).connect() as conn:
+        assert conn.execute(select(func.count()).select_from(table)).scalar() == 2
@@ -0,0 +1,56 @@
+"""Per-event questions and attendees, and the default event created at startup."""
+
+import io
+
+from app import db, Category, Event, PreRegisteredUser
+from tenancy import DEFAULT_EVENT_SLUG
+from routes import events
+
+
+def open_event(app, slug):
+    with app.app_context():
+        event = Event.query.filter_by(slug=slug, ended_at=None).first()
+        if event is None:
+            event = Event(name=f'Event {slug}', slug=slug)
+            db.session.add(event)
+            db.session.commit()
+        return event.id
+
+
+def test_default_event_is_created_at_startup(app):
+    with app.app_context():
+        assert Event.query.filter_by(slug=DEFAULT_EVENT_SLUG, ended_at=None).count() == 1
+        # Looking up an unknown slug never creates an event
+        assert events.event_id_for_slug('no-such-event') is None
+        assert Event.query.filter_by(slug='no-such-event').count() == 0
+
+
+def test_event_question_is_served_to_that_event_only(app, admin):
+    event_id = open_event(app, 'expo')
+    with app.app_context():
+        category_id = Category.query.filter_by(name='Technology').first().id
+
+    response = admin.post('/admin/api/questions', json={
+        'category_id': category_id, 'event_id': event_id,
+        'question_text': 'Which port does the expo badge scanner listen on?',
+        'option_a': '22', 'option_b': '80', 'option_c': '443', 'option_d': '8443',
+        'correct_answer': 'D'
+    })
+    assert response.status_code == 200, response.get_json()
+    question_id = response.get_json()['question_id']
+
+    with app.test_request_context():
+        assert events.question_bank(event_id).get(question_id) is not None
+        assert events.question_bank(events.default_event_id()).get(question_id) is None
+
+
+def test_bulk_upload_adds_attendees_to_the_current_event(app, admin):
+    event_id = open_event(app, 'summit')
+    upload = io.BytesIO(b'name,company_name,industry\nAsha Rao,Summit Labs,Technology\n')
+    response = admin.post('/admin/api/bulk-users?event=summit', data={'file': (upload, 'summit.csv')},
+                          content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+
+    with app.app_context():
+        attendee = PreRegisteredUser.query.filter_by(name='Asha Rao').one()
+        assert attendee.event_id == event_id
@@ -0,0 +1,18 @@
+"""Player-supplied industry names never reach the catalog or inline script."""
+
+from industry_stats import IndustryStats
+
+
+def test_journeys_count_only_catalog_industries():
+    stats = IndustryStats()
+    stats._catalog = {'bfsi': 'BFSI'}
+    stats.record(1, 'bfsi', catalog_only=True)
+    stats.record(1, "x');alert(1);//", catalog_only=True)
+    stats.rank()
+    assert stats._top[1] == ['BFSI']
+
+
+def test_industry_cards_have_no_inline_handlers(client):
+    page = client.get('/industry-select').get_data(as_text=True)
+    assert 'data-industry=' in page
+    assert "selectIndustry('" not in page
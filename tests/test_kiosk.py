@@ -0,0 +1,11 @@
+"""Browsers are enrolled as offline kiosks from an admin page."""
+
+
+def test_kiosk_enrollment_needs_admin(client):
+    assert client.get('/admin/kiosk').status_code == 302
+
+
+def test_kiosk_enrollment_page(admin):
+    response = admin.get('/admin/kiosk')
+    assert response.status_code == 200
+    assert b'Kiosk.enroll()' in response.data
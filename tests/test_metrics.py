@@ -0,0 +1,40 @@
+"""The per-request profiler only runs for callers holding the shared token."""
+
+import collections
+
+from metrics import MetricsMiddleware, MetricsRegistry
+
+
+def hello(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'hello']
+
+
+def call(middleware, **environ):
+    headers = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        headers.update(response_headers)
+
+    body = middleware(dict({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}, **environ), start_response)
+    b''.join(body)
+    body.close()
+    return headers
+
+
+def test_profile_requires_token():
+    profiles = collections.deque()
+    middleware = MetricsMiddleware(hello, MetricsRegistry(), profiles=profiles, profile_token='s3cret')
+    assert 'X-Profile-Id' not in call(middleware, HTTP_X_PROFILE='1')
+    assert 'X-Profile-Id' not in call(middleware, QUERY_STRING='_profile=1')
+    assert not profiles
+
+    assert 'X-Profile-Id' in call(middleware, HTTP_X_PROFILE='s3cret')
+    assert len(profiles) == 1
+
+
+def test_profile_off_without_token():
+    profiles = collections.deque()
+    middleware = MetricsMiddleware(hello, MetricsRegistry(), profiles=profiles)
+    assert 'X-Profile-Id' not in call(middleware, HTTP_X_PROFILE='1')
+    assert not profiles
@@ -0,0 +1,66 @@
+"""Budgeted endpoints stay within their @query_budget, and an N+1 fails the request."""
+
+import pytest
+from flask import request
+
+from app import Category, app as flask_app, db
+from metrics import QueryBudgetExceeded, query_budget
+
+
+def test_categories(admin):
+    response = admin.get('/admin/api/categories')
+    assert response.status_code == 200
+
+
+def test_industry_select(client):
+    response = client.get('/industry-select')
+    assert response.status_code == 200
+    assert client.get('/industry-select', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_suggestions_index(client):
+    response = client.get('/api/suggestions-index')
+    assert response.status_code == 200
+
+
+def test_start_game(client):
+    response = client.post('/api/start-game', json={
+        'name': 'Budget Player', 'company_name': 'Budget Company', 'industry': 'Finance'
+    })
+    assert response.status_code == 200
+    assert response.get_json()['success']
+
+
+def test_get_question(player):
+    response = player.get('/api/get-question')
+    assert response.status_code == 200
+    assert response.get_json()['id']
+
+
+def test_submit_answers(player):
+    question = player.get('/api/get-question').get_json()
+    response = player.post('/api/submit-answers', json={
+        'answers': [{'question_id': question['id'], 'selected_answer': 0, 'time_taken': 3}]
+    })
+    assert response.status_code == 200, response.get_json()
+
+
+# Routes must be registered before the app's first request, so this one is added at import
+@flask_app.route('/_test/n-plus-one')
+@query_budget(10)
+def n_plus_one():
+    # One SELECT per category: the repeated statement is an N+1 even within the budget
+    for category_id in range(1, request.args.get('count', 5, type=int) + 1):
+        db.session.get(Category, category_id)
+        db.session.expunge_all()
+    return 'ok'
+
+
+def test_n_plus_one_raises(client):
+    with pytest.raises(QueryBudgetExceeded, match='possible N\\+1'):
+        client.get('/_test/n-plus-one')
+
+
+def test_over_budget_raises(client):
+    with pytest.raises(QueryBudgetExceeded, match='budget is 10'):
+        client.get('/_test/n-plus-one?count=11')
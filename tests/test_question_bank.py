@@ -0,0 +1,53 @@
+"""Cacheable question payloads carry no answers; the question file is checked at most once per interval."""
+
+import json
+import os
+
+from question_bank import QuestionBank
+from routes import question_bank
+
+QUESTION = """INDUSTRY: Technology
+
+1. Which protocol secures web traffic?
+A. FTP
+B. HTTPS
+C. SMTP
+D. Telnet
+Correct Answer: B
+"""
+
+
+def test_question_content_has_no_answer(client):
+    question_id = question_bank.all_ids()[0]
+    response = client.get(f'/api/questions/{question_id}')
+    assert response.status_code == 200
+    assert 'public' in response.headers['Cache-Control']
+    assert 'correct_answer' not in response.get_json()
+
+
+def test_get_question_has_no_answer(player):
+    assert 'correct_answer' not in player.get('/api/get-question').get_json()
+
+
+def test_pack_keeps_answers_for_offline_grading(player):
+    pack = player.get('/api/question-pack?industry=Technology').get_json()
+    assert pack['questions'] and all('correct_answer' in q for q in pack['questions'])
+
+
+def test_file_checked_once_per_interval(tmp_path, monkeypatch):
+    path = tmp_path / 'questions.txt'
+    path.write_text(QUESTION, encoding='utf-8')
+    bank = QuestionBank(str(path), check_interval=60)
+    assert len(bank.all_ids()) == 1
+
+    checks = []
+    real_getmtime = os.path.getmtime
+    monkeypatch.setattr(os.path, 'getmtime', lambda p: checks.append(p) or real_getmtime(p))
+    for _ in range(100):
+        bank.all_ids()
+    assert checks == []
+
+    bank.check_interval = 0
+    bank.all_ids()
+    assert checks == [str(path)]
+    assert 'correct_answer' not in json.loads(bank.payload(bank.ids[0]))
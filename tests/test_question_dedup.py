@@ -0,0 +1,43 @@
+"""A question's identity includes its industry."""
+
+from app import db, Category, Question
+from migrations import add_industry_to_question_hash
+from question_bank import QuestionBank
+from question_format import content_hash
+from routes import question_dedup
+
+SHARED = """INDUSTRY: {industry}
+
+1. What does MFA stand for?
+A. Multi-factor authentication
+B. Main frame access
+C. Managed file archive
+D. Multiple format adapter
+Correct Answer: A
+"""
+
+
+def test_same_question_is_kept_in_each_industry(app, tmp_path):
+    path = tmp_path / 'questions.txt'
+    path.write_text(SHARED.format(industry='BFSI') + '\n' + SHARED.format(industry='Aviation'), encoding='utf-8')
+    with app.app_context():
+        question_dedup.store_file(str(path))
+        db.session.commit()
+        bank = QuestionBank(str(path), question_ids=question_dedup.question_ids)
+        assert len(bank.all_ids()) == 2
+        industries = sorted(q['industry'] for q in bank.questions if q['question'] == 'What does MFA stand for?')
+        assert industries == ['Aviation', 'BFSI']
+        assert len(set(bank.ids)) == len(bank.ids)
+
+
+def test_migration_adds_industry_to_old_hashes(app):
+    with app.app_context():
+        question = Question.query.join(Category).first()
+        options = [question.option_a, question.option_b, question.option_c, question.option_d]
+        db.session.execute(db.text('UPDATE question SET content_hash = :digest WHERE id = :id'),
+                           {'digest': 'old-style', 'id': question.id})
+        db.session.commit()
+
+        add_industry_to_question_hash(db)
+        db.session.refresh(question)
+        assert question.content_hash == content_hash(question.category.name, question.question_text, options)
@@ -0,0 +1,26 @@
+"""Admission control on admin views only counts signed-in users."""
+
+import threading
+
+from ratelimit import limiter
+
+
+def test_anonymous_export_takes_no_slot(client, monkeypatch):
+    monkeypatch.setattr(limiter, 'enabled', True)
+    # Every export slot is busy; an anonymous request still just gets the login redirect
+    slots = threading.BoundedSemaphore(2)
+    slots.acquire()
+    slots.acquire()
+    monkeypatch.setitem(limiter._slots, 'export_data', slots)
+    for _ in range(5):
+        response = client.get('/admin/export-data')
+        assert response.status_code == 302
+
+
+def test_signed_in_export_is_limited(admin, monkeypatch):
+    monkeypatch.setattr(limiter, 'enabled', True)
+    slots = threading.BoundedSemaphore(2)
+    slots.acquire()
+    slots.acquire()
+    monkeypatch.setitem(limiter._slots, 'export_data', slots)
+    assert admin.get('/admin/export-data').status_code == 429
@@ -0,0 +1,47 @@
+"""A journey scores only questions it was served, and each of them once."""
+
+from app import GameSession, db
+from routes import question_bank
+
+
+def answers_stored(app, journey_id):
+    with app.app_context():
+        return db.session.query(GameSession).filter_by(journey_id=journey_id).count()
+
+
+def journey_id(client):
+    with client.session_transaction() as session:
+        return session['journey_id']
+
+
+def test_unserved_question_is_rejected(player):
+    served = player.get('/api/get-question').get_json()['id']
+    with player.session_transaction() as session:
+        session['asked_questions'] = [served]
+    other = next(qid for qid in question_bank.all_ids() if qid != served)
+    response = player.post('/api/submit-answers', json={'answers': [{'question_id': other, 'selected_answer': 0}]})
+    assert response.get_json()['results'][0] == {'status': 'rejected', 'error': 'Question was not served to this journey'}
+    assert response.get_json()['saved'] == 0
+
+
+def test_repeated_answers_count_once(app, player):
+    question_id = player.get('/api/get-question').get_json()['id']
+    answer = {'question_id': question_id, 'selected_answer': 1}
+
+    response = player.post('/api/submit-answers', json={'answers': [answer, answer, answer]})
+    assert [r['status'] for r in response.get_json()['results']] == ['ok', 'duplicate', 'duplicate']
+
+    response = player.post('/api/submit-answers', json={'answers': [answer]})
+    assert response.get_json()['results'][0]['status'] == 'duplicate'
+    assert answers_stored(app, journey_id(player)) == 1
+
+
+def test_sync_counts_each_question_once(app, player):
+    token = player.post('/api/start-game', json={'industry': 'Technology'}).get_json()['journey']
+    question_id = player.get('/api/get-question').get_json()['id']
+    items = [{'id': f'answer-{n}', 'type': 'answer', 'journey': token, 'question_id': question_id,
+              'selected_answer': 0} for n in range(3)]
+
+    response = player.post('/api/sync', json={'items': items})
+    assert [r['status'] for r in response.get_json()['results']] == ['ok', 'duplicate', 'duplicate']
+    assert answers_stored(app, journey_id(player)) == 1
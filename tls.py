@@ -0,0 +1,43 @@
+"""
+TLS certificates for the HTTPS launchers (gunicorn.conf.py, app_https.py).
+
+Kiosk phones need HTTPS for camera access. Real certificates are used when
+SSL_CERTFILE and SSL_KEYFILE are set; otherwise a self-signed pair is
+generated once into instance/certs and reused on every start, so the
+browser exception a kiosk accepted keeps working across restarts (Flask's
+'adhoc' context made a new certificate each time).
+"""
+
+import os
+import time
+
+CERT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'certs')
+
+# werkzeug's self-signed certificates are valid for a year; renew a month early
+SELF_SIGNED_MAX_AGE = 335 * 86400
+
+
+def certificate_paths(cert_dir=CERT_DIR, host=None):
+    """(certfile, keyfile) for the server, generating a self-signed pair when needed"""
+    certfile = os.environ.get('SSL_CERTFILE')
+    keyfile = os.environ.get('SSL_KEYFILE')
+    if certfile and keyfile:
+        return certfile, keyfile
+
+    base_path = os.path.join(cert_dir, 'selfsigned')
+    certfile, keyfile = base_path + '.crt', base_path + '.key'
+    try:
+        fresh = time.time() - os.path.getmtime(certfile) < SELF_SIGNED_MAX_AGE and os.path.exists(keyfile)
+    except OSError:
+        fresh = False
+    if fresh:
+        return certfile, keyfile
+
+    # Needs the cryptography package, as the 'adhoc' context did
+    from werkzeug.serving import make_ssl_devcert
+
+    os.makedirs(cert_dir, exist_ok=True)
+    certfile, keyfile = make_ssl_devcert(base_path, host=host or os.environ.get('SSL_HOST', 'localhost'))
+    os.chmod(keyfile, 0o600)
+    print(f"Generated self-signed certificate: {certfile}")
+    return certfile, keyfile
@@ -0,0 +1,22 @@
+"""
+WSGI entry point for production servers (see gunicorn.conf.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module prepares the database, parses the question bank,
+indexes the pre-registered attendees for fuzzy lookup and builds the live
+leaderboards. With preload_app that happens once in the gunicorn master, and
+every worker forked from it shares the questions, the index and the boards
+copy-on-write instead of loading its own.
+"""
+
+from app import app, db, init_database
+from routes import live_stats, question_bank, registrant_matcher
+
+with app.app_context():
+    init_database()
+    question_bank.refresh()
+    registrant_matcher.load()
+    live_stats.load()
+    # Forked workers must open their own database connections, not share these
+    db.engine.dispose()